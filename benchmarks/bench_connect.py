@@ -0,0 +1,123 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import db
+import ids
+import search
+import stats
+import timeline
+
+
+def build_database(path, settings):
+    """
+    Create a database from sqlData.sql with every derived table installed, as main.connect does.
+    """
+    connection = db.open_database(path, settings)
+    cursor = connection.cursor()
+    with open(os.path.join(parent_dir, "sqlData.sql")) as f:
+        cursor.executescript(f.read())
+    for module in (timeline, search, stats, ids):
+        module.install(connection, cursor)
+    connection.commit()
+    return connection, cursor
+
+def write_tweets(connection, cursor, count, rng):
+    """
+    Compose count tweets, one transaction each, the way build_tweet does.
+    @return: tweets per second.
+    """
+    start = time.perf_counter()
+    for n in range(count):
+        tid = ids.allocate(cursor, 'tweets')
+        cursor.execute("INSERT INTO tweets (tid, writer, tdate, text) VALUES (?, ?, '2025-01-01', ?);",
+                       (tid, rng.randint(1, 6), f"benchmark tweet {n} #bench"))
+        connection.commit()
+    return count / (time.perf_counter() - start)
+
+def read_feeds(cursor, count, rng):
+    """
+    Read count first pages of Recent Activity for random users.
+    @return: pages per second.
+    """
+    start = time.perf_counter()
+    for _ in range(count):
+        timeline.read_timeline(cursor, rng.randint(1, 6), 5)
+    return count / (time.perf_counter() - start)
+
+def reads_during_writes(path, settings, connection, cursor, count, rng):
+    """
+    Run a reader thread on its own connection while count tweets are written.
+    @return: (tweets per second, pages read per second, reads that hit a locked database).
+    """
+    stop = threading.Event()
+    result = {'reads': 0, 'busy': 0, 'error': None}
+
+    def reader():
+        reader_connection = None
+        reader_rng = random.Random(2)
+        try:
+            while not stop.is_set():
+                try:
+                    # Applying the preset's PRAGMAs can itself hit the writer's lock
+                    if reader_connection is None:
+                        reader_connection = db.open_database(path, settings)
+                        reader_cursor = reader_connection.cursor()
+                    timeline.read_timeline(reader_cursor, reader_rng.randint(1, 6), 5)
+                    result['reads'] += 1
+                except sqlite3.OperationalError as error:
+                    if "locked" not in str(error) and "busy" not in str(error):
+                        raise
+                    result['busy'] += 1
+        except BaseException as error:
+            result['error'] = error
+        finally:
+            if reader_connection is not None:
+                reader_connection.close()
+
+    thread = threading.Thread(target=reader)
+    start = time.perf_counter()
+    thread.start()
+    writes = write_tweets(connection, cursor, count, rng)
+    stop.set()
+    thread.join()
+    if result['error'] is not None:
+        raise RuntimeError("The reader thread failed") from result['error']
+    return writes, result['reads'] / (time.perf_counter() - start), result['busy']
+
+def main():
+    parser = argparse.ArgumentParser(description="Write and read throughput across connection presets.")
+    parser.add_argument("--writes", type=int, default=500, help="tweets written per measurement")
+    parser.add_argument("--reads", type=int, default=5000, help="feed pages read per measurement")
+    parser.add_argument("--presets", nargs="+", default=sorted(db.PRESETS), choices=sorted(db.PRESETS))
+    parser.add_argument("--busy-timeout", type=int, default=100,
+                        help="busy_timeout for the concurrent run, low enough to surface lock waits")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print("{0:>9} | {1:>10} | {2:>10} | {3:>16} | {4:>16} | {5:>10}".format(
+        "preset", "writes/s", "reads/s", "writes/s (mixed)", "reads/s (mixed)", "busy reads"))
+    for preset in args.presets:
+        rng = random.Random(args.seed)
+        settings = db.resolve_settings(preset, None, {"busy_timeout": args.busy_timeout})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bench.db")
+            connection, cursor = build_database(path, settings)
+            writes = write_tweets(connection, cursor, args.writes, rng)
+            reads = read_feeds(cursor, args.reads, rng)
+            mixed_writes, mixed_reads, busy = reads_during_writes(path, settings, connection, cursor,
+                                                                  args.writes, rng)
+            connection.close()
+        print("{0:>9} | {1:>10.0f} | {2:>10.0f} | {3:>16.0f} | {4:>16.0f} | {5:>10}".format(
+            preset, writes, reads, mixed_writes, mixed_reads, busy))
+
+
+if __name__ == "__main__":
+    main()
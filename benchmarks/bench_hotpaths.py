@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import generate
+from service import TweeterService
+
+DEFAULT_SIZES = ['1000:10000', '10000:100000']
+WARMUP = 10
+
+
+def feed(service, rng, users):
+    """post_login: the first page of Recent Activity."""
+    service.feed_page(rng.randint(1, users), 5)
+
+def search_tweet(service, rng, users):
+    """search_tweet: the first page of one or two keywords, hashtags or words."""
+    keywords = [rng.choice(generate.WORDS) for _ in range(rng.randint(1, 2))]
+    if rng.random() < 0.5:
+        keywords[0] = '#' + keywords[0]
+    service.search_tweets(keywords, 5)
+
+def search_user(service, rng, users):
+    """search_user: the first page of names and of cities."""
+    keyword = rng.choice(generate.FIRST_NAMES + generate.CITIES)[:4]
+    service.search_users_by_name(keyword)
+    service.search_users_by_city(keyword)
+
+def userinfo_pull(service, rng, users):
+    """userinfo_pull: counters and latest tweets of a profile."""
+    service.profile(rng.randint(1, users))
+
+def see_more_tweets(service, rng, users):
+    """see_more_tweets: the first page of a user's tweets."""
+    service.user_tweets_page(rng.randint(1, users))
+
+def list_followers(service, rng, users):
+    """list_followers: the follower count and first page of a user's followers."""
+    usr = rng.randint(1, users)
+    service.follower_count(usr)
+    service.followers_page(usr)
+
+def build_tweet(service, rng, users):
+    """build_tweet: a tweet with a hashtag, in its own transaction."""
+    service.compose(rng.randint(1, users), f"benchmark {rng.choice(generate.WORDS)} #{rng.choice(generate.WORDS)}")
+
+def trending_hashtags(service, rng, users):
+    """trending_hashtags: the top hashtags of the trending window."""
+    service.trending()
+
+def follow_user(service, rng, users):
+    """follow_user: follow a random user, in its own transaction."""
+    flwer = rng.randint(1, users)
+    flwee = rng.randint(1, users)
+    if flwer != flwee:
+        service.follow(flwer, flwee)
+
+OPERATIONS = {
+    'feed': feed,
+    'search_tweet': search_tweet,
+    'search_user': search_user,
+    'userinfo_pull': userinfo_pull,
+    'see_more_tweets': see_more_tweets,
+    'list_followers': list_followers,
+    'build_tweet': build_tweet,
+    'follow_user': follow_user,
+    'trending_hashtags': trending_hashtags,
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def database_for(directory, users, tweets, seed):
+    """
+    @return: path of a generated database of that size, generated once and reused by later runs.
+    """
+    path = os.path.join(directory, f"gen-{users}-{tweets}-s{seed}.db")
+    if not os.path.exists(path):
+        print(f"Generating {path}")
+        try:
+            generate.generate(path, users, tweets, seed=seed)
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+    return path
+
+def measure(path, users, operations, iterations, seed):
+    """
+    Time each operation on a scratch copy of the database, so writes never touch the cached one.
+    Runs in its own process, so the peak RSS is this size's alone.
+    @return: {"peak_rss_kb": ..., "ops": {operation: statistics}}.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        scratch = os.path.join(directory, "bench.db")
+        shutil.copyfile(path, scratch)
+        service = TweeterService.open(scratch)
+        results = {}
+        for name in operations:
+            operation = OPERATIONS[name]
+            rng = random.Random(f"{seed}-{name}")
+            for _ in range(WARMUP):
+                operation(service, rng, users)
+            latencies = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                operation(service, rng, users)
+                latencies.append(time.perf_counter() - start)
+            results[name] = {
+                'ops_per_sec': iterations / sum(latencies),
+                'p50_ms': percentile(latencies, 0.5) * 1000,
+                'p95_ms': percentile(latencies, 0.95) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000,
+                'max_ms': max(latencies) * 1000,
+            }
+        service.close()
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return {'peak_rss_kb': peak, 'ops': results}
+
+def compare(results, baseline, threshold):
+    """
+    @return: list of (size, operation, metric, baseline value, new value) that got worse by more than threshold.
+    """
+    regressions = []
+    for size, measured in results['sizes'].items():
+        before = baseline.get('sizes', {}).get(size)
+        if before is None:
+            continue
+        for name, stats in measured['ops'].items():
+            old = before['ops'].get(name)
+            if old is None:
+                continue
+            if stats['ops_per_sec'] < old['ops_per_sec'] * (1 - threshold):
+                regressions.append((size, name, 'ops_per_sec', old['ops_per_sec'], stats['ops_per_sec']))
+            if stats['p50_ms'] > old['p50_ms'] * (1 + threshold):
+                regressions.append((size, name, 'p50_ms', old['p50_ms'], stats['p50_ms']))
+    return regressions
+
+def print_size(size, measured):
+    print(f"\n{size} (users:tweets), peak RSS {measured['peak_rss_kb'] / 1024:.1f} MiB")
+    print("{0:>15} | {1:>10} | {2:>9} | {3:>9} | {4:>9} | {5:>9}".format(
+        "operation", "ops/s", "p50 (ms)", "p95 (ms)", "p99 (ms)", "max (ms)"))
+    for name, stats in measured['ops'].items():
+        print("{0:>15} | {1:>10.0f} | {2:>9.3f} | {3:>9.3f} | {4:>9.3f} | {5:>9.3f}".format(
+            name, stats['ops_per_sec'], stats['p50_ms'], stats['p95_ms'], stats['p99_ms'], stats['max_ms']))
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the operations behind every menu on generated databases.")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, metavar="USERS:TWEETS",
+                        help=f"database sizes to run, smallest first (default: {' '.join(DEFAULT_SIZES)})")
+    parser.add_argument("--operations", nargs="+", default=list(OPERATIONS), choices=list(OPERATIONS))
+    parser.add_argument("--iterations", type=int, default=200, help="timed calls per operation and size")
+    parser.add_argument("--databases", default=os.path.join(tempfile.gettempdir(), "tweeter-bench"),
+                        help="directory where generated databases are kept between runs")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="flag operations that got slower than the baseline by more than this fraction")
+    args = parser.parse_args()
+
+    os.makedirs(args.databases, exist_ok=True)
+    results = {
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'iterations': args.iterations,
+        'seed': args.seed,
+        'sizes': {},
+    }
+    for size in args.sizes:
+        users, tweets = (int(part) for part in size.split(':'))
+        path = database_for(args.databases, users, tweets, args.seed)
+        # A fresh process per size keeps each peak RSS separate
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            measured = executor.submit(measure, path, users, args.operations, args.iterations, args.seed).result()
+        results['sizes'][size] = measured
+        print_size(size, measured)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        print(f"\n{len(regressions)} regressions over {args.threshold:.0%} against {args.baseline}")
+        for size, name, metric, old, new in regressions:
+            print(f"  {size} {name}: {metric} {old:.3f} -> {new:.3f}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
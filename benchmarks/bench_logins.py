@@ -0,0 +1,111 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import db
+import passwords
+from service import TweeterService
+
+# Costs to compare: scrypt n values at passwords.SCRYPT_COST's r and p, or pbkdf2 iterations
+if passwords.SCHEME == 'scrypt':
+    DEFAULT_COSTS = [2 ** 12, 2 ** 14, 2 ** 15]
+else:
+    DEFAULT_COSTS = [100000, passwords.PBKDF2_ITERATIONS, 2 * passwords.PBKDF2_ITERATIONS]
+
+
+def build_database(path, users):
+    """
+    Create a database of sqlData.sql's schema and users 1..users with password pass<usr>.
+    """
+    connection = sqlite3.connect(path)
+    with open(os.path.join(parent_dir, "sqlData.sql")) as f:
+        connection.executescript(f.read())
+    connection.execute("DELETE FROM users;")
+    connection.executemany("INSERT INTO users VALUES (?, ?, ?, ?, ?, ?);",
+                           [(usr, None, f"User {usr}", None, None, None) for usr in range(1, users + 1)])
+    connection.commit()
+    connection.close()
+
+def rehash_all(service, users, parameters):
+    """
+    Store every user's password hashed at parameters.
+    """
+    for usr in range(1, users + 1):
+        pwd = passwords.hash_password(f"pass{usr}", parameters)
+        service.cursor.execute("UPDATE users SET pwd = ? WHERE usr = ?;", (pwd, usr))
+    service.connection.commit()
+
+def log_in(path, users, seconds, seed, latencies):
+    """
+    Log in as random users on a connection of its own until seconds have passed, a tenth of
+    them with a wrong password. Appends each login's latency in milliseconds to latencies.
+    """
+    service = TweeterService(db.open_database(path))
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        usr = rng.randint(1, users)
+        password = f"pass{usr}" if rng.random() >= 0.1 else "wrong"
+        start = time.perf_counter()
+        user = service.login(usr, password)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if (user is None) != (password == "wrong"):
+            raise AssertionError(f"Login of user {usr} gave the wrong answer")
+    service.close()
+
+def measure(path, users, seconds, threads):
+    """
+    @return: (logins per second, p50 ms, p99 ms) over threads concurrent sessions.
+    """
+    latencies = []
+    workers = [threading.Thread(target=log_in, args=(path, users, seconds, seed, latencies))
+               for seed in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return (len(latencies) / elapsed, latencies[len(latencies) // 2],
+            latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)])
+
+def main():
+    parser = argparse.ArgumentParser(description="Logins per second at different password hashing costs.")
+    parser.add_argument("--costs", type=int, nargs="+", default=DEFAULT_COSTS,
+                        help="scrypt n values, powers of 2 (pbkdf2 iterations without scrypt)")
+    parser.add_argument("--threads", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}),
+                        help="concurrent login sessions, each on its own connection")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=3, help="time spent logging in per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "logins.db")
+        build_database(path, args.users)
+        service = TweeterService(db.open_database(path))
+        print(f"{passwords.SCHEME}, {os.cpu_count()} CPUs, {args.seconds:g}s per measurement")
+        print("{0:>14} | {1:>7} | {2:>9} | {3:>8} | {4:>8}".format("cost", "threads", "logins/s", "p50 ms", "p99 ms"))
+        for n in args.costs:
+            if passwords.SCHEME == 'scrypt':
+                label, parameters = f"n={n}", (n,) + passwords.SCRYPT_COST[1:]
+            else:
+                label, parameters = f"iterations={n}", (n,)
+            rehash_all(service, args.users, parameters)
+            # Passwords hashed at the measured cost are not rehashed on login
+            passwords.cost = parameters
+            for threads in args.threads:
+                logins, p50, p99 = measure(path, args.users, args.seconds, threads)
+                print("{0:>14} | {1:>7} | {2:>9.0f} | {3:>8.2f} | {4:>8.2f}".format(label, threads, logins, p50, p99))
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import gc
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import profiles
+import records
+
+# Rows of each list, read as tuples the way they were before records.py and as records.
+# Feed rows as tuples spelled the kind out in SQL and carried both names, as timeline.py did.
+# Records read ids only and get their names from a profiles.ProfileCache, as the service does.
+FEED_TUPLES = """
+    SELECT name, CASE kind WHEN 0 THEN 'Tweet' ELSE 'Retweet' END, tdate, text, tid, usr, writer_name, writer
+    FROM feed LIMIT ?;
+"""
+FEED_RECORDS = "SELECT kind, tdate, text, tid, usr, writer FROM feed LIMIT ?;"
+TWEET_TUPLES = "SELECT name, usr, tdate, text, tid FROM feed LIMIT ?;"
+TWEET_RECORDS = "SELECT usr, tdate, text, tid FROM feed LIMIT ?;"
+USERS = "SELECT usr, name FROM feed LIMIT ?;"
+# Distinct users the rows are spread over
+USER_COUNT = 1000
+
+
+def build(cursor, rows):
+    """
+    Fill a table with rows synthetic feed rows, every tenth a retweet, and users with their names.
+    """
+    cursor.execute("CREATE TABLE users (usr INT PRIMARY KEY, name TEXT, email TEXT, city TEXT, timezone REAL);")
+    cursor.executemany("INSERT INTO users VALUES (?, ?, 'user@example.com', 'Calgary', -7);",
+                       ((usr, f"User {usr}") for usr in range(USER_COUNT)))
+    cursor.execute("""
+        CREATE TABLE feed (name TEXT, kind INT, tdate DATE, text TEXT, tid INT, usr INT,
+                           writer_name TEXT, writer INT);
+    """)
+    cursor.executemany("INSERT INTO feed VALUES (?, ?, ?, ?, ?, ?, ?, ?);", (
+        (f"User {i % USER_COUNT}", int(i % 10 == 0), f"2024-{1 + i % 12:02d}-{1 + i % 28:02d} 12:00:00",
+         f"tweet number {i} #tag{i % 50}", i, i % USER_COUNT,
+         f"User {(i * 7) % USER_COUNT}", (i * 7) % USER_COUNT)
+        for i in range(rows)))
+
+def fetch(cursor, sql, rows, factory=None, convert=None, fill=None):
+    """
+    Fetch rows rows of sql, with factory as the row factory or converting each tuple with convert.
+    @param fill: profiles.fill_feed or fill_tweets, to set the records' names through a new ProfileCache.
+    @return: (bytes retained per row, seconds taken).
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    if factory is not None:
+        with records.rows_as(cursor, factory):
+            cursor.execute(sql, (rows,))
+            result = cursor.fetchall()
+        if fill is not None:
+            fill(cursor, profiles.ProfileCache(), result)
+    else:
+        cursor.execute(sql, (rows,))
+        result = cursor.fetchall()
+        if convert is not None:
+            result = [convert(*row) for row in result]
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if len(result) != rows:
+        raise AssertionError(f"Fetched {len(result)} rows instead of {rows}")
+    del result
+    return retained / rows, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and time to fetch rows as tuples and as records.")
+    parser.add_argument("--rows", type=int, default=1000000, help="rows fetched per measurement")
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(":memory:")
+    cursor = connection.cursor()
+    build(cursor, args.rows)
+    connection.commit()
+
+    cases = [
+        ("feed", (FEED_TUPLES, {}), (FEED_RECORDS, {'factory': records.feed_item, 'fill': profiles.fill_feed})),
+        ("tweet search", (TWEET_TUPLES, {}),
+         (TWEET_RECORDS, {'factory': records.tweet_hit, 'fill': profiles.fill_tweets})),
+        ("user search", (USERS, {}), (USERS, {'convert': records.UserHit})),
+    ]
+    print(f"{args.rows} rows; tracemalloc slows fetching, so times are for comparison only")
+    print("{0:>12} | {1:>11} | {2:>12} | {3:>8} | {4:>9} | {5:>10}".format(
+        "rows", "tuple B/row", "record B/row", "saved", "tuple s", "record s"))
+    for name, (tuple_sql, tuple_options), (record_sql, record_options) in cases:
+        tuple_bytes, tuple_time = fetch(cursor, tuple_sql, args.rows, **tuple_options)
+        record_bytes, record_time = fetch(cursor, record_sql, args.rows, **record_options)
+        print("{0:>12} | {1:>11.0f} | {2:>12.0f} | {3:>7.0%} | {4:>9.2f} | {5:>10.2f}".format(
+            name, tuple_bytes, record_bytes, 1 - record_bytes / tuple_bytes, tuple_time, record_time))
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
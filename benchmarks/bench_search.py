@@ -0,0 +1,115 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import search
+
+WORDS = ["oilers", "snow", "coffee", "project", "deadline", "sunny", "weekend", "hockey", "music", "traffic",
+         "pizza", "exam", "river", "concert", "winter", "summer", "library", "bus", "game", "goal"]
+
+
+def build_database(path, num_tweets, seed):
+    """
+    Create a database with the sqlData.sql schema and num_tweets random tweets with hashtags.
+    """
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    cursor = connection.cursor()
+    with open(os.path.join(parent_dir, "sqlData.sql")) as f:
+        cursor.executescript(f.read())
+    cursor.executemany("INSERT OR IGNORE INTO hashtags VALUES (?);", [(word,) for word in WORDS])
+    users = [row[0] for row in cursor.execute("SELECT usr FROM users;")]
+    tweets = []
+    mentions = []
+    for tid in range(1000, 1000 + num_tweets):
+        words = rng.sample(WORDS, 4)
+        tag = rng.choice(WORDS)
+        tdate = f"20{rng.randint(15, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        tweets.append((tid, rng.choice(users), tdate, " ".join(words) + " #" + tag, None))
+        mentions.append((tid, tag))
+    cursor.executemany("INSERT INTO tweets VALUES (?, ?, ?, ?, ?);", tweets)
+    cursor.executemany("INSERT INTO mentions VALUES (?, ?);", mentions)
+    connection.commit()
+    search.install(connection, cursor)
+    return connection, cursor
+
+def legacy_search(connection, cursor, terms, keywords):
+    """
+    The search_tweet strategy this benchmark replaces: one query and commit per keyword,
+    then a quadratic list dedup and a Python sort of every match.
+    """
+    results = []
+    for term in terms:
+        cursor.execute("""
+                       select u.name, u.usr, t.tdate, t.text, t.tid
+                       from tweets t, mentions m, users u
+                       where t.tid = m.tid and t.writer = u.usr and m.term = ?;
+                       """, (term,))
+        results.append(cursor.fetchall())
+        connection.commit()
+    for keyword in keywords:
+        cursor.execute("""
+                       select u.name, u.usr, t.tdate, t.text, t.tid
+                       from tweets t, users u
+                       where t.writer = u.usr and t.text like ?
+                       """, ('%' + keyword + '%',))
+        results.append(cursor.fetchall())
+        connection.commit()
+    tweets = []
+    for rows in results:
+        for row in rows:
+            if row not in tweets:
+                tweets.append(row)
+    tweets.sort(key=lambda a: a[2], reverse=True)
+    return tweets[:5]
+
+def planned_search(connection, cursor, terms, keywords):
+    return search.search_tweets(cursor, terms, keywords, 5)
+
+def time_call(function, repeat, *args):
+    """
+    Return the median latency of function(*args) in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+def main():
+    parser = argparse.ArgumentParser(description="Tweet search latency against keyword count.")
+    parser.add_argument("--tweets", type=int, default=100000, help="number of synthetic tweets")
+    parser.add_argument("--max-keywords", type=int, default=8, help="largest keyword count to time")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (median is reported)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the planned query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        connection, cursor = build_database(os.path.join(directory, "bench.db"), args.tweets, args.seed)
+        print(f"{args.tweets} tweets, full-text index: {search.fts_enabled}")
+        print("{0:>8} | {1:>12} | {2:>12}".format("keywords", "legacy ms", "planned ms"))
+        for count in range(1, args.max_keywords + 1):
+            chosen = WORDS[:count]
+            # Alternate hashtags and plain keywords, as a user mixing both would
+            terms = chosen[0::2]
+            keywords = chosen[1::2]
+            planned = time_call(planned_search, args.repeat, connection, cursor, terms, keywords)
+            if args.skip_legacy:
+                legacy = "-"
+            else:
+                legacy = "{0:.2f}".format(time_call(legacy_search, args.repeat, connection, cursor, terms, keywords))
+            print("{0:>8} | {1:>12} | {2:>12.2f}".format(count, legacy, planned))
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
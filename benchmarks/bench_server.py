@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import server
+
+# Share of each operation in a session's requests, after its login
+MIX = [('feed', 50), ('search', 20), ('compose', 10), ('tweet_info', 10), ('follow', 5), ('retweet', 5)]
+SEARCH_KEYWORDS = ['tweet', '#fun', 'Nik', 'Bob tweet', '#bench']
+
+
+class Client:
+    """One session on the server: requests are sent one at a time and timed."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+
+    async def request(self, op, **fields):
+        self.next_id += 1
+        self.writer.write(json.dumps({'id': self.next_id, 'op': op, **fields}).encode() + b"\n")
+        await self.writer.drain()
+        response = json.loads(await self.reader.readline())
+        if not response['ok']:
+            raise RuntimeError(f"{op} failed: {response['error']}")
+        return response['result']
+
+def make_request(rng, users, tids):
+    """
+    @return: (op, fields) of a random request from MIX.
+    """
+    op = rng.choices([op for op, _ in MIX], [weight for _, weight in MIX])[0]
+    if op == 'search':
+        return op, {'keywords': rng.choice(SEARCH_KEYWORDS)}
+    if op == 'compose':
+        return op, {'text': f"load test {rng.random():.6f} #bench"}
+    if op == 'follow':
+        return op, {'usr': rng.randint(1, users)}
+    if op in ('retweet', 'tweet_info'):
+        return op, {'tid': rng.choice(tids)}
+    return op, {}
+
+async def session(host, port, usr, requests, seed, users, latencies):
+    """
+    Log in as usr and send requests random requests, recording each latency by op.
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    client = Client(reader, writer)
+    await client.request('login', usr=usr, password=f"pass{usr}")
+    tids = [row['tid'] for row in (await client.request('feed', limit=20))['rows']] or [1]
+    for _ in range(requests):
+        op, fields = make_request(rng, users, tids)
+        if op == 'follow' and fields['usr'] == usr:
+            op, fields = 'feed', {}
+        start = time.perf_counter()
+        await client.request(op, **fields)
+        latencies.setdefault(op, []).append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+async def load(args):
+    latencies = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(session(args.host, args.port, n % args.users + 1, args.requests,
+                                   args.seed + n, args.users, latencies)
+                           for n in range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    print("{0:>10} | {1:>8} | {2:>10} | {3:>10}".format("op", "requests", "p50 (ms)", "p99 (ms)"))
+    everything = []
+    for op, values in sorted(latencies.items()):
+        everything += values
+        print("{0:>10} | {1:>8} | {2:>10.2f} | {3:>10.2f}".format(
+            op, len(values), percentile(values, 0.5) * 1000, percentile(values, 0.99) * 1000))
+    print("{0:>10} | {1:>8} | {2:>10.2f} | {3:>10.2f}".format(
+        "all", len(everything), percentile(everything, 0.5) * 1000, percentile(everything, 0.99) * 1000))
+    print(f"{len(everything) / elapsed:.0f} requests/s from {args.clients} clients in {elapsed:.2f}s")
+
+def wait_for_server(host, port, timeout=30):
+    async def probe():
+        _, writer = await asyncio.open_connection(host, port)
+        writer.close()
+        await writer.wait_closed()
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            asyncio.run(probe())
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent sessions against `main.py --serve`.")
+    parser.add_argument("--host", default=server.DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=server.DEFAULT_PORT)
+    parser.add_argument("--clients", type=int, default=50, help="concurrent sessions")
+    parser.add_argument("--requests", type=int, default=200, help="requests per session after login")
+    parser.add_argument("--users", type=int, default=6,
+                        help="sessions log in as users 1..N with password passN, as in sqlData.sql")
+    parser.add_argument("--spawn", metavar="DATABASE",
+                        help="start `main.py DATABASE --serve` for the run instead of using a running server")
+    parser.add_argument("--workers", type=int, default=server.DEFAULT_WORKERS, help="worker threads of a spawned server")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    process = None
+    if args.spawn:
+        process = subprocess.Popen([sys.executable, os.path.join(parent_dir, "main.py"), args.spawn, "--serve",
+                                    "--host", args.host, "--port", str(args.port), "--workers", str(args.workers)])
+        wait_for_server(args.host, args.port)
+    try:
+        asyncio.run(load(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
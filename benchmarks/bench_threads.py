@@ -0,0 +1,158 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import generate
+import service
+import threads
+
+# Synthetic conversations added to a generated database: name -> (replies per tweet, levels)
+SHAPES = {
+    'deep': (1, 5000),
+    'wide': (20000, 1),
+    'bushy': (6, 6),
+}
+PAGE_SIZE = threads.DEFAULT_WIDTH
+# One tweet, with the columns of a thread row
+TWEET = """
+    SELECT t.tid, t.replyto, u.usr, u.name, t.tdate, t.text, COALESCE(s.reply_count, 0)
+    FROM tweets t
+     JOIN users u ON u.usr = t.writer
+     LEFT JOIN tweet_stats s ON s.tid = t.tid
+    WHERE t.tid = ?;
+"""
+
+
+def build(cursor, root, branching, levels, users):
+    """
+    Reply to root with branching replies per tweet, levels deep, dated a second apart.
+    @param users: number of generated users; replies are written by users 1 to users.
+    @return: tids of the replies by level, level 1 first.
+    """
+    cursor.execute("SELECT MAX(tid) FROM tweets;")
+    tid = cursor.fetchone()[0]
+    tier = [root]
+    result = []
+    rows = []
+    for level in range(levels):
+        following = []
+        for parent in tier:
+            for _ in range(branching):
+                tid += 1
+                rows.append((tid, 1 + tid % users, f"2030-01-01 00:00:{len(rows):08d}",
+                             f"reply at level {level + 1}", parent))
+                following.append(tid)
+        result.append(following)
+        tier = following
+    cursor.executemany("INSERT INTO tweets VALUES (?, ?, ?, ?, ?);", rows)
+    return result
+
+def walk(cursor, tid, ancestors, depth, width, nodes):
+    """
+    What read_thread replaces: one query per tweet, up the chain of tweets replied to and then
+    down each tweet's replies, each reading the same columns read_thread does.
+    @return: list of (tid, level) in read_thread order.
+    """
+    above = []
+    current = tid
+    cursor.execute(TWEET, (current,))
+    replyto = cursor.fetchone()[1]
+    while replyto is not None and replyto != current and len(above) < ancestors:
+        above.insert(0, (replyto, -len(above) - 1))
+        current = replyto
+        cursor.execute(TWEET, (current,))
+        replyto = cursor.fetchone()[1]
+    # Breadth first, as read_thread cuts at nodes, then ordered depth first
+    below = {}
+    tier = [tid]
+    read = 0
+    for level in range(1, depth + 1):
+        following = []
+        for parent in tier:
+            cursor.execute(threads.READ_REPLIES, (parent, width))
+            children = [row[0] for row in cursor.fetchall()][:max(0, nodes - read)]
+            read += len(children)
+            below[parent] = children
+            following.extend(children)
+        tier = following
+
+    def order(parent, level):
+        rows = []
+        for child in below.get(parent, []):
+            rows.append((child, level + 1))
+            rows.extend(order(child, level + 1))
+        return rows
+
+    return above + [(tid, 0)] + order(tid, 0)
+
+def median_ms(function, repeat, *args):
+    """
+    @return: median latency of function(*args) in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversation reads on deep, wide and bushy threads.")
+    parser.add_argument("--users", type=int, default=1000, help="number of generated users")
+    parser.add_argument("--tweets", type=int, default=100000, help="number of generated tweets")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per read (median is reported)")
+    parser.add_argument("--depth", type=int, default=threads.DEFAULT_DEPTH, help="levels of replies read")
+    parser.add_argument("--width", type=int, default=threads.DEFAULT_WIDTH, help="replies read per tweet")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "threads.db")
+        generate.generate(path, args.users, args.tweets, follows=1, seed=args.seed, report=lambda line: None)
+        connection = sqlite3.connect(path)
+        cursor = connection.cursor()
+        service.install(connection, cursor)
+        # Each shape hangs off its own root tweet; opened at the root and at its deepest reply
+        opened = {}
+        for root, (name, (branching, levels)) in enumerate(SHAPES.items(), start=1):
+            replies = build(cursor, root, branching, levels, args.users)
+            opened[f"{name} root"] = root
+            opened[f"{name} leaf"] = replies[-1][-1]
+        connection.commit()
+        cursor.execute("ANALYZE;")
+
+        print(f"{args.tweets} generated tweets, depth {args.depth}, width {args.width}, "
+              f"median of {args.repeat} runs")
+        print("{0:>12} | {1:>6} | {2:>9} | {3:>9} | {4:>7}".format("opened at", "rows", "CTE ms", "walk ms", "speedup"))
+        for name, tid in opened.items():
+            limits = (threads.DEFAULT_ANCESTORS, args.depth, args.width, threads.MAX_NODES)
+            thread = threads.read_thread(cursor, tid, *limits)
+            if [(row[0], row[2]) for row in thread] != walk(cursor, tid, *limits):
+                raise AssertionError(f"read_thread and the walk disagree on the {name}")
+            cte = median_ms(threads.read_thread, args.repeat, cursor, tid, *limits)
+            walked = median_ms(walk, args.repeat, cursor, tid, *limits)
+            print("{0:>12} | {1:>6} | {2:>9.2f} | {3:>9.2f} | {4:>6.1f}x".format(
+                name, len(thread), cte, walked, walked / cte))
+
+        # Keyset of the last page of the wide root's replies
+        page, after = threads.read_replies(cursor, 2, PAGE_SIZE)
+        pages, last = 1, None
+        while after is not None:
+            last = after
+            page, after = threads.read_replies(cursor, 2, PAGE_SIZE, after)
+            pages += 1
+        first = median_ms(threads.read_replies, args.repeat, cursor, 2, PAGE_SIZE)
+        final = median_ms(threads.read_replies, args.repeat, cursor, 2, PAGE_SIZE, last)
+        print(f"\nExpanding the wide root, {PAGE_SIZE} replies a page: "
+              f"page 1 {first:.3f} ms, page {pages} {final:.3f} ms")
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
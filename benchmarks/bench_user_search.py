@@ -0,0 +1,137 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import generate
+import search
+
+# Keywords by how many users they match: generated names are a first and a last name from
+# short lists, so name fragments match thousands of users and full names far fewer
+KEYWORDS = {
+    'fragment': ['smi', 'ann', 'okaf', 'lee'],
+    'full name': ['Bob Smith', 'Priya Patel', 'Kofi Okafor', 'Hana Novak'],
+    'city': ['calg', 'Medicine', 'knife', 'St. '],
+    'no match': ['zzq', 'Xavier', 'Atlantis'],
+}
+# Keyword and pages for the deep pagination comparison
+DEEP_KEYWORD = 'smi'
+DEEP_PAGES = [1, 10, 100, 1000]
+PAGE_SIZE = 5
+
+
+def database_for(directory, users, seed):
+    """
+    @return: path of a generated database with that many users, generated once and reused by later runs.
+    Only users matter here, so tweets and follows are kept small.
+    """
+    path = os.path.join(directory, f"users-{users}-s{seed}.db")
+    if not os.path.exists(path):
+        print(f"Generating {path}")
+        try:
+            generate.generate(path, users, users // 100, follows=1, seed=seed)
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+    return path
+
+def user_search(cursor, keyword):
+    """search_user: the first page of names and of cities."""
+    return [search.search_users(cursor, column, keyword, PAGE_SIZE) for column in search.USER_COLUMNS]
+
+def offset_page(cursor, column, keyword, page_number):
+    """
+    The pagination this benchmark replaces: a COUNT of every match to find the last page,
+    then LIMIT/OFFSET, which sorts and skips every row before the page.
+    """
+    condition, params = search.user_filter(column, keyword)
+    cursor.execute(f"SELECT COUNT(*) FROM users u WHERE {condition};", params)
+    cursor.fetchone()
+    cursor.execute(f"""
+                   SELECT u.usr, u.name
+                   FROM users u
+                   WHERE {condition}
+                   ORDER BY LENGTH(u.{column}), u.{column}, u.usr
+                   LIMIT ? OFFSET ?;
+                   """, params + (PAGE_SIZE, (page_number - 1) * PAGE_SIZE))
+    return cursor.fetchall()
+
+def median_ms(function, repeat, *args):
+    """
+    @return: median latency of function(*args) in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+def time_keywords(cursor, keywords, repeat):
+    """
+    @return: median latency in milliseconds of a user search for each keyword, summed.
+    """
+    return sum(median_ms(user_search, repeat, cursor, keyword) for keyword in keywords)
+
+def compare_deep_pages(cursor, repeat):
+    """
+    Time single pages of a common keyword's name matches, OFFSET against keyset.
+    """
+    print(f"\nPages of {PAGE_SIZE} names containing '{DEEP_KEYWORD}'")
+    print("{0:>10} | {1:>10} | {2:>10}".format("page", "OFFSET ms", "keyset ms"))
+    # Keyset of the page numbered page_number
+    after = None
+    page_number = 1
+    for target in DEEP_PAGES:
+        # Walk to the page untimed, as a user paging through the menu would have
+        while page_number < target:
+            page, after = search.search_users(cursor, 'name', DEEP_KEYWORD, PAGE_SIZE, after)
+            if after is None:
+                return
+            page_number += 1
+        keyset = median_ms(search.search_users, repeat, cursor, 'name', DEEP_KEYWORD, PAGE_SIZE, after)
+        keyset_page = search.search_users(cursor, 'name', DEEP_KEYWORD, PAGE_SIZE, after)[0]
+        if [tuple(hit) for hit in keyset_page] != offset_page(cursor, 'name', DEEP_KEYWORD, target):
+            raise AssertionError(f"OFFSET and keyset disagree on page {target}")
+        offset = median_ms(offset_page, repeat, cursor, 'name', DEEP_KEYWORD, target)
+        print("{0:>10} | {1:>10.2f} | {2:>10.2f}".format(target, offset, keyset))
+
+def main():
+    parser = argparse.ArgumentParser(description="User search latency with and without the trigram index.")
+    parser.add_argument("--users", type=int, default=1000000, help="number of generated users")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per keyword (median is reported)")
+    parser.add_argument("--databases", default=os.path.join(tempfile.gettempdir(), "tweeter-bench"),
+                        help="directory where generated databases are kept between runs")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.makedirs(args.databases, exist_ok=True)
+    connection = sqlite3.connect(database_for(args.databases, args.users, args.seed))
+    cursor = connection.cursor()
+    if not search.install(connection, cursor):
+        print("This SQLite build has no FTS5 trigram support; there is nothing to compare.")
+        return
+    print(f"{args.users} users, median of {args.repeat} runs per keyword, first page of both columns")
+    print("{0:>10} | {1:>10} | {2:>10} | {3:>7}".format("keywords", "LIKE ms", "trigram ms", "speedup"))
+    for category, keywords in KEYWORDS.items():
+        trigram = time_keywords(cursor, keywords, args.repeat)
+        indexed = [user_search(cursor, keyword) for keyword in keywords]
+        search.fts_enabled = False
+        like = time_keywords(cursor, keywords, args.repeat)
+        scanned = [user_search(cursor, keyword) for keyword in keywords]
+        search.fts_enabled = True
+        if indexed != scanned:
+            raise AssertionError(f"The trigram index and LIKE disagree on {category} keywords")
+        print("{0:>10} | {1:>10.2f} | {2:>10.2f} | {3:>6.1f}x".format(category, like, trigram, like / trigram))
+    compare_deep_pages(cursor, args.repeat)
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
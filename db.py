@@ -0,0 +1,145 @@
+import json
+import logging
+import sqlite3
+import querytrace
+
+logger = logging.getLogger("tweeter")
+
+# Connection presets. Every setting maps to the PRAGMA of the same name.
+#   safe:      SQLite's own defaults: rollback journal, a full sync on every commit.
+#   balanced:  WAL so readers and the writer don't block each other, sync only at checkpoints.
+#   fast:      balanced plus a large cache and memory map; commits are not synced at all,
+#              so a power loss can drop the last transactions (the database stays intact).
+PRESETS = {
+    'safe': {
+        'journal_mode': 'delete',
+        'synchronous': 'full',
+        'cache_size': -2000,
+        'mmap_size': 0,
+        'temp_store': 'default',
+        'busy_timeout': 5000,
+    },
+    'balanced': {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'cache_size': -16000,
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'memory',
+        'busy_timeout': 5000,
+    },
+    'fast': {
+        'journal_mode': 'wal',
+        'synchronous': 'off',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'memory',
+        'busy_timeout': 5000,
+    },
+}
+
+DEFAULT_PRESET = 'balanced'
+
+# Accepted values of the settings that are keywords rather than numbers.
+CHOICES = {
+    'journal_mode': ['delete', 'truncate', 'persist', 'memory', 'wal', 'off'],
+    'synchronous': ['off', 'normal', 'full', 'extra'],
+    'temp_store': ['default', 'file', 'memory'],
+}
+
+# Applied in this order: journal_mode first since synchronous=normal is only safe under WAL.
+SETTINGS = ['journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store', 'busy_timeout']
+
+
+def load_config(path):
+    """
+    Read connection settings from a JSON file, e.g. {"preset": "fast", "cache_size": -128000}.
+    @param path: file path to the config file.
+    @return: dict of settings, possibly including a "preset" key.
+    """
+    with open(path) as f:
+        config = json.load(f)
+    unknown = set(config) - set(SETTINGS) - {'preset'}
+    if unknown:
+        raise ValueError(f"Unknown database settings in {path}: {', '.join(sorted(unknown))}")
+    return config
+
+def resolve_settings(preset=None, config=None, overrides=None):
+    """
+    Combine a preset, a config file and explicit overrides, later ones winning.
+    @param preset: name of a preset in PRESETS. The config file's preset, then DEFAULT_PRESET, are used when None.
+    @param config: dict returned by load_config, or None.
+    @param overrides: dict of settings given on the command line; None values are ignored.
+    @return: dict with a value for every setting in SETTINGS.
+    """
+    config = dict(config or {})
+    name = preset or config.pop('preset', None) or DEFAULT_PRESET
+    config.pop('preset', None)
+    if name not in PRESETS:
+        raise ValueError(f"Unknown database preset: {name}")
+    settings = dict(PRESETS[name])
+    settings.update(config)
+    settings.update({key: value for key, value in (overrides or {}).items() if value is not None})
+    for key in SETTINGS:
+        if key in CHOICES:
+            settings[key] = str(settings[key]).lower()
+            if settings[key] not in CHOICES[key]:
+                raise ValueError(f"Invalid {key}: {settings[key]}")
+        else:
+            settings[key] = int(settings[key])
+    return settings
+
+
+class Connection(sqlite3.Connection):
+    """
+    sqlite3.Connection that can be weakly referenced, so per-connection state such as
+    profiles.cache_for's is freed with the connection.
+    """
+
+
+def open_database(path, settings=None, tracer=None):
+    """
+    Open a connection with foreign keys enforced and the given settings applied.
+    @param path: file path to the database.
+    @param settings: dict from resolve_settings. The default preset is used when None.
+    @param tracer: querytrace.Tracer to record every statement run on the connection, or None.
+    @return: the connection.
+    """
+    if settings is None:
+        settings = resolve_settings()
+    if tracer is None:
+        connection = sqlite3.connect(path, timeout=settings['busy_timeout'] / 1000, factory=Connection)
+    else:
+        connection = sqlite3.connect(path, timeout=settings['busy_timeout'] / 1000,
+                                     factory=querytrace.TracedConnection, tracer=tracer)
+    cursor = connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON;")
+    for key in SETTINGS:
+        # Values were validated by resolve_settings, PRAGMA arguments can't be bound as parameters
+        cursor.execute(f"PRAGMA {key}={settings[key]};")
+        cursor.fetchall()
+    cursor.close()
+    return connection
+
+def effective_settings(connection):
+    """
+    Read back the settings SQLite is actually using, which can differ from the ones asked for
+    (e.g. an in-memory database can't use WAL).
+    @return: dict of setting name to value.
+    """
+    cursor = connection.cursor()
+    effective = {}
+    for key in ['foreign_keys'] + SETTINGS:
+        cursor.execute(f"PRAGMA {key};")
+        row = cursor.fetchone()
+        # mmap_size reports nothing for databases that can't be memory mapped
+        if row is not None:
+            effective[key] = row[0]
+    cursor.close()
+    return effective
+
+def log_settings(path, connection):
+    """
+    Log the effective settings of a newly opened database.
+    """
+    effective = effective_settings(connection)
+    logger.info("Opened %s with %s", path, ", ".join(f"{key}={value}" for key, value in effective.items()))
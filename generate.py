@@ -0,0 +1,235 @@
+import argparse
+import itertools
+import os
+import random
+import time
+from datetime import date, timedelta
+import db
+import service
+
+# Vocabulary the generated names, cities and tweets are drawn from
+FIRST_NAMES = ['Nik', 'Bob', 'Bill', 'John', 'Matt', 'Luke', 'Anna', 'Maria', 'Wei', 'Priya', 'Omar', 'Sofia',
+               'Liam', 'Emma', 'Noah', 'Olivia', 'Ava', 'Lucas', 'Mia', 'Ethan', 'Chloe', 'Ravi', 'Yuki', 'Ines',
+               'Kofi', 'Lena', 'Diego', 'Sara', 'Ali', 'Hana']
+LAST_NAMES = ['Smith', 'Brown', 'Tremblay', 'Martin', 'Roy', 'Wilson', 'Macdonald', 'Gagnon', 'Taylor', 'Lee',
+              'White', 'Campbell', 'Anderson', 'Singh', 'Chen', 'Wong', 'Nguyen', 'Patel', 'Kim', 'Garcia',
+              'Longlastname', 'Lopez', 'Kowalski', 'Muller', 'Rossi', 'Silva', 'Khan', 'Sato', 'Okafor', 'Novak']
+CITIES = ['Edmonton', 'Calgary', 'Red Deer', 'Medicine Hat', 'Lethbridge', 'Vancouver', 'Victoria', 'Toronto',
+          'Ottawa', 'Montreal', 'Quebec City', 'Winnipeg', 'Regina', 'Saskatoon', 'Halifax', 'St. John\'s',
+          'Fredericton', 'Charlottetown', 'Whitehorse', 'Yellowknife', 'Iqaluit', 'Kelowna', 'Kamloops',
+          'Banff', 'Jasper', 'Grande Prairie', 'Fort McMurray', 'Airdrie', 'St. Albert', 'Sherwood Park']
+WORDS = ['tweet', 'today', 'great', 'game', 'news', 'coffee', 'weather', 'snow', 'hockey', 'music', 'movie',
+         'work', 'school', 'weekend', 'fun', 'travel', 'food', 'love', 'city', 'night', 'morning', 'team', 'win',
+         'lost', 'new', 'best', 'happy', 'time', 'people', 'day', 'road', 'trip', 'book', 'code', 'data',
+         'python', 'database', 'query', 'index', 'search', 'friends', 'family', 'party', 'rain', 'sun']
+
+START_DATE = date(2015, 1, 1)
+DAYS = 3650
+
+# Skew of the follow graph and of who tweets: user at rank r is weighted 1 / r**SKEW
+SKEW = 0.9
+# Shape of the out-degree distribution (Pareto); lower is heavier tailed
+DEGREE_SHAPE = 2.0
+MAX_FOLLOWING = 5000
+
+
+def dates():
+    """
+    @return: the DAYS date strings from START_DATE on, as SQLite stores them.
+    """
+    return [str(START_DATE + timedelta(days=day)) for day in range(DAYS)]
+
+def ranking(rng, users):
+    """
+    Rank users in a random order, e.g. by popularity or by how much they tweet.
+    @return: (user ids from first to last rank, cumulative weights for rng.choices).
+    """
+    order = list(range(1, users + 1))
+    rng.shuffle(order)
+    weights = list(itertools.accumulate(1 / rank ** SKEW for rank in range(1, users + 1)))
+    return order, weights
+
+def user_rows(rng, users):
+    for usr in range(1, users + 1):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        yield (usr, f"pass{usr}", name, f"user{usr}@email.com", rng.choice(CITIES), rng.randint(-8, -3))
+
+def follow_rows(rng, users, mean, order, weights, days):
+    """
+    Power-law follow graph: out-degrees are Pareto distributed around mean, and followees are
+    picked by popularity so in-degrees are power-law distributed too.
+    Rows come out sorted by (flwer, flwee), the primary key order.
+    """
+    # The mean of paretovariate(shape) is shape / (shape - 1)
+    scale = mean * (DEGREE_SHAPE - 1) / DEGREE_SHAPE
+    for flwer in range(1, users + 1):
+        degree = min(int(rng.paretovariate(DEGREE_SHAPE) * scale), MAX_FOLLOWING, users - 1)
+        followees = set(rng.choices(order, cum_weights=weights, k=degree))
+        followees.discard(flwer)
+        for flwee in sorted(followees):
+            yield (flwer, flwee, rng.choice(days))
+
+def tweet_batches(rng, tweets, order, weights, terms, term_weights, days, reply_ratio, hashtag_ratio, batch):
+    """
+    Tweets in tid order, with their mentions. Writers are picked from order, later tids are never
+    dated earlier, and replies point at a recent earlier tweet.
+    @return: generator of (tweet rows, mention rows) per batch.
+    """
+    for first in range(1, tweets + 1, batch):
+        last = min(first + batch, tweets + 1)
+        writers = rng.choices(order, cum_weights=weights, k=last - first)
+        tweet_rows = []
+        mention_rows = []
+        for tid, writer in zip(range(first, last), writers):
+            text = " ".join(rng.choices(WORDS, k=rng.randint(3, 10)))
+            if rng.random() < hashtag_ratio:
+                tags = list(dict.fromkeys(rng.choices(terms, cum_weights=term_weights, k=rng.randint(1, 3))))
+                text += " " + " ".join("#" + tag for tag in tags)
+                mention_rows.extend((tid, tag) for tag in tags)
+            replyto = None
+            if tid > 1 and rng.random() < reply_ratio:
+                replyto = max(1, tid - 1 - int(rng.expovariate(1 / 1000)))
+            tweet_rows.append((tid, writer, days[(tid - 1) * DAYS // tweets], text, replyto))
+        yield tweet_rows, mention_rows
+
+def retweet_rows(rng, users, tweets, count, days):
+    """
+    Retweets by random users of random tweets, a few days after the tweet.
+    Repeated (usr, tid) pairs are left to INSERT OR IGNORE.
+    """
+    for _ in range(count):
+        tid = rng.randint(1, tweets)
+        day = min(DAYS - 1, (tid - 1) * DAYS // tweets + int(rng.expovariate(1 / 3)))
+        yield (rng.randint(1, users), tid, days[day])
+
+def load(connection, cursor, sql, rows, batch):
+    """
+    Insert rows with executemany, committing every batch rows.
+    @return: number of rows inserted.
+    """
+    count = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, batch))
+        if not chunk:
+            return count
+        cursor.executemany(sql, chunk)
+        connection.commit()
+        count += len(chunk)
+
+def create_schema(cursor):
+    """
+    Create the tables of sqlData.sql, without its sample rows.
+    """
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "sqlData.sql")) as f:
+        cursor.executescript(f.read())
+    for table in ['includes', 'lists', 'retweets', 'mentions', 'hashtags', 'tweets', 'follows', 'users']:
+        cursor.execute(f"DELETE FROM {table};")
+
+def generate(path, users, tweets, follows=20, retweet_ratio=0.1, reply_ratio=0.2, hashtag_ratio=0.3,
+             terms=10000, seed=1, batch=200000, derived=True, report=print):
+    """
+    Write a synthetic database to a new file. The same arguments always produce the same rows.
+    Base tables are loaded first with only their primary keys; the secondary indexes and derived
+    tables (home timeline, search index, counters) are created and backfilled afterwards, which
+    is much faster than maintaining them row by row.
+    @param path: file to create; it must not exist.
+    @param users: number of users.
+    @param tweets: number of tweets.
+    @param follows: mean number of users each user follows.
+    @param retweet_ratio: retweets generated per tweet.
+    @param reply_ratio: share of tweets that are replies.
+    @param hashtag_ratio: share of tweets with hashtags.
+    @param terms: number of distinct hashtags.
+    @param seed: random seed.
+    @param batch: rows per executemany and transaction.
+    @param derived: install the derived tables. When False, main.connect installs them on first open.
+    @param report: called with a progress line per step.
+    @return: dict of table name to row count.
+    """
+    if os.path.exists(path):
+        raise ValueError(f"{path} already exists")
+    # Nothing to protect until the load is done: no journal, no syncs, no foreign key checks
+    connection = db.open_database(path, db.resolve_settings('fast', None, {'journal_mode': 'off',
+                                                                           'cache_size': -256000}))
+    cursor = connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=OFF;")
+    create_schema(cursor)
+    connection.commit()
+
+    day_strings = dates()
+    counts = {}
+    started = time.perf_counter()
+
+    def step(table, count):
+        counts[table] = count
+        report(f"{table:>10}: {count} rows ({time.perf_counter() - started:.1f}s)")
+
+    rng = random.Random(f"{seed}-users")
+    step('users', load(connection, cursor, "INSERT INTO users VALUES (?, ?, ?, ?, ?, ?);",
+                       user_rows(rng, users), batch))
+
+    # Who is followed and who tweets are ranked independently; tying them together makes every
+    # heavy tweeter a celebrity and the timeline fan-out grows far beyond the follow count
+    order, weights = ranking(random.Random(f"{seed}-popularity"), users)
+
+    rng = random.Random(f"{seed}-follows")
+    step('follows', load(connection, cursor, "INSERT INTO follows VALUES (?, ?, ?);",
+                         follow_rows(rng, users, follows, order, weights, day_strings), batch))
+
+    rng = random.Random(f"{seed}-hashtags")
+    term_list = (WORDS + [f"topic{n}" for n in range(terms)])[:terms]
+    term_weights = list(itertools.accumulate(1 / rank ** SKEW for rank in range(1, len(term_list) + 1)))
+    step('hashtags', load(connection, cursor, "INSERT INTO hashtags VALUES (?);",
+                          ((term,) for term in term_list), batch))
+
+    rng = random.Random(f"{seed}-tweets")
+    writers, writer_weights = ranking(random.Random(f"{seed}-activity"), users)
+    tweet_count = 0
+    mention_count = 0
+    for tweet_rows, mention_rows in tweet_batches(rng, tweets, writers, writer_weights, term_list, term_weights,
+                                                  day_strings, reply_ratio, hashtag_ratio, batch):
+        cursor.executemany("INSERT INTO tweets VALUES (?, ?, ?, ?, ?);", tweet_rows)
+        cursor.executemany("INSERT INTO mentions VALUES (?, ?);", mention_rows)
+        connection.commit()
+        tweet_count += len(tweet_rows)
+        mention_count += len(mention_rows)
+    step('tweets', tweet_count)
+    step('mentions', mention_count)
+
+    rng = random.Random(f"{seed}-retweets")
+    load(connection, cursor, "INSERT OR IGNORE INTO retweets VALUES (?, ?, ?);",
+         retweet_rows(rng, users, tweets, int(tweets * retweet_ratio), day_strings), batch)
+    cursor.execute("SELECT COUNT(*) FROM retweets;")
+    step('retweets', cursor.fetchone()[0])
+
+    if derived:
+        service.install(connection, cursor)
+        report(f"   derived: installed ({time.perf_counter() - started:.1f}s)")
+    cursor.execute("ANALYZE;")
+    connection.commit()
+    connection.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic Tweeter database to a new file.")
+    parser.add_argument("database", help="file to create")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--tweets", type=int, default=100000)
+    parser.add_argument("--follows", type=int, default=20, help="mean number of users each user follows")
+    parser.add_argument("--retweet-ratio", type=float, default=0.1, help="retweets per tweet")
+    parser.add_argument("--reply-ratio", type=float, default=0.2, help="share of tweets that are replies")
+    parser.add_argument("--hashtag-ratio", type=float, default=0.3, help="share of tweets with hashtags")
+    parser.add_argument("--terms", type=int, default=10000, help="distinct hashtags")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--batch", type=int, default=200000, help="rows per transaction")
+    parser.add_argument("--no-derived", action="store_true",
+                        help="skip the timeline, search index and counters; main.py builds them on first open")
+    args = parser.parse_args()
+    generate(args.database, args.users, args.tweets, args.follows, args.retweet_ratio, args.reply_ratio,
+             args.hashtag_ratio, args.terms, args.seed, args.batch, not args.no_derived)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import queries
+
+# Next free id per table. Bumping a row here is the first write of the inserting transaction,
+# so concurrent writers are serialized by SQLite's write lock and never hand out the same id.
+IDS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS id_sequences (
+  name        text,
+  next_id     int,
+  primary key (name)
+);
+"""
+
+# The table and key column each sequence allocates for.
+SEQUENCES = {
+    'tweets': ('tweets', 'tid'),
+    'users': ('users', 'usr'),
+}
+
+# The upsert that claims ids from each sequence
+CLAIM = {name: queries.register(f'allocate_{name}', f"""
+    INSERT INTO id_sequences (name, next_id)
+    VALUES (?, (SELECT IFNULL(MAX({column}), 0) + 1 FROM {table}) + ?)
+    ON CONFLICT (name) DO UPDATE
+    SET next_id = MAX(next_id, (SELECT IFNULL(MAX({column}), 0) + 1 FROM {table})) + ?;
+""", (name, 1, 1)) for name, (table, column) in SEQUENCES.items()}
+
+CLAIMED = queries.register('allocated_id', """
+    SELECT next_id - ? FROM id_sequences WHERE name = ?;
+""", (1, 'tweets'))
+
+
+def install(connection, cursor):
+    """
+    Create the id_sequences table.
+    Sequences are seeded lazily from the table's largest id the first time they are used.
+    @param connection: database connection.
+    @param cursor: cursor on the connection.
+    """
+    cursor.executescript(IDS_SCHEMA)
+
+def allocate(cursor, name, count=1):
+    """
+    Claim count consecutive ids from a sequence inside the caller's transaction.
+    The ids are only used up once the caller commits; a rollback gives them back.
+    Ids written without the allocator (e.g. sqlData.sql) are skipped over, using the
+    primary key index to find the largest one.
+    @param name: a key of SEQUENCES.
+    @param count: number of ids to claim.
+    @return: the first id claimed.
+    """
+    cursor.execute(CLAIM[name], (name, count, count))
+    cursor.execute(CLAIMED, (count, name))
+    return cursor.fetchone()[0]
+
+def reserve(connection, cursor, name, count):
+    """
+    Claim a block of ids for a bulk loader and commit the claim straight away,
+    so other writers can keep allocating while the block is being filled.
+    @param name: a key of SEQUENCES.
+    @param count: number of ids to claim.
+    @return: range of the ids claimed.
+    """
+    first = allocate(cursor, name, count)
+    connection.commit()
+    return range(first, first + count)
@@ -0,0 +1,78 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import db
+from main import parse_args
+
+
+class TestDb(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_config(self, config):
+        path = os.path.join(self.directory.name, "db.json")
+        with open(path, "w") as f:
+            json.dump(config, f)
+        return path
+
+    def test_default_preset(self):
+        self.assertEqual(db.resolve_settings(), db.PRESETS[db.DEFAULT_PRESET])
+
+    def test_precedence(self):
+        config = db.load_config(self.write_config({"preset": "fast", "cache_size": -1000, "synchronous": "FULL"}))
+        settings = db.resolve_settings(None, config, {"cache_size": -500, "mmap_size": None})
+        self.assertEqual(settings["journal_mode"], "wal")
+        self.assertEqual(settings["synchronous"], "full")
+        self.assertEqual(settings["cache_size"], -500)
+        self.assertEqual(settings["mmap_size"], db.PRESETS["fast"]["mmap_size"])
+        # An explicit preset wins over the config file's
+        self.assertEqual(db.resolve_settings("safe", config)["journal_mode"], "delete")
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            db.resolve_settings("turbo")
+        with self.assertRaises(ValueError):
+            db.resolve_settings(None, {"journal_mode": "wal; DROP TABLE users"})
+        with self.assertRaises(ValueError):
+            db.resolve_settings(None, {"cache_size": "lots"})
+        with self.assertRaises(ValueError):
+            db.load_config(self.write_config({"page_size": 4096}))
+
+    def test_open_database_applies_settings(self):
+        path = os.path.join(self.directory.name, "test.db")
+        settings = db.resolve_settings("balanced", None, {"cache_size": -4000, "busy_timeout": 1234})
+        connection = db.open_database(path, settings)
+        effective = db.effective_settings(connection)
+        connection.close()
+        self.assertEqual(effective["foreign_keys"], 1)
+        self.assertEqual(effective["journal_mode"], "wal")
+        self.assertEqual(effective["synchronous"], 1)
+        self.assertEqual(effective["cache_size"], -4000)
+        self.assertEqual(effective["temp_store"], 2)
+        self.assertEqual(effective["busy_timeout"], 1234)
+
+    def test_log_settings(self):
+        connection = db.open_database(":memory:", db.resolve_settings("safe"))
+        with self.assertLogs("tweeter", level="INFO") as logs:
+            db.log_settings(":memory:", connection)
+        connection.close()
+        self.assertIn("journal_mode=memory", logs.output[0])
+
+    def test_parse_args(self):
+        args = parse_args(["other.db", "--preset", "fast", "--cache-size", "-8000"])
+        self.assertEqual(args.database, "other.db")
+        self.assertEqual(args.preset, "fast")
+        self.assertEqual(args.cache_size, -8000)
+        self.assertEqual(parse_args([]).database, "./test1.db")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,84 @@
+import unittest
+import os
+import sqlite3
+import sys
+import tempfile
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import generate
+import search
+import stats
+
+USERS = 300
+TWEETS = 3000
+
+
+class TestGenerate(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+        search.fts_enabled = False
+
+    def generate(self, name, seed=1, derived=False):
+        path = os.path.join(self.directory.name, name)
+        counts = generate.generate(path, USERS, TWEETS, seed=seed, batch=1000, derived=derived,
+                                   report=lambda line: None)
+        connection = sqlite3.connect(path)
+        self.addCleanup(connection.close)
+        return counts, connection.cursor()
+
+    def dump(self, cursor):
+        rows = []
+        for table in ['users', 'follows', 'tweets', 'mentions', 'retweets']:
+            cursor.execute(f"SELECT * FROM {table} ORDER BY 1, 2;")
+            rows.append(cursor.fetchall())
+        return rows
+
+    def test_counts_and_integrity(self):
+        counts, cursor = self.generate("a.db")
+        self.assertEqual(counts['users'], USERS)
+        self.assertEqual(counts['tweets'], TWEETS)
+        cursor.execute("SELECT COUNT(*) FROM follows;")
+        self.assertEqual(cursor.fetchone()[0], counts['follows'])
+        cursor.execute("PRAGMA foreign_key_check;")
+        self.assertEqual(cursor.fetchall(), [])
+        cursor.execute("SELECT COUNT(*) FROM follows WHERE flwer = flwee;")
+        self.assertEqual(cursor.fetchone()[0], 0)
+        # Replies only point back in time, and dates never go backwards as tids grow
+        cursor.execute("SELECT COUNT(*) FROM tweets WHERE replyto >= tid;")
+        self.assertEqual(cursor.fetchone()[0], 0)
+        cursor.execute("SELECT COUNT(*) FROM tweets a JOIN tweets b ON b.tid = a.tid + 1 WHERE b.tdate < a.tdate;")
+        self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_follow_graph_is_skewed(self):
+        _, cursor = self.generate("a.db")
+        cursor.execute("SELECT COUNT(*) FROM follows GROUP BY flwee ORDER BY 1 DESC;")
+        followers = [row[0] for row in cursor.fetchall()]
+        self.assertGreater(followers[0], 5 * followers[len(followers) // 2])
+
+    def test_deterministic(self):
+        _, first = self.generate("a.db", seed=7)
+        _, second = self.generate("b.db", seed=7)
+        _, other = self.generate("c.db", seed=8)
+        self.assertEqual(self.dump(first), self.dump(second))
+        self.assertNotEqual(self.dump(first), self.dump(other))
+
+    def test_derived_tables(self):
+        _, cursor = self.generate("a.db", derived=True)
+        self.assertEqual(stats.check(cursor), [])
+        self.assertEqual(stats.check_tweets(cursor), [])
+        cursor.execute("SELECT COUNT(*) FROM timeline;")
+        self.assertGreater(cursor.fetchone()[0], 0)
+
+    def test_refuses_existing_file(self):
+        path = os.path.join(self.directory.name, "a.db")
+        open(path, "w").close()
+        with self.assertRaises(ValueError):
+            generate.generate(path, USERS, TWEETS)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,132 @@
+import unittest
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import db
+import ids
+
+WRITERS = 4
+TWEETS_PER_WRITER = 50
+BLOCKS = 10
+BLOCK_SIZE = 5
+
+
+def open_worker(path, preset):
+    """Open a connection the way main.py does, with the preset's journal mode, and a generous busy timeout."""
+    return db.open_database(path, db.resolve_settings(preset, None, {'busy_timeout': 30000}))
+
+def write_tweets(path, preset, writer, errors):
+    """Insert tweets the way build_tweet does: allocate, insert, commit."""
+    connection = open_worker(path, preset)
+    cursor = connection.cursor()
+    try:
+        for n in range(TWEETS_PER_WRITER):
+            tid = ids.allocate(cursor, 'tweets')
+            cursor.execute("INSERT INTO tweets (tid, writer, tdate, text) VALUES (?, ?, '2025-01-01', ?);",
+                           (tid, writer, f"writer {writer} tweet {n}"))
+            connection.commit()
+    except sqlite3.Error as error:
+        errors.put(repr(error))
+    connection.close()
+
+def load_blocks(path, preset, errors):
+    """Insert tweets the way a bulk loader does: reserve a block, then fill it."""
+    connection = open_worker(path, preset)
+    cursor = connection.cursor()
+    try:
+        for n in range(BLOCKS):
+            block = ids.reserve(connection, cursor, 'tweets', BLOCK_SIZE)
+            cursor.executemany("INSERT INTO tweets (tid, writer, tdate, text) VALUES (?, 6, '2025-01-01', 'bulk');",
+                               [(tid,) for tid in block])
+            connection.commit()
+    except sqlite3.Error as error:
+        errors.put(repr(error))
+    connection.close()
+
+def seed(connection):
+    """Load sqlData.sql and install the id sequences."""
+    cursor = connection.cursor()
+    with open(os.path.join(parent_dir, "sqlData.sql")) as f:
+        cursor.executescript(f.read())
+    ids.install(connection, cursor)
+    connection.commit()
+
+
+class TestIds(unittest.TestCase):
+    def setUp(self):
+        # Real database file seeded from sqlData.sql, so several processes can open it
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "ids.db")
+        self.connection = sqlite3.connect(self.path)
+        self.cursor = self.connection.cursor()
+        seed(self.connection)
+
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+
+    def test_allocate_after_existing_ids(self):
+        self.assertEqual(ids.allocate(self.cursor, 'tweets'), 15)
+        self.assertEqual(ids.allocate(self.cursor, 'tweets'), 16)
+        self.assertEqual(ids.allocate(self.cursor, 'users'), 7)
+
+    def test_allocate_on_empty_table(self):
+        self.cursor.execute("DELETE FROM retweets;")
+        self.cursor.execute("DELETE FROM tweets;")
+        self.assertEqual(ids.allocate(self.cursor, 'tweets'), 1)
+
+    def test_rollback_returns_ids(self):
+        self.connection.commit()
+        self.assertEqual(ids.allocate(self.cursor, 'tweets'), 15)
+        self.connection.rollback()
+        self.assertEqual(ids.allocate(self.cursor, 'tweets'), 15)
+
+    def test_skips_ids_written_directly(self):
+        self.assertEqual(ids.allocate(self.cursor, 'tweets'), 15)
+        self.cursor.execute("INSERT INTO tweets VALUES (40, 1, '2025-01-01', 'direct', NULL);")
+        self.assertEqual(ids.allocate(self.cursor, 'tweets'), 41)
+
+    def test_reserve_block(self):
+        self.assertEqual(ids.reserve(self.connection, self.cursor, 'tweets', 100), range(15, 115))
+        self.assertEqual(ids.allocate(self.cursor, 'tweets'), 115)
+
+    def test_concurrent_writers_get_unique_ids(self):
+        # Every preset, so both the rollback journal and WAL (the default) are covered
+        for preset in db.PRESETS:
+            with self.subTest(preset=preset):
+                path = os.path.join(self.directory.name, f"ids-{preset}.db")
+                connection = sqlite3.connect(path)
+                seed(connection)
+                connection.close()
+                self.run_writers(path, preset)
+
+    def run_writers(self, path, preset):
+        context = multiprocessing.get_context()
+        errors = context.Queue()
+        processes = [context.Process(target=write_tweets, args=(path, preset, writer, errors))
+                     for writer in range(1, WRITERS + 1)]
+        processes.append(context.Process(target=load_blocks, args=(path, preset, errors)))
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        failures = []
+        while not errors.empty():
+            failures.append(errors.get())
+        self.assertEqual(failures, [])
+        self.assertTrue(all(process.exitcode == 0 for process in processes))
+        connection = sqlite3.connect(path)
+        row = connection.execute("SELECT COUNT(*), COUNT(DISTINCT tid), MAX(tid) FROM tweets WHERE tid > 14;").fetchone()
+        connection.close()
+        total = WRITERS * TWEETS_PER_WRITER + BLOCKS * BLOCK_SIZE
+        self.assertEqual(row, (total, total, 14 + total))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,92 @@
+import unittest
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from unittest.mock import patch
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import migrations
+import search
+import service
+
+TABLES = ['users', 'follows', 'tweets', 'hashtags', 'mentions', 'retweets', 'lists', 'includes']
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        # Real in-memory database seeded from sqlData.sql, at schema version 0
+        self.connection = sqlite3.connect(":memory:")
+        self.cursor = self.connection.cursor()
+        with open(os.path.join(parent_dir, "sqlData.sql")) as f:
+            self.cursor.executescript(f.read())
+
+    def tearDown(self):
+        self.connection.close()
+        search.fts_enabled = False
+
+    def indexes(self):
+        self.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name NOT LIKE 'sqlite_%';")
+        return {row[0] for row in self.cursor.fetchall()}
+
+    def test_migrate_from_scratch(self):
+        self.assertEqual(migrations.schema_version(self.cursor), 0)
+        with self.assertLogs("tweeter", level="INFO"):
+            self.assertEqual(migrations.migrate(self.connection, self.cursor), [1, 2, 3, 4, 5])
+        self.assertEqual(migrations.schema_version(self.cursor), migrations.LATEST)
+        self.assertTrue({'follows_flwee_date', 'tweets_writer_date', 'tweets_replyto_date', 'retweets_tid',
+                         'mentions_term'} <= self.indexes())
+        # Replaced by the indexes of migrations 2, 3 and 4
+        self.assertFalse({'follows_flwee', 'tweets_writer', 'tweets_replyto'} & self.indexes())
+        # Plain text passwords are marked, to be rehashed on next login
+        self.cursor.execute("SELECT pwd FROM users WHERE usr = 1;")
+        self.assertEqual(self.cursor.fetchone(), ('plain$pass1',))
+        # Nothing is left to apply
+        self.assertEqual(migrations.migrate(self.connection, self.cursor), [])
+
+    def test_failed_migration_rolls_back(self):
+        def broken(connection, cursor):
+            cursor.execute("CREATE INDEX half_done ON tweets (tdate);")
+            cursor.execute("SELECT * FROM no_such_table;")
+
+        steps = migrations.MIGRATIONS + [(migrations.LATEST + 1, "broken", broken)]
+        with patch.object(migrations, "MIGRATIONS", steps), patch.object(migrations, "LATEST", migrations.LATEST + 1):
+            with self.assertRaises(sqlite3.OperationalError):
+                migrations.migrate(self.connection, self.cursor)
+        # The migrations before the broken one stay applied, the broken one left nothing behind
+        self.assertEqual(migrations.schema_version(self.cursor), migrations.LATEST)
+        self.assertNotIn('half_done', self.indexes())
+
+    def test_newer_database_is_refused(self):
+        self.cursor.execute(f"PRAGMA user_version = {migrations.LATEST + 1};")
+        with self.assertRaises(ValueError):
+            migrations.migrate(self.connection, self.cursor)
+
+    def test_upgrade_test1_in_place(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test1.db")
+            shutil.copyfile(os.path.join(parent_dir, "test1.db"), path)
+            connection = sqlite3.connect(path)
+            cursor = connection.cursor()
+            before = {}
+            for table in TABLES:
+                cursor.execute(f"SELECT * FROM {table};")
+                before[table] = sorted(cursor.fetchall())
+            # Migration 5 marks the plain text passwords
+            before['users'] = [(usr, f"plain${pwd}", *rest) for usr, pwd, *rest in before['users']]
+            service.install(connection, cursor)
+            connection.close()
+
+            connection = sqlite3.connect(path)
+            cursor = connection.cursor()
+            self.assertEqual(migrations.schema_version(cursor), migrations.LATEST)
+            for table in TABLES:
+                cursor.execute(f"SELECT * FROM {table};")
+                self.assertEqual(sorted(cursor.fetchall()), before[table])
+            connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
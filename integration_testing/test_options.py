@@ -1,6 +1,26 @@
 import unittest
 from unittest.mock import MagicMock, patch
+import os
+import sqlite3
+import ids
 import options
+from records import Profile, TweetHit
+import service
+
+
+def with_profiles(*pages):
+    """
+    fetchall results of reading pages of tweet rows: each page, then the profiles its names are resolved from.
+    """
+    results = []
+    seen = set()
+    for page in pages:
+        results.append(page)
+        profiles = [Profile(hit.usr, hit.name, None, None, None) for hit in page if hit.usr not in seen]
+        seen.update(hit.usr for hit in page)
+        if profiles:
+            results.append(profiles)
+    return results
 
 
 class TestOptions(unittest.TestCase):
@@ -21,6 +41,7 @@ class TestOptions(unittest.TestCase):
             mock_print.assert_any_call("          U - Search for Users")
             mock_print.assert_any_call("          C - Compose a Tweet")
             mock_print.assert_any_call("          L - List Followers")
+            mock_print.assert_any_call("          H - Trending Hashtags")
             mock_print.assert_any_call("          Q - Logout")
 
     def test_compose_empty_tweet(self):
@@ -42,10 +63,12 @@ class TestOptions(unittest.TestCase):
 
     def test_build_tweet_with_hashtag(self):
         """Test building a tweet with a hashtag."""
-        self.cursor.fetchone.side_effect = [None, None, None]
-        with patch("builtins.input", side_effect=["#hashtag tweet"]):
+        self.cursor.fetchone.side_effect = [(1,)]  # Allocated tid
+        with patch("builtins.input", side_effect=["#hashtag tweet #other #hashtag"]):
             options.build_tweet(self.cursor, self.connection, self.user)
-            self.cursor.execute.assert_any_call("INSERT INTO hashtags (term) VALUES (?)", ("hashtag",))
+            self.cursor.executemany.assert_any_call(service.INSERT_HASHTAG, [("hashtag",), ("other",)])
+            self.cursor.executemany.assert_any_call(service.INSERT_MENTION, [(1, "hashtag"), (1, "other")])
+            self.connection.commit.assert_called_once()
 
     def test_follow_self(self):
         """Test trying to follow oneself."""
@@ -55,23 +78,26 @@ class TestOptions(unittest.TestCase):
 
     def test_follow_existing_user(self):
         """Test following an existing user."""
-        self.cursor.fetchone.return_value = None
+        self.cursor.rowcount = 1  # The follow was not already there
         with patch("builtins.print") as mock_print:
             options.follow_user(2, self.connection, self.cursor, self.user)
             mock_print.assert_any_call("You are now following this user.")
 
     def test_list_followers_with_data(self):
         """Test listing followers with multiple followers."""
-        self.cursor.fetchall.return_value = [(2, "Follower1"), (3, "Follower2")]
+        self.cursor.fetchone.side_effect = [(0, 0, 2), None]  # Counters, then no row past the page
+        self.cursor.fetchmany.return_value = [(2, "Follower1", "2024-01-02"), (3, "Follower2", "2024-01-01")]
         with patch("builtins.input", side_effect=["0"]):
             with patch("builtins.print") as mock_print:
                 options.list_followers(self.connection, self.cursor, self.user)
+                mock_print.assert_any_call("\nYou have 2 followers.")
                 mock_print.assert_any_call("1. Follower1 (User ID: 2)")
                 mock_print.assert_any_call("2. Follower2 (User ID: 3)")
 
     def test_list_followers_select_user(self):
         """Test listing followers and selecting a user for more options."""
-        self.cursor.fetchall.return_value = [(2, "Follower1"), (3, "Follower2")]
+        self.cursor.fetchone.side_effect = [(0, 0, 2), None]  # Counters, then no row past the page
+        self.cursor.fetchmany.return_value = [(2, "Follower1", "2024-01-02"), (3, "Follower2", "2024-01-01")]
         with patch("builtins.input", side_effect=["1", "1", "0"]):  # Select follower 1, then exit
             with patch("builtins.print") as mock_print:
                 with patch("options.userinfo_pull") as mock_userinfo_pull:
@@ -81,9 +107,31 @@ class TestOptions(unittest.TestCase):
                     mock_userinfo_pull.assert_called_once_with(2, "Follower1", self.cursor, self.connection,
                                                                (1, "current_user", "Current User"))
 
+    def test_list_followers_pages(self):
+        """Test paging through followers, numbered across pages."""
+        self.cursor.fetchone.side_effect = [(0, 0, 12), (1, "Follower11", "2024-01-01"), None]
+        self.cursor.fetchmany.side_effect = [
+            [(n, f"Follower{n - 1}", "2024-01-02") for n in range(2, 12)],
+            [(12, "Follower11", "2024-01-01"), (13, "Follower12", "2024-01-01")],
+        ]
+        with patch("builtins.input", side_effect=["2", "1", "11", "2", "0"]):  # Next page, select, no more pages
+            with patch("builtins.print") as mock_print:
+                with patch("options.userinfo_pull") as mock_userinfo_pull:
+                    options.list_followers(self.connection, self.cursor, self.user)
+                    mock_print.assert_any_call("         2. See more followers")
+                    mock_print.assert_any_call("10. Follower10 (User ID: 11)")
+                    mock_print.assert_any_call("12. Follower12 (User ID: 13)")
+                    mock_print.assert_any_call("\nYou've reached the end of your followers")
+                    mock_print.assert_any_call("Invalid option selected. Please try again.")
+                    mock_userinfo_pull.assert_called_once_with(12, "Follower11", self.cursor, self.connection,
+                                                               self.user)
+        # The second page resumes after the first page's last (start_date, usr)
+        self.assertEqual(self.cursor.execute.call_args[0][1], (1, "2024-01-02", 11, 11))
+
     def test_list_followers_invalid_option_selection(self):
         """Test listing followers and make and invalid option selection."""
-        self.cursor.fetchall.return_value = [(2, "Follower1"), (3, "Follower2")]
+        self.cursor.fetchone.side_effect = [(0, 0, 2), None]  # Counters, then no row past the page
+        self.cursor.fetchmany.return_value = [(2, "Follower1", "2024-01-02"), (3, "Follower2", "2024-01-01")]
         with patch("builtins.input", side_effect=["2", "0",]):  # Make invalid selection (2), then exit
             with patch("builtins.print") as mock_print:
                 with patch("options.userinfo_pull") as mock_userinfo_pull:
@@ -94,7 +142,8 @@ class TestOptions(unittest.TestCase):
 
     def test_list_followers_invalid_user_selection(self):
         """Test listing followers and make an invalid user selection."""
-        self.cursor.fetchall.return_value = [(2, "Follower1"), (3, "Follower2")]
+        self.cursor.fetchone.side_effect = [(0, 0, 2), None]  # Counters, then no row past the page
+        self.cursor.fetchmany.return_value = [(2, "Follower1", "2024-01-02"), (3, "Follower2", "2024-01-01")]
         with patch("builtins.input", side_effect=["1", "0", "0"]):  # Make invalid selection (0)
             with patch("builtins.print") as mock_print:
                     options.list_followers(self.connection, self.cursor, (1, "current_user", "Current User"))
@@ -104,11 +153,12 @@ class TestOptions(unittest.TestCase):
 
     def test_search_tweet_more_tweets(self):
         """Test viewing more matching tweets."""
-        self.cursor.fetchall.side_effect = [
-            [("User1", 2, "2024-01-02", "First Tweet", 101), ("User2", 3, "2024-01-02", "Second Tweet", 102),
-             ("User3", 4, "2024-01-02", "Third Tweet", 103), ("User4", 5, "2024-01-02", "Fourth Tweet", 104),
-             ("User5", 6, "2024-01-02", "Fifth Tweet", 105), ("User6", 7, "2024-01-02", "Sixth Tweet", 106)],
-        ]
+        self.cursor.fetchall.side_effect = with_profiles(
+            [TweetHit("User1", 2, "2024-01-02", "First Tweet", 101), TweetHit("User2", 3, "2024-01-02", "Second Tweet", 102),
+             TweetHit("User3", 4, "2024-01-02", "Third Tweet", 103), TweetHit("User4", 5, "2024-01-02", "Fourth Tweet", 104),
+             TweetHit("User5", 6, "2024-01-02", "Fifth Tweet", 105)],
+            [TweetHit("User6", 7, "2024-01-02", "Sixth Tweet", 106)],
+        )
 
         with patch("builtins.input", side_effect=["test", "m", "b"]):  # Search term, view more tweets, exit
             with patch("builtins.print") as mock_print:
@@ -134,10 +184,10 @@ class TestOptions(unittest.TestCase):
 
     def test_search_tweet_no_more_tweets(self):
         """Test attempting to view more tweets when none exist."""
-        self.cursor.fetchall.side_effect = [
-            [("User1", 2, "2024-01-01", "First Tweet", 101)],
+        self.cursor.fetchall.side_effect = with_profiles(
+            [TweetHit("User1", 2, "2024-01-01", "First Tweet", 101)],
             [],
-        ]
+        )
 
         with patch("builtins.input", side_effect=["test", "m", "b"]):  # Search term, view more tweets, exit
             with patch("builtins.print") as mock_print:
@@ -146,7 +196,8 @@ class TestOptions(unittest.TestCase):
 
     def test_view_tweet_info_valid(self):
         """Test viewing information for a valid tweet."""
-        self.cursor.fetchall.side_effect = [[("User1", 2, "2024-01-01", "First Tweet", 101)], [], [("User2",)]]
+        self.cursor.fetchall.side_effect = with_profiles([TweetHit("User1", 2, "2024-01-01", "First Tweet", 101)])
+        self.cursor.fetchone.return_value = (0, 1)  # Reply and retweet counters
 
         with patch("builtins.input", side_effect=["test", "i", "1", "b"]):  # Search term, view tweet info, exit
             with patch("builtins.print") as mock_print:
@@ -155,11 +206,11 @@ class TestOptions(unittest.TestCase):
                 mock_print.assert_any_call("Selected tweet for information:")
                 mock_print.assert_any_call("    1. User1 @ 2024-01-01 : First Tweet")
                 mock_print.assert_any_call("\nNumber of replies: 0")
-                mock_print.assert_any_call("Number of retweets: 1\n")
+                mock_print.assert_any_call("Number of retweets: 1")
 
     def test_view_tweet_info_invalid_selection(self):
         """Test handling invalid tweet selection when viewing information."""
-        self.cursor.fetchall.return_value = [("User1", 2, "2024-01-01", "First Tweet", 101)]
+        self.cursor.fetchall.side_effect = with_profiles([TweetHit("User1", 2, "2024-01-01", "First Tweet", 101)])
 
         with patch("builtins.input", side_effect=["test", "i", "5", "b"]):  # Invalid selection, exit
             with patch("builtins.print") as mock_print:
@@ -168,7 +219,7 @@ class TestOptions(unittest.TestCase):
 
     def test_reply_to_tweet_valid(self):
         """Test replying to a valid tweet."""
-        self.cursor.fetchall.return_value = [("User1", 2, "2024-01-01", "First Tweet", 101)]
+        self.cursor.fetchall.side_effect = with_profiles([TweetHit("User1", 2, "2024-01-01", "First Tweet", 101)])
 
         with patch("builtins.input", side_effect=["test", "r", "1", "Reply message", "b"]):  # Reply to tweet
             with patch("builtins.print") as mock_print:
@@ -183,7 +234,7 @@ class TestOptions(unittest.TestCase):
 
     def test_reply_to_tweet_invalid_selection(self):
         """Test replying to a tweet with an invalid selection."""
-        self.cursor.fetchall.return_value = [("User1", 2, "2024-01-01", "First Tweet", 101)]
+        self.cursor.fetchall.side_effect = with_profiles([TweetHit("User1", 2, "2024-01-01", "First Tweet", 101)])
 
         with patch("builtins.input", side_effect=["test", "r", "5", "b"]):  # Invalid reply selection
             with patch("builtins.print") as mock_print:
@@ -192,8 +243,8 @@ class TestOptions(unittest.TestCase):
 
     def test_retweet_valid(self):
         """Test retweeting a valid tweet."""
-        self.cursor.fetchall.return_value = [("User1", 2, "2024-01-01", "First Tweet", 101)]
-        self.cursor.fetchone.return_value = None
+        self.cursor.fetchall.side_effect = with_profiles([TweetHit("User1", 2, "2024-01-01", "First Tweet", 101)])
+        self.cursor.rowcount = 1  # The retweet was not already there
 
         with patch("builtins.input", side_effect=["test", "t", "1", "b"]):  # Retweet and exit
             with patch("builtins.print") as mock_print:
@@ -214,8 +265,9 @@ class TestOptions(unittest.TestCase):
 
     def test_see_more_tweets_no_tweets(self):
         """Test see_more_tweets for a user with no tweets."""
-        self.cursor.fetchone.side_effect = [("John Doe",)]
-        self.cursor.fetchall.return_value = []
+        self.cursor.fetchall.return_value = [Profile(2, "John Doe", None, None, None)]
+        self.cursor.fetchone.return_value = None  # No row past the page
+        self.cursor.fetchmany.return_value = []
         with patch("builtins.print") as mock_print:
             options.see_more_tweets(2, self.connection, self.cursor)
             mock_print.assert_any_call("Showing all tweets from John Doe:\n")
@@ -223,11 +275,12 @@ class TestOptions(unittest.TestCase):
 
     def test_see_more_tweets_with_tweets(self):
         """Test see_more_tweets for a user with multiple tweets."""
-        self.cursor.fetchone.side_effect = [("Jane Smith",)]
-        self.cursor.fetchall.return_value = [
-            ("Tweet 3 - Most Recent",),
-            ("Tweet 2",),
-            ("Tweet 1 - Oldest",),
+        self.cursor.fetchall.return_value = [Profile(3, "Jane Smith", None, None, None)]
+        self.cursor.fetchone.return_value = None  # No row past the page
+        self.cursor.fetchmany.return_value = [
+            ("Tweet 3 - Most Recent", "2024-01-03", 3),
+            ("Tweet 2", "2024-01-02", 2),
+            ("Tweet 1 - Oldest", "2024-01-01", 1),
         ]
         with patch("builtins.print") as mock_print:
             options.see_more_tweets(3, self.connection, self.cursor)
@@ -236,10 +289,36 @@ class TestOptions(unittest.TestCase):
             mock_print.assert_any_call("- Tweet 2")
             mock_print.assert_any_call("- Tweet 1 - Oldest")
 
+    def test_trending_hashtags(self):
+        """Test trending hashtags are listed most mentioned first."""
+        self.cursor.fetchone.return_value = (7, "9999-12-31")  # A window that is already current
+        self.cursor.fetchall.return_value = [("fun", 3), ("news", 1)]
+        with patch("builtins.print") as mock_print:
+            options.trending_hashtags(self.connection, self.cursor)
+            mock_print.assert_any_call("Most mentioned in the last 7 day(s), since 9999-12-31:\n")
+            mock_print.assert_any_call("1. #fun (3 tweets)")
+            mock_print.assert_any_call("2. #news (1 tweets)")
+
+    def test_see_more_tweets_pages(self):
+        """Test paging through a user's tweets."""
+        self.cursor.fetchall.return_value = [Profile(3, "Jane Smith", None, None, None)]
+        self.cursor.fetchone.side_effect = [("Tweet 10", "2024-01-10", 10), None]
+        self.cursor.fetchmany.side_effect = [
+            [(f"Tweet {n}", f"2024-01-{n:02d}", n) for n in range(20, 10, -1)],
+            [(f"Tweet {n}", f"2024-01-{n:02d}", n) for n in range(10, 0, -1)],
+        ]
+        with patch("builtins.input", side_effect=["x", "m", "m"]):  # Invalid choice, then more twice
+            with patch("builtins.print") as mock_print:
+                options.see_more_tweets(3, self.connection, self.cursor)
+                mock_print.assert_any_call("- Tweet 20")
+                mock_print.assert_any_call("- Tweet 1")
+                mock_print.assert_any_call("*No more tweets from Jane Smith")
+        # The second page resumes after the first page's last (tdate, tid)
+        self.assertEqual(self.cursor.execute.call_args[0][1], (3, "2024-01-11", 11, 11))
+
     def test_search_user_select_valid(self):
         """Test selecting a user from search results."""
-        self.cursor.fetchall.side_effect = [[(1, "John Doe")], []]  # Name and city search results
-        self.cursor.fetchone.side_effect = [(1,), (0,)]  # Total counts for name and city searches
+        self.cursor.fetchall.side_effect = [[(1, "John Doe", 8, "John Doe")], []]  # Name and city search results
 
         with patch("builtins.input", side_effect=["test", "1", "1", "0"]):  # Search term, select user, exit
             with patch("builtins.print") as mock_print:
@@ -250,8 +329,7 @@ class TestOptions(unittest.TestCase):
 
     def test_search_user_select_invalid(self):
         """Test invalid input when selecting a user."""
-        self.cursor.fetchall.side_effect = [[(1, "John Doe")], []]  # Name and city search results
-        self.cursor.fetchone.side_effect = [(1,), (0,)]  # Total counts for name and city searches
+        self.cursor.fetchall.side_effect = [[(1, "John Doe", 8, "John Doe")], []]  # Name and city search results
 
         with patch("builtins.input", side_effect=["test", "abc", "1", "abc", "0"]):  # Invalid inputs, then exit
             with patch("builtins.print") as mock_print:
@@ -261,8 +339,7 @@ class TestOptions(unittest.TestCase):
 
     def test_search_user_select_no_corresponding_user(self):
         """Test invalid input when selecting a user."""
-        self.cursor.fetchall.side_effect = [[(1, "John Doe")], []]  # Name and city search results
-        self.cursor.fetchone.side_effect = [(1,), (0,)]  # Total counts for name and city searches
+        self.cursor.fetchall.side_effect = [[(1, "John Doe", 8, "John Doe")], []]  # Name and city search results
 
         with patch("builtins.input", side_effect=["test", "1", "5", "0"]):  # Invalid inputs, then exit
             with patch("builtins.print") as mock_print:
@@ -271,7 +348,7 @@ class TestOptions(unittest.TestCase):
 
     def test_search_user_no_results(self):
         """Test searching for users with no results."""
-        self.cursor.fetchone.return_value = [0, 0, 0]
+        self.cursor.fetchall.return_value = []
         with patch("builtins.input", side_effect=["nonexistent", "0"]):
             with patch("builtins.print") as mock_print:
                 options.search_user(self.cursor, self.connection, self.user)
@@ -279,7 +356,7 @@ class TestOptions(unittest.TestCase):
 
     def test_userinfo_pull_recent_tweets(self):
         """Test pulling user information and showing recent tweets."""
-        self.cursor.fetchone.side_effect = [(10,), (5,), (3,)]
+        self.cursor.fetchone.side_effect = [(10, 5, 3)]
         self.cursor.fetchall.side_effect = [[("Tweet 1",), ("Tweet 2",), ("Tweet 3",)]]
         with patch("builtins.input", side_effect=["0"]):
             with patch("builtins.print") as mock_print:
@@ -293,7 +370,7 @@ class TestOptions(unittest.TestCase):
 
     def test_userinfo_no_recent_tweets(self):
         """Test pulling user information when there are no recent tweets."""
-        self.cursor.fetchone.side_effect = [(0,), (0,), (0,)]
+        self.cursor.fetchone.side_effect = [None]
         self.cursor.fetchall.side_effect = [[]]
         with patch("builtins.input", side_effect=["0"]):
             with patch("builtins.print") as mock_print:
@@ -304,16 +381,15 @@ class TestOptions(unittest.TestCase):
 
     def test_search_user_pagination(self):
         """Test user search with pagination."""
-        # Mocking return values for fetchall() and fetchone()
+        # Rows are (usr, name, length, value); one row past the page means there is another page
         self.cursor.fetchall.side_effect = [
-            [(2, "User1"), (3, "User2"), (4, "User3"), (5, "User4"), (6, "User5"), (7, "User6"), (8, "User7")],
-            [(9, "User8"), (10, "User9"), (11, "User10")],
-            [(100, "User100")]
+            [(n, f"User{n - 1}", 5, f"User{n - 1}") for n in range(2, 8)],  # Names, page 1
+            [(9, "User8", 5, "User8"), (10, "User9", 5, "User9"), (11, "User10", 6, "User10")],  # Cities, the only page
+            [(7, "User6", 5, "User6"), (8, "User7", 5, "User7")]  # Names, page 2 and last
         ]
-        self.cursor.fetchone.side_effect = [(7,), (3,)]  # Total counts for city and name search
 
-        # Input search term, next page, then exit
-        with patch("builtins.input", side_effect=["test", "2", "0"]):
+        # Input search term, next page twice, then exit
+        with patch("builtins.input", side_effect=["test", "2", "2", "0"]):
             with patch("builtins.print") as mock_print:
                 options.search_user(self.cursor, self.connection, self.user)
 
@@ -323,9 +399,71 @@ class TestOptions(unittest.TestCase):
                 mock_print.assert_any_call("3- (ID:4) User3")
                 mock_print.assert_any_call("4- (ID:5) User4")
                 mock_print.assert_any_call("5- (ID:6) User5")
-                mock_print.assert_any_call("6- (ID:7) User6")
-                mock_print.assert_any_call("7- (ID:8) User7")
-                mock_print.assert_any_call("8- (ID:9) User8")
-                mock_print.assert_any_call("9- (ID:10) User9")
-                mock_print.assert_any_call("10- (ID:11) User10")
-                mock_print.assert_any_call("You've reached the end of the Name-based results")
\ No newline at end of file
+                mock_print.assert_any_call("6- (ID:9) User8")
+                mock_print.assert_any_call("7- (ID:10) User9")
+                mock_print.assert_any_call("8- (ID:11) User10")
+                mock_print.assert_any_call("9- (ID:7) User6")
+                mock_print.assert_any_call("10- (ID:8) User7")
+                mock_print.assert_any_call("You've reached the end of the City-based results")
+                mock_print.assert_any_call("You've reached the end of the Name-based results")
+                # Nothing is counted upfront, and no query is made past the last page
+                self.assertEqual(self.cursor.fetchall.call_count, 3)
+                self.cursor.fetchone.assert_not_called()
+
+    def test_view_conversation(self):
+        """Test a conversation is indented by level, and cut off replies are expanded a page at a time."""
+        tweeter = MagicMock()
+        tweeter.thread.return_value = [
+            (1, None, -1, 1, "Nik", "2020-04-30", "Root", 1),
+            (3, 1, 0, 2, "Bob", "2020-05-30", "Reply", 7),
+            (20, 3, 1, 4, "John", "2024-01-01", "First answer", 0),
+        ]
+        tweeter.iter_replies.return_value = iter([
+            [(20, 3, 1, 4, "John", "2024-01-01", "First answer", 0)],
+            [(21, 3, 1, 5, "Matt", "2024-01-02", "Second answer", 2)],
+        ])
+        get_input = MagicMock(side_effect=['e', 'm', 'm', 'b'])
+        with patch("builtins.input", side_effect=["3"]):
+            with patch("builtins.print") as mock_print:
+                options.view_conversation(tweeter, 1, TweetHit("Bob", 2, "2020-05-30", "Reply", 3), get_input)
+                tweeter.thread.assert_called_once_with(3)
+                mock_print.assert_any_call("  [ID:1] Nik @ 2020-04-30 : Root")
+                mock_print.assert_any_call("    > [ID:3] Bob @ 2020-05-30 : Reply")
+                mock_print.assert_any_call("          ... 6 more replies")
+                mock_print.assert_any_call("          [ID:20] John @ 2024-01-01 : First answer")
+                tweeter.iter_replies.assert_called_once_with(3, options.REPLY_PAGE_SIZE)
+                mock_print.assert_any_call("  [ID:21] Matt @ 2024-01-02 : Second answer (2 replies)")
+                mock_print.assert_any_call("There are no more replies.")
+
+
+class TestBuildTweetDatabase(unittest.TestCase):
+    def setUp(self):
+        # Real in-memory database seeded from sqlData.sql
+        self.connection = sqlite3.connect(":memory:")
+        self.cursor = self.connection.cursor()
+        with open(os.path.join(os.path.dirname(__file__), "..", "sqlData.sql")) as f:
+            self.cursor.executescript(f.read())
+        ids.install(self.connection, self.cursor)
+        self.user = (2, "pass2", "Bob")
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_hashtags_written_once(self):
+        with patch("builtins.input", side_effect=["#snow day #Snow #snow #yeg"]), patch("builtins.print"):
+            options.build_tweet(self.cursor, self.connection, self.user)
+        self.cursor.execute("SELECT term FROM mentions WHERE tid = 15 ORDER BY term;")
+        self.assertEqual(self.cursor.fetchall(), [("Snow",), ("snow",), ("yeg",)])
+        self.cursor.execute("SELECT COUNT(*) FROM hashtags;")
+        self.assertEqual(self.cursor.fetchone(), (3,))
+        self.assertFalse(self.connection.in_transaction)
+
+    def test_failed_mention_rolls_back_tweet(self):
+        self.cursor.execute("CREATE TRIGGER fail BEFORE INSERT ON mentions BEGIN SELECT RAISE(ABORT, 'disk full'); END;")
+        with patch("builtins.input", side_effect=["#snow day"]), patch("builtins.print"):
+            with self.assertRaises(sqlite3.IntegrityError):
+                options.build_tweet(self.cursor, self.connection, self.user)
+        self.cursor.execute("SELECT COUNT(*) FROM tweets WHERE tid > 14;")
+        self.assertEqual(self.cursor.fetchone(), (0,))
+        self.cursor.execute("SELECT COUNT(*) FROM hashtags;")
+        self.assertEqual(self.cursor.fetchone(), (0,))
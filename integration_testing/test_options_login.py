@@ -6,8 +6,32 @@ import sys
 
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.append(parent_dir)
+import passwords
+from records import FeedItem, Profile, RETWEET, TWEET
 from login import signup_user, login_user, logout_user, get_input, print_login_menu, post_login
 
+# users.pwd of the mocked user, whose password is password123
+STORED = passwords.hash_password('password123')
+
+
+def with_profiles(*pages):
+    """
+    fetchall results of reading pages of feed rows: each page, then the profiles its names are resolved from.
+    """
+    results = []
+    seen = set()
+    for page in pages:
+        results.append(page)
+        profiles = {}
+        for item in page:
+            for usr, name in ((item.usr, item.name), (item.writer, item.writer_name)):
+                if usr not in seen:
+                    profiles[usr] = Profile(usr, name, None, None, None)
+                    seen.add(usr)
+        if profiles:
+            results.append(list(profiles.values()))
+    return results
+
 class TestLogin(unittest.TestCase):
     def setUp(self):
         # Mock the database connection and cursor
@@ -20,7 +44,7 @@ class TestLogin(unittest.TestCase):
     @patch('getpass.getpass', side_effect=['password123', 'password123'])
     def test_first_user_signup(self, mock_getpass, mock_input):
         # Mock database responses
-        self.cursor.fetchone.return_value = None  # Simulate no existing users
+        self.cursor.fetchone.return_value = (1,)  # Simulate the first id handed out
         with patch('builtins.print') as mock_print:
             signup_user(self.connection, self.cursor)
             self.connection.commit.assert_called_once()
@@ -30,7 +54,7 @@ class TestLogin(unittest.TestCase):
     @patch('getpass.getpass', side_effect=['password123', 'password123'])
     def test_signup_with_existing_users(self, mock_getpass, mock_input):
         # Simulate existing users
-        self.cursor.fetchone.return_value = (5,)  # Simulate an existing max user ID
+        self.cursor.fetchone.return_value = (6,)  # Simulate an existing max user ID of 5
         with patch('builtins.print') as mock_print:
             signup_user(self.connection, self.cursor)
             self.connection.commit.assert_called_once()
@@ -50,7 +74,7 @@ class TestLogin(unittest.TestCase):
     @patch('builtins.input', side_effect=['Test User', 'test@example.com', 'Test City', 'UTC'])
     @patch('getpass.getpass', side_effect=['password123', 'password123'])
     def test_successful_signup(self, mock_getpass, mock_input):
-        self.cursor.fetchone.return_value = (10,)
+        self.cursor.fetchone.return_value = (11,)
 
         # Mock print output
         with patch('builtins.print') as mock_print:
@@ -62,10 +86,10 @@ class TestLogin(unittest.TestCase):
     @patch('builtins.input', side_effect=['123'])
     @patch('getpass.getpass', side_effect=['password123'])
     def test_successful_login(self, mock_getpass, mock_input):
-        self.cursor.fetchone.return_value = (123, 'password123', 'Test User', 'test@example.com', 'Test City', 'UTC')
+        self.cursor.fetchone.return_value = (123, STORED, 'Test User', 'test@example.com', 'Test City', 'UTC')
 
         with patch('builtins.print') as mock_print:
-            logged_in, user = login_user(self.cursor)
+            logged_in, user = login_user(self.connection, self.cursor)
             self.assertTrue(logged_in)
             self.assertEqual(user[2], 'Test User')
             mock_print.assert_any_call("------------------------------------")
@@ -77,13 +101,23 @@ class TestLogin(unittest.TestCase):
     def test_failed_login(self, mock_getpass, mock_input):
         self.cursor.fetchone.return_value = None
         with patch('builtins.print') as mock_print:
-            logged_in, user = login_user(self.cursor)
+            logged_in, user = login_user(self.connection, self.cursor)
             self.assertFalse(logged_in)
             self.assertIsNone(user)
             mock_print.assert_any_call("------------------------------------")
             mock_print.assert_any_call("Login failed! Please recheck your credentials and try again.")
             mock_print.assert_any_call("------------------------------------")
 
+    @patch('builtins.input', side_effect=['123'])
+    @patch('getpass.getpass', side_effect=['password456'])
+    def test_wrong_password_login(self, mock_getpass, mock_input):
+        self.cursor.fetchone.return_value = (123, STORED, 'Test User', 'test@example.com', 'Test City', 'UTC')
+        with patch('builtins.print') as mock_print:
+            logged_in, user = login_user(self.connection, self.cursor)
+            self.assertFalse(logged_in)
+            self.assertIsNone(user)
+            mock_print.assert_any_call("Login failed! Please recheck your credentials and try again.")
+
     def test_logout_successful(self):
         user = (123, 'password123', 'Test User', 'test@example.com', 'Test City', 'UTC')
         with patch('builtins.print') as mock_print:
@@ -133,18 +167,19 @@ class TestLogin(unittest.TestCase):
     @patch('builtins.input', side_effect=['m', 'c'])
     def test_show_more_recent_activity(self, mock_input, mock_print):
         
-        self.cursor.fetchall.side_effect = [
+        self.cursor.fetchall.side_effect = with_profiles(
             [  
-                ("User1", "Tweet", "2024-12-05", "Tweet text 1", 101, 2),
-                ("User2", "Retweet", "2024-12-04", "Retweet text 2", 102, 3, "User1", 2),
-                ("User3", "Tweet", "2024-12-03", "Tweet text 3", 103, 4),
-                ("User4", "Retweet", "2024-12-02", "Retweet text 4", 104, 5, "User2", 3),
-                ("User5", "Tweet", "2024-12-01", "Tweet text 5", 105, 6),
-                ("User6", "Retweet", "2024-11-30", "Retweet text 6", 106, 7, "User3", 4),
-                ("User7", "Tweet", "2024-11-29", "Tweet text 7", 107, 8)
+                FeedItem("User1", TWEET, "2024-12-05", "Tweet text 1", 101, 2, "User1", 2),
+                FeedItem("User2", RETWEET, "2024-12-04", "Retweet text 2", 102, 3, "User1", 2),
+                FeedItem("User3", TWEET, "2024-12-03", "Tweet text 3", 103, 4, "User3", 4),
+                FeedItem("User4", RETWEET, "2024-12-02", "Retweet text 4", 104, 5, "User2", 3),
+                FeedItem("User5", TWEET, "2024-12-01", "Tweet text 5", 105, 6, "User5", 6)
             ],
-            []
-        ]
+            [
+                FeedItem("User6", RETWEET, "2024-11-30", "Retweet text 6", 106, 7, "User3", 4),
+                FeedItem("User7", TWEET, "2024-11-29", "Tweet text 7", 107, 8, "User7", 8)
+            ]
+        )
 
         post_login(self.connection, self.cursor, self.user)
 
@@ -161,16 +196,16 @@ class TestLogin(unittest.TestCase):
     @patch('builtins.print')
     @patch('builtins.input', side_effect=['c'])
     def test_no_activity(self, mock_input, mock_print):
-        self.cursor.fetchall.side_effect = [[], []]
+        self.cursor.fetchall.side_effect = [[]]
         post_login(self.connection, self.cursor, self.user)
         mock_print.assert_any_call("You have no recent activity.")
 
     @patch('builtins.print')
     @patch('builtins.input', side_effect=['c'])
     def test_only_tweets(self, mock_input, mock_print):
-        self.cursor.fetchall.side_effect = [[
-            ("User1", "Tweet", "2024-12-01", "Tweet text", 101, 2)
-        ], []]
+        self.cursor.fetchall.side_effect = with_profiles([
+            FeedItem("User1", TWEET, "2024-12-01", "Tweet text", 101, 2, "User1", 2)
+        ], [])
         post_login(self.connection, self.cursor, self.user)
         expected_output = "{0:<10} | {1:<25} @ {2:^12} : {3:<50}".format(
             "1-Tweet", "(ID:2) User1", "2024-12-01", "Tweet text"
@@ -180,9 +215,9 @@ class TestLogin(unittest.TestCase):
     @patch('builtins.print')
     @patch('builtins.input', side_effect=['c'])
     def test_only_retweets(self, mock_input, mock_print):
-        self.cursor.fetchall.side_effect = [[], [
-            ("User2", "Retweet", "2024-12-01", "Retweet text", 201, 3, "User1", 2)
-        ]]
+        self.cursor.fetchall.side_effect = with_profiles([
+            FeedItem("User2", RETWEET, "2024-12-01", "Retweet text", 201, 3, "User1", 2)
+        ])
         post_login(self.connection, self.cursor, self.user)
         expected_output = "{0:<10} | {1:<25} @ {2:^12} : {3:<50}".format(
             "1-Retweet", "(ID:3) User2", "2024-12-01", "(From User1@ID:2) Retweet text"
@@ -193,10 +228,10 @@ class TestLogin(unittest.TestCase):
     @patch('builtins.input', side_effect=['m', 'c'])
     def test_pagination(self, mock_input, mock_print):
         # Simulate multiple tweets
-        self.cursor.fetchall.side_effect = [[
-            ("User1", "Tweet", "2024-12-01", "Tweet text 1", 101, 2),
-            ("User2", "Tweet", "2024-11-30", "Tweet text 2", 102, 3)
-        ], []]
+        self.cursor.fetchall.side_effect = with_profiles([
+            FeedItem("User1", TWEET, "2024-12-01", "Tweet text 1", 101, 2, "User1", 2),
+            FeedItem("User2", TWEET, "2024-11-30", "Tweet text 2", 102, 3, "User2", 3)
+        ], [])
         post_login(self.connection, self.cursor, self.user)
 
         expected_output_1 = "{0:<10} | {1:<25} @ {2:^12} : {3:<50}".format(
@@ -215,22 +250,13 @@ class TestLogin(unittest.TestCase):
     @patch('builtins.input', side_effect=['i', '1', 'c'])
     def test_tweet_information(self, mock_input, mock_print):
         # Arrange
-        self.cursor.fetchall.side_effect = [
+        self.cursor.fetchall.side_effect = with_profiles(
             [ 
-                ("User1", "Tweet", "2024-12-01", "Tweet text 1", 101, 2)
-            ],
-            [  
-                
-            ],
-            [   
-                (101, "20", "2023-11-07", "this project is so long #tiring #DBMS", None, 44, 24, "2024-12-08", "this is a reply after a year", 101)
-            ],
-            [   
-                (101, "20", "2023-11-07", "this project is so long #tiring #DBMS", None, 24, 101, "2024-12-08")
+                FeedItem("User1", TWEET, "2024-12-01", "Tweet text 1", 101, 2, "User1", 2)
             ]
-        ]
+        )
+        self.cursor.fetchone.return_value = (1, 1)  # Reply and retweet counters
 
-        
         post_login(self.connection, self.cursor, self.user)
 
        
@@ -252,9 +278,9 @@ class TestLogin(unittest.TestCase):
     @patch('builtins.input', side_effect=['r', '1', 'Reply message', 'c'])
     def test_reply_to_tweet(self, mock_input, mock_print):
         # Arrange
-        self.cursor.fetchall.side_effect = [[
-            ("User1", "Tweet", "2024-12-01", "Tweet text", 101, 2)
-        ], []]
+        self.cursor.fetchall.side_effect = with_profiles([
+            FeedItem("User1", TWEET, "2024-12-01", "Tweet text", 101, 2, "User1", 2)
+        ], [])
         post_login(self.connection, self.cursor, self.user)
         mock_print.assert_any_call("Your reply...")
         mock_print.assert_any_call("    Test User : Reply message")
@@ -265,10 +291,10 @@ class TestLogin(unittest.TestCase):
     @patch('builtins.input', side_effect=['t','1', 'c'])
     def test_retweet_success(self, mock_input, mock_print):
         # Arrange
-        self.cursor.fetchall.side_effect = [[
-            ("User1", "Tweet", "2024-12-01", "Tweet text", 101, 2)
-        ], []]
-        self.cursor.fetchone.return_value = None
+        self.cursor.fetchall.side_effect = with_profiles([
+            FeedItem("User1", TWEET, "2024-12-01", "Tweet text", 101, 2, "User1", 2)
+        ], [])
+        self.cursor.rowcount = 1  # The retweet was not already there
         post_login(self.connection, self.cursor, self.user)
 
         mock_print.assert_any_call("------------------------------------")
@@ -280,12 +306,11 @@ class TestLogin(unittest.TestCase):
     @patch('builtins.print')
     @patch('builtins.input', side_effect=['t', '1', 'c'])
     def test_retweet_a_retweet(self, mock_input, mock_print):
-        self.cursor.fetchall.side_effect = [
-            [],
+        self.cursor.fetchall.side_effect = with_profiles(
             [
-                ("User2", "Retweet", "2024-12-01", "Retweet text", 201, 3, "User1", 2)
+                FeedItem("User2", RETWEET, "2024-12-01", "Retweet text", 201, 3, "User1", 2)
             ],
-        ]
+        )
         
         # Act
         post_login(self.connection, self.cursor, self.user)
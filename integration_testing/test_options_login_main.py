@@ -1,7 +1,11 @@
 import unittest
 from unittest.mock import MagicMock, patch
+import passwords
 from main import main
 
+# users.pwd of the mocked user, whose password is password123
+STORED = passwords.hash_password('password123')
+
 class TestMainIntegration(unittest.TestCase):
     def setUp(self):
         """Set up mocked database connection and cursor."""
@@ -28,7 +32,7 @@ class TestMainIntegration(unittest.TestCase):
     def test_login_and_quit(self, mock_getpass, mock_input, mock_connect):
         """Test logging in as an existing user and quitting."""
         # Mock database response for login
-        self.cursor.fetchone.return_value = (1, 'password123', 'Test User', 'test@example.com', 'Test City', 'UTC')
+        self.cursor.fetchone.return_value = (1, STORED, 'Test User', 'test@example.com', 'Test City', 'UTC')
         with patch('builtins.print') as mock_print:
             main()
             # Verify `cursor.execute()` is called correctly in login.py
@@ -48,7 +52,7 @@ class TestMainIntegration(unittest.TestCase):
     def test_signup_and_quit(self, mock_getpass, mock_input, mock_connect):
         """Test signing up a new user and quitting."""
         # Mock database response for signup
-        self.cursor.fetchone.return_value = None
+        self.cursor.fetchone.return_value = (1,)
         with patch('builtins.print') as mock_print:
             main()
             # Verify `cursor.execute()` is called correctly in login.py for signup
@@ -88,7 +92,7 @@ class TestMainIntegration(unittest.TestCase):
     def test_search_tweets(self, mock_getpass, mock_input, mock_connect):
         """Test the 'Search for Tweets' option."""
         # Mock login
-        self.cursor.fetchone.side_effect = [(1, 'password123', 'Test User', 'test@example.com', 'Test City', 'UTC'), [("User1", 2, "2024-01-02", "First Tweet", 101), ("User2", 3, "2024-01-02", "Second Tweet", 102),
+        self.cursor.fetchone.side_effect = [(1, STORED, 'Test User', 'test@example.com', 'Test City', 'UTC'), [("User1", 2, "2024-01-02", "First Tweet", 101), ("User2", 3, "2024-01-02", "Second Tweet", 102),
              ("User3", 4, "2024-01-02", "Third Tweet", 103), ("User4", 5, "2024-01-02", "Fourth Tweet", 104),
              ("User5", 6, "2024-01-02", "Fifth Tweet", 105), ("User6", 7, "2024-01-02", "Sixth Tweet", 106)]]
 
@@ -111,9 +115,10 @@ class TestMainIntegration(unittest.TestCase):
     def test_search_users(self, mock_getpass, mock_input, mock_connect):
         """Test the 'Search for Users' option."""
         # Mock login
-        self.cursor.fetchone.side_effect = [(1, 'password123', 'Test User', 'test@example.com', 'Test City', 'UTC'),
+        self.cursor.fetchone.side_effect = [(1, STORED, 'Test User', 'test@example.com', 'Test City', 'UTC'),
             (1,), (1,)]
-        self.cursor.fetchall.side_effect = [[], [], [(1, "test_user1", "Test User 1")], [(2, "test_user2", "Test User 2")]]  # Name and city search results
+        # Feed, then name and city search results as (usr, name, length, matched value)
+        self.cursor.fetchall.side_effect = [[], [(1, "test_user1", 10, "test_user1")], [(2, "test_user2", 4, "City")]]
 
         with patch('builtins.print') as mock_print:
             main()
@@ -136,7 +141,7 @@ class TestMainIntegration(unittest.TestCase):
         """Test the 'Compose a Tweet' option."""
         # Mock login
         self.cursor.fetchone.side_effect = [
-            (1, 'password123', 'Test User', 'test@example.com', 'Test City', 'UTC'),  # Login
+            (1, STORED, 'Test User', 'test@example.com', 'Test City', 'UTC'),  # Login
             (1,)  # Tweet ID
         ]
 
@@ -162,8 +167,10 @@ class TestMainIntegration(unittest.TestCase):
     def test_list_followers(self, mock_getpass, mock_input, mock_connect):
         """Test the 'List Followers' option."""
         # Mock login
-        self.cursor.fetchone.return_value = (1, 'password123', 'Test User', 'test@example.com', 'Test City', 'UTC')
-        self.cursor.fetchall.side_effect = [[], [], [(2, "Follower1", "Follower 1"), (3, "Follower2", "Follower 2")]]
+        self.cursor.fetchone.side_effect = [(1, STORED, 'Test User', 'test@example.com', 'Test City', 'UTC'),
+                                            (0, 0, 2), None]  # Login, follower counters, no row past the page
+        self.cursor.fetchall.side_effect = [[]]
+        self.cursor.fetchmany.return_value = [(2, "Follower1", "2024-01-02"), (3, "Follower2", "2024-01-01")]
 
         with patch('builtins.print') as mock_print:
             main()
@@ -185,7 +192,7 @@ class TestMainIntegration(unittest.TestCase):
     def test_logout(self, mock_getpass, mock_input, mock_connect):
         """Test the 'Logout' option."""
         # Mock login
-        self.cursor.fetchone.return_value = (1, 'password123', 'Test User', 'test@example.com', 'Test City', 'UTC')
+        self.cursor.fetchone.return_value = (1, STORED, 'Test User', 'test@example.com', 'Test City', 'UTC')
 
         with patch('builtins.print') as mock_print:
             main()
@@ -0,0 +1,37 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import passwords
+
+
+class TestPasswords(unittest.TestCase):
+    def test_hash_and_verify(self):
+        stored = passwords.hash_password("secret")
+        self.assertEqual(passwords.verify("secret", stored), (True, False))
+        self.assertEqual(passwords.verify("Secret", stored), (False, False))
+        # Salted: the same password never hashes the same twice
+        self.assertNotEqual(passwords.hash_password("secret"), stored)
+
+    def test_pbkdf2(self):
+        with patch.object(passwords, "SCHEME", 'pbkdf2_sha256'), patch.object(passwords, "cost", (1000,)):
+            stored = passwords.hash_password("secret")
+            self.assertTrue(stored.startswith("pbkdf2_sha256$1000$"))
+            self.assertEqual(passwords.verify("secret", stored), (True, False))
+        # Still verified once the scheme changes, and rehashed
+        self.assertEqual(passwords.verify("secret", stored), (True, True))
+
+    def test_legacy_and_invalid_values(self):
+        self.assertEqual(passwords.verify("pass1", "plain$pass1"), (True, True))
+        self.assertEqual(passwords.verify("pass2", "plain$pass1"), (False, True))
+        self.assertEqual(passwords.verify("pass1", None), (False, False))
+        for stored in ("pass1", "scrypt$zz", "scrypt$1$2$00$00", "md5$00$00", ""):
+            with self.subTest(stored=stored):
+                self.assertEqual(passwords.verify("pass1", stored), (False, False))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,141 @@
+import unittest
+import gc
+import os
+import sqlite3
+import sys
+import tempfile
+import weakref
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import db
+import profiles
+import records
+import search
+from service import TweeterService
+
+
+class CountingCursor(sqlite3.Cursor):
+    """Cursor counting the profile lookups run on it, and calling during(), if set, as each one runs."""
+    lookups = 0
+    during = None
+
+    def execute(self, sql, parameters=()):
+        if "FROM users" in sql and "usr IN" in sql:
+            CountingCursor.lookups += 1
+            if CountingCursor.during is not None:
+                CountingCursor.during()
+        return super().execute(sql, parameters)
+
+
+class TestProfiles(unittest.TestCase):
+    def setUp(self):
+        # Real database file seeded from sqlData.sql, opened the way main.py opens it
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "profiles.db")
+        connection = sqlite3.connect(path)
+        with open(os.path.join(parent_dir, "sqlData.sql")) as f:
+            connection.executescript(f.read())
+        connection.close()
+        self.service = TweeterService.open(path)
+        self.cursor = self.service.connection.cursor(CountingCursor)
+        CountingCursor.lookups = 0
+        CountingCursor.during = None
+
+    def tearDown(self):
+        self.service.close()
+        self.directory.cleanup()
+        search.fts_enabled = False
+
+    def test_batched_lookup_and_stats(self):
+        cache = profiles.ProfileCache()
+        found = cache.lookup(self.cursor, [1, 2, 1, 99])
+        self.assertEqual(found[1], records.Profile(1, "Nik", "nik@email.com", "Edmonton", 7))
+        self.assertEqual(sorted(found), [1, 2])
+        self.assertEqual(CountingCursor.lookups, 1)
+        # Users that don't exist are looked up again, the others are not
+        self.assertEqual(cache.names(self.cursor, [2, 99]), {2: "Bob"})
+        self.assertEqual(CountingCursor.lookups, 2)
+        self.assertEqual(cache.names(self.cursor, [1, 2]), {1: "Nik", 2: "Bob"})
+        self.assertEqual(CountingCursor.lookups, 2)
+        stats = cache.stats()
+        self.assertEqual((stats['size'], stats['hits'], stats['misses']), (2, 3, 4))
+        self.assertAlmostEqual(stats['hit_ratio'], 3 / 7)
+
+    def test_lookups_are_split_into_batches(self):
+        cache = profiles.ProfileCache()
+        usrs = range(1, 2 * profiles.BATCH_SIZE + 2)
+        self.assertEqual(sorted(cache.lookup(self.cursor, usrs)), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(CountingCursor.lookups, 3)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = profiles.ProfileCache(capacity=3)
+        cache.lookup(self.cursor, [1, 2, 3])
+        cache.get(self.cursor, 1)
+        cache.get(self.cursor, 4)
+        self.assertEqual(list(cache.entries), [3, 1, 4])
+        self.assertEqual(cache.stats()['evictions'], 1)
+        cache.lookup(self.cursor, [5, 6])
+        self.assertEqual(list(cache.entries), [4, 5, 6])
+        self.assertEqual(len(cache), 3)
+
+    def test_invalidated_on_profile_change(self):
+        self.assertEqual(self.service.user_name(2), "Bob")
+        self.assertTrue(self.service.update_profile(2, "Robert", "bob@email.com", "Banff", -7))
+        self.assertEqual(self.service.user_name(2), "Robert")
+        self.assertEqual(self.service.cache.get(self.cursor, 2).city, "Banff")
+        self.assertFalse(self.service.update_profile(99, "Nobody", None, None, None))
+
+    def test_lookup_racing_a_change_is_not_stored(self):
+        cache = profiles.ProfileCache()
+        CountingCursor.during = lambda: cache.invalidate(3)
+        self.assertEqual(cache.names(self.cursor, [3]), {3: "Bill Longlastname"})
+        self.assertEqual(len(cache), 0)
+        CountingCursor.during = None
+        cache.names(self.cursor, [3])
+        self.assertEqual(len(cache), 1)
+
+    def test_invalidated_on_signup(self):
+        cache = self.service.cache
+        usr = self.service.signup("Ann", "secret", "ann@email.com", "Banff", -7)
+        self.assertNotIn(usr, cache.entries)
+        self.assertEqual(self.service.user_name(usr), "Ann")
+        self.assertIn(usr, cache.entries)
+
+    def test_shared_by_services_on_a_connection(self):
+        other = TweeterService(self.service.connection)
+        self.assertIs(other.cache, self.service.cache)
+        self.assertIs(profiles.cache_for(self.service.connection), self.service.cache)
+        self.assertIsNot(TweeterService(self.service.connection, cache=profiles.ProfileCache()).cache,
+                         self.service.cache)
+
+    def test_registry_does_not_keep_connections_alive(self):
+        connection = db.open_database(":memory:")
+        cache = profiles.cache_for(connection)
+        self.assertIs(profiles.cache_for(connection), cache)
+        reference = weakref.ref(connection)
+        del connection
+        gc.collect()
+        self.assertIsNone(reference())
+        # A plain connection is never registered, so each call gets a cache of its own
+        plain = sqlite3.connect(":memory:")
+        self.assertIsNot(profiles.cache_for(plain), profiles.cache_for(plain))
+        plain.close()
+
+    def test_feed_and_search_names(self):
+        # In sqlData.sql user 1 follows users 2 and 3
+        self.service.compose(2, "hello from Bob #cache")
+        self.service.retweet(3, self.service.compose(4, "John writes"))
+        cache = profiles.ProfileCache()
+        page = self.service.feed_page(1, 5)
+        cached = TweeterService(self.service.connection, self.cursor, cache).feed_page(1, 5)
+        self.assertEqual(cached, page)
+        self.assertEqual(CountingCursor.lookups, 1)
+        self.assertEqual((page[0].name, page[0].writer_name), ("Bill Longlastname", "John"))
+        self.assertEqual((page[1].name, page[1].writer_name), ("Bob", "Bob"))
+        hits = self.service.search_tweets(["#cache"])
+        self.assertEqual([(hit.name, hit.usr) for hit in hits], [("Bob", 2)])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
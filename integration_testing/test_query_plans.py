@@ -0,0 +1,130 @@
+import unittest
+from datetime import date, timedelta
+import os
+import re
+import sys
+import tempfile
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import db
+import generate
+import queries
+import querytrace
+import search
+import service
+import trending
+
+# Tables that grow with activity: a hot statement must reach them through an index
+GUARDED = ('tweets', 'follows', 'retweets', 'mentions')
+# Words that can follow a table name without being its alias
+KEYWORDS = {'WHERE', 'ON', 'JOIN', 'INNER', 'LEFT', 'CROSS', 'NATURAL', 'USING', 'SET', 'VALUES',
+            'GROUP', 'ORDER', 'LIMIT', 'UNION', 'AS', 'WHEN', 'BEGIN', 'FOR', 'DEFAULT', 'SELECT'}
+
+
+def guarded_names(sql):
+    """
+    @return: the guarded tables and every alias the statement gives them.
+    """
+    names = set(GUARDED)
+    for match in re.finditer(r"\b(?:tweets|follows|retweets|mentions)\s+(?:AS\s+)?([A-Za-z_]\w*)", sql, re.I):
+        if match.group(1).upper() not in KEYWORDS:
+            names.add(match.group(1))
+    return names
+
+
+class TestQueryPlans(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Real generated database: migrated, with every derived table and ANALYZE statistics
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "plans.db")
+        generate.generate(cls.path, 500, 5000, follows=10, report=lambda line: None)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.connection = db.open_database(self.path, db.resolve_settings("safe"), querytrace.Tracer())
+        self.cursor = self.connection.cursor()
+        service.install(self.connection, self.cursor)
+        # Only trace what the service runs from here on, not the schema setup
+        self.tracer = self.connection.tracer = querytrace.Tracer(slow_ms=10 ** 9)
+
+    def tearDown(self):
+        self.connection.close()
+        search.fts_enabled = False
+
+    def plan(self, sql, example):
+        self.cursor.execute("EXPLAIN QUERY PLAN " + sql, example)
+        return [row[3] for row in self.cursor.fetchall()]
+
+    def test_every_statement_prepares(self):
+        # Planning fails on a missing table or column, or on the wrong number of parameters
+        for name, sql, example, hot in queries.statements():
+            with self.subTest(statement=name):
+                self.plan(sql, example)
+
+    def test_hot_statements_use_indexes(self):
+        scans = []
+        for name, sql, example, hot in queries.statements():
+            if not hot:
+                continue
+            names = guarded_names(sql)
+            for detail in self.plan(sql, example):
+                match = re.match(r"SCAN (\w+)", detail)
+                if match and match.group(1) in names:
+                    scans.append((name, detail))
+        self.assertEqual(scans, [])
+
+    def test_every_executed_statement_is_registered(self):
+        tweeter = service.TweeterService(self.connection, self.cursor)
+        usr = tweeter.signup("Plan Tester", "pw", "plan@test.com", "Edmonton", -7)
+        tweeter.login(usr, "pw")
+        # Generated passwords are stored as plain text, so this one is rehashed
+        tweeter.login(1, "pass1")
+        tweeter.follow(usr, 1)
+        tweeter.follow(usr, 1)
+        pages = tweeter.iter_feed(1, 2)
+        next(pages)
+        next(pages)
+        tid = tweeter.compose(usr, "planning a #plan #test")
+        tweeter.compose(1, "a reply", replyto=tid)
+        tweeter.retweet(1, tid)
+        tweeter.retweet(1, tid)
+        tweeter.trending()
+        # Tomorrow, the window slides past its first day
+        trending.advance(self.connection, self.cursor, date.today() + timedelta(days=1))
+        tweeter.tweet_info(tid)
+        tweeter.thread(tid)
+        pages = tweeter.iter_replies(tid, 1)
+        next(pages)
+        tweeter.compose(usr, "another reply", replyto=tid)
+        pages = tweeter.iter_replies(tid, 1)
+        next(pages)
+        next(pages)
+        for keywords in (['#plan'], ['planning'], ['#plan', 'planning', 'tweet'], ['ab'], ['#plan', 'ab']):
+            pages = tweeter.iter_search(keywords, 1)
+            next(pages)
+            next(pages, None)
+        for keyword in ("Pl", "Edm"):
+            for pages in (tweeter.iter_users_by_name(keyword, 1), tweeter.iter_users_by_city(keyword, 1)):
+                next(pages, None)
+                next(pages, None)
+        tweeter.user_name(usr)
+        tweeter.profile(1)
+        pages = tweeter.iter_user_tweets(1, 1)
+        next(pages)
+        next(pages)
+        pages = tweeter.iter_followers(1, 1)
+        next(pages)
+        next(pages)
+
+        registered = {queries.shape(sql) for name, sql, example, hot in queries.statements()}
+        executed = {queries.shape(stats['sql']) for stats in self.tracer.summary()}
+        self.assertEqual(executed - registered, set())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,86 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import db
+import querytrace
+from main import parse_args
+
+
+class TestQueryTrace(unittest.TestCase):
+    def setUp(self):
+        # Real in-memory database seeded from sqlData.sql, opened through a tracer
+        self.tracer = querytrace.Tracer(slow_ms=1000)
+        self.connection = db.open_database(":memory:", db.resolve_settings("safe"), self.tracer)
+        self.cursor = self.connection.cursor()
+        with open(os.path.join(parent_dir, "sqlData.sql")) as f:
+            self.cursor.executescript(f.read())
+
+    def tearDown(self):
+        self.connection.close()
+
+    def stats(self, sql):
+        return next(stats for stats in self.tracer.summary() if stats['sql'] == querytrace.statement_key(sql))
+
+    def test_counts_calls_and_rows(self):
+        self.assertIsInstance(self.cursor, querytrace.TracedCursor)
+        for usr in (1, 2):
+            self.cursor.execute("""
+                SELECT text FROM tweets
+                WHERE writer = ?
+            """, (usr,))
+            self.cursor.fetchall()
+        self.cursor.execute("SELECT name FROM users WHERE usr = ?", (1,))
+        self.cursor.fetchone()
+        self.cursor.execute("SELECT usr FROM users;")
+        rows = [row for row in self.cursor]
+
+        stats = self.stats("SELECT text FROM tweets WHERE writer = ?")
+        self.assertEqual(stats['calls'], 2)
+        self.assertEqual(stats['rows'], 6)
+        self.assertGreaterEqual(stats['max_ms'] * 2, stats['mean_ms'])
+        self.assertEqual(self.stats("SELECT name FROM users WHERE usr = ?")['rows'], 1)
+        self.assertEqual(self.stats("SELECT usr FROM users;")['rows'], len(rows))
+
+    def test_executemany(self):
+        self.cursor.executemany("INSERT INTO hashtags VALUES (?);", [("a",), ("b",)])
+        self.assertEqual(self.stats("INSERT INTO hashtags VALUES (?);")['calls'], 1)
+
+    def test_slow_query_logged_with_plan(self):
+        self.tracer.slow_ms = 0
+        with self.assertLogs("tweeter", level="WARNING") as logs:
+            self.cursor.execute("SELECT * FROM tweets WHERE writer = ?", (2,))
+            self.cursor.fetchall()
+        # Logged once per call, not once per fetch
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("parameters: (2,)", logs.output[0])
+        self.assertIn("SCAN tweets", logs.output[0])
+
+    def test_dump_and_export(self):
+        self.cursor.execute("SELECT COUNT(*) FROM users;")
+        self.cursor.fetchone()
+        with self.assertLogs("tweeter", level="INFO") as logs:
+            self.tracer.dump()
+        self.assertIn("SELECT COUNT(*) FROM users;", logs.output[0])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trace.json")
+            self.tracer.export(path)
+            with open(path) as f:
+                exported = json.load(f)
+        self.assertEqual(exported['slow_ms'], 1000)
+        self.assertIn("SELECT COUNT(*) FROM users;", [stats['sql'] for stats in exported['statements']])
+
+    def test_parse_args(self):
+        args = parse_args(["--trace", "--slow-ms", "5", "--trace-output", "trace.json"])
+        self.assertTrue(args.trace)
+        self.assertEqual(args.slow_ms, 5)
+        self.assertEqual(args.trace_output, "trace.json")
+        self.assertFalse(parse_args([]).trace)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,144 @@
+import unittest
+import os
+import sqlite3
+import sys
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import records
+import search
+
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        # Real in-memory database seeded from sqlData.sql
+        self.connection = sqlite3.connect(":memory:")
+        self.cursor = self.connection.cursor()
+        with open(os.path.join(parent_dir, "sqlData.sql")) as f:
+            self.cursor.executescript(f.read())
+        self.assertTrue(search.install(self.connection, self.cursor))
+
+    def tearDown(self):
+        search.fts_enabled = False
+        self.connection.close()
+
+    def search_text(self, keywords):
+        """Every tweet whose text contains any of the keywords, newest first."""
+        return search.search_tweets(self.cursor, [], keywords, 100)
+
+    def like_search(self, keywords):
+        """The tids the LIKE path finds for the keywords."""
+        search.fts_enabled = False
+        rows = self.search_text(keywords)
+        search.fts_enabled = True
+        return sorted(row.tid for row in rows)
+
+    def test_fts_matches_like(self):
+        for keywords in (["tweet"], ["TWEET 1"], ["bill"], ["ob t"], ["nik", "luke"], ["nothing here"]):
+            rows = self.search_text(keywords)
+            self.assertEqual(sorted(row.tid for row in rows), self.like_search(keywords))
+
+    def test_rows_newest_first(self):
+        rows = self.search_text(["tweet"])
+        self.assertEqual(rows[0], records.TweetHit("Bill Longlastname", 3, "2024-04-30", "Bill tweet 2", 6))
+        dates = [row.date for row in rows]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+    def test_insert_is_indexed(self):
+        self.cursor.execute("INSERT INTO tweets VALUES (100, 2, '2025-01-01', 'Snowing in Calgary', NULL);")
+        rows = self.search_text(["snow"])
+        self.assertEqual(rows, [records.TweetHit("Bob", 2, "2025-01-01", "Snowing in Calgary", 100)])
+        self.cursor.execute("DELETE FROM tweets WHERE tid = 100;")
+        self.assertEqual(self.search_text(["snow"]), [])
+
+    def test_short_keyword_uses_like(self):
+        rows = self.search_text(["ik"])
+        self.assertEqual(sorted(row.tid for row in rows), [1, 2])
+
+    def test_quotes_matched_literally(self):
+        self.cursor.execute("INSERT INTO tweets VALUES (100, 2, '2025-01-01', 'He said \"hi there\"', NULL);")
+        rows = self.search_text(['"hi'])
+        self.assertEqual([row.tid for row in rows], [100])
+
+    def test_search_covers_every_keyword(self):
+        self.cursor.execute("INSERT INTO hashtags VALUES ('snow');")
+        self.cursor.execute("INSERT INTO tweets VALUES (100, 2, '2025-01-01', 'Snowing #snow', NULL);")
+        self.cursor.execute("INSERT INTO mentions VALUES (100, 'snow');")
+        rows = search.search_tweets(self.cursor, ["snow"], ["Nik", "Luke"], 100)
+        self.assertEqual(sorted(row.tid for row in rows), [1, 2, 11, 12, 100])
+
+    def test_search_dedups_by_tid(self):
+        # "tweet" and "tweet 1" both match tweet 1, which is returned once
+        rows = search.search_tweets(self.cursor, [], ["tweet", "tweet 1", "Nik"], 100)
+        tids = [row.tid for row in rows]
+        self.assertEqual(len(tids), len(set(tids)))
+        self.assertEqual(sorted(tids), self.like_search(["tweet"]))
+
+    def test_search_keyset_pages(self):
+        rows = search.search_tweets(self.cursor, [], ["tweet"], 100)
+        self.assertEqual(rows, sorted(rows, key=lambda row: (row.date, row.tid), reverse=True))
+        for size in (1, 3, 5, len(rows)):
+            pages = list(search.iter_search(self.cursor, [], ["tweet"], size))
+            self.assertEqual([row for page in pages for row in page], rows)
+
+    def test_search_like_fallback_matches(self):
+        rows = search.search_tweets(self.cursor, [], ["tweet 2", "Bob"], 100)
+        search.fts_enabled = False
+        self.assertEqual(search.search_tweets(self.cursor, [], ["tweet 2", "Bob"], 100), rows)
+
+    def test_search_nothing(self):
+        self.assertIsNone(search.plan_search([], [], 5))
+        self.assertEqual(list(search.iter_search(self.cursor, [], [], 5)), [])
+
+    def test_user_search_matches_like(self):
+        for column in search.USER_COLUMNS:
+            for keyword in ("bob", "LONG", "cal", "ary", "b", "nobody"):
+                rows = search.search_users(self.cursor, column, keyword, 100)
+                search.fts_enabled = False
+                self.assertEqual(search.search_users(self.cursor, column, keyword, 100), rows)
+                search.fts_enabled = True
+
+    def test_user_search_ranks_shortest_first(self):
+        self.cursor.execute("INSERT INTO users VALUES (100, 'pw', 'Bobbi', 'b@b.com', 'Calgary', -7);")
+        rows, after = search.search_users(self.cursor, 'name', "bob", 100)
+        self.assertEqual(rows[:2], [records.UserHit(2, "Bob"), records.UserHit(100, "Bobbi")])
+        self.assertIsNone(after)
+
+    def test_user_search_keyset_pages(self):
+        # Users with equal names are only told apart by usr
+        self.cursor.executemany("INSERT INTO users VALUES (?, 'pw', ?, 'x@x.com', ?, -7);",
+                                [(100 + n, ["Bo", "Rob", "Bobbi"][n % 3], ["Calgary", "Cal"][n % 2]) for n in range(20)])
+        for column, keyword in (('name', "bo"), ('name', "bob"), ('city', "cal")):
+            rows, after = search.search_users(self.cursor, column, keyword, 100)
+            self.assertIsNone(after)
+            self.assertEqual(len(rows), len(set(rows)))
+            for size in (1, 4, len(rows) - 1, len(rows)):
+                pages = list(search.iter_user_search(self.cursor, column, keyword, size))
+                self.assertEqual([row for page in pages for row in page], rows)
+                self.assertTrue(all(len(page) == size for page in pages[:-1]))
+
+    def test_user_search_stops_at_last_page(self):
+        self.cursor.execute("SELECT COUNT(*) FROM users WHERE city LIKE '%cal%';")
+        count = self.cursor.fetchone()[0]
+        rows, after = search.search_users(self.cursor, 'city', "cal", count)
+        self.assertEqual((len(rows), after), (count, None))
+        rows, after = search.search_users(self.cursor, 'city', "cal", count - 1)
+        self.assertIsNotNone(after)
+        self.assertEqual(len(search.search_users(self.cursor, 'city', "cal", count, after)[0]), 1)
+
+    def test_user_changes_are_indexed(self):
+        self.cursor.execute("INSERT INTO users VALUES (100, 'pw', 'Zed', 'z@z.com', 'Yellowknife', -7);")
+        self.assertEqual(search.search_users(self.cursor, 'city', "knife", 5), ([records.UserHit(100, "Zed")], None))
+        self.cursor.execute("UPDATE users SET city = 'Whitehorse' WHERE usr = 100;")
+        self.assertEqual(search.search_users(self.cursor, 'city', "knife", 5), ([], None))
+        self.assertEqual(search.search_users(self.cursor, 'city', "horse", 5), ([records.UserHit(100, "Zed")], None))
+        self.cursor.execute("DELETE FROM users WHERE usr = 100;")
+        self.assertEqual(search.search_users(self.cursor, 'name', "Zed", 5), ([], None))
+
+    def test_user_search_rejects_other_columns(self):
+        with self.assertRaises(ValueError):
+            search.search_users(self.cursor, 'pwd', "pass", 5)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
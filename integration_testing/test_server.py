@@ -0,0 +1,177 @@
+import unittest
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from unittest.mock import patch
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import passwords
+import search
+import server
+import service
+
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # Real database file seeded from sqlData.sql, served on a free local port
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "server.db")
+        connection = sqlite3.connect(path)
+        with open(os.path.join(parent_dir, "sqlData.sql")) as f:
+            connection.executescript(f.read())
+        service.install(connection, connection.cursor())
+        connection.close()
+        self.server = server.TweeterServer(path, workers=2)
+        self.listener = await asyncio.start_server(self.server.handle, '127.0.0.1', 0)
+        self.port = self.listener.sockets[0].getsockname()[1]
+        self.writers = []
+
+    async def asyncTearDown(self):
+        # Disconnect the clients before the workers stop
+        for writer in self.writers:
+            writer.close()
+            await writer.wait_closed()
+        self.listener.close()
+        await self.listener.wait_closed()
+        self.server.close()
+        self.directory.cleanup()
+        search.fts_enabled = False
+
+    async def open_session(self):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        self.writers.append(writer)
+        return reader, writer
+
+    async def send(self, session, line):
+        reader, writer = session
+        writer.write(line + b"\n")
+        await writer.drain()
+        return json.loads(await reader.readline())
+
+    async def request(self, session, op, **fields):
+        return await self.send(session, json.dumps({'id': op, 'op': op, **fields}).encode())
+
+    async def test_login(self):
+        session = await self.open_session()
+        response = await self.request(session, 'login', usr=1, password='wrong')
+        self.assertEqual(response, {'id': 'login', 'ok': False, 'error': "Login failed"})
+        response = await self.request(session, 'login', usr=1, password='pass1')
+        self.assertEqual(response['result'], {'usr': 1, 'name': 'Nik'})
+        self.assertFalse((await self.request(session, 'login', usr=99, password='pass1'))['ok'])
+
+    async def test_signup_and_rehash(self):
+        session = await self.open_session()
+        usr = (await self.request(session, 'signup', name="Ann", password="secret"))['result']['usr']
+        self.assertTrue((await self.request(session, 'login', usr=usr, password='secret'))['ok'])
+        await self.request(session, 'login', usr=2, password='pass2')
+        connection = sqlite3.connect(os.path.join(self.directory.name, "server.db"))
+        stored = dict(connection.execute("SELECT usr, pwd FROM users WHERE usr IN (?, 2, 3);", (usr,)).fetchall())
+        connection.close()
+        self.assertEqual(passwords.verify("secret", stored[usr]), (True, False))
+        # User 2's plain text password was rehashed when they logged in, user 3's is left until they do
+        self.assertEqual(passwords.verify("pass2", stored[2]), (True, False))
+        self.assertEqual(stored[3], "plain$pass3")
+
+    async def test_requires_login(self):
+        session = await self.open_session()
+        response = await self.request(session, 'feed')
+        self.assertEqual(response['error'], "Not logged in")
+
+    async def test_bad_requests(self):
+        session = await self.open_session()
+        self.assertEqual((await self.send(session, b"not json"))['error'], "Invalid JSON")
+        self.assertEqual((await self.request(session, 'drop'))['error'], "Unknown op: drop")
+        self.assertEqual((await self.request(session, 'login', usr=1))['error'], "Missing field: password")
+        self.assertEqual((await self.request(session, 'login', usr=1, password=1))['error'], "password must be a string")
+        self.assertEqual((await self.request(session, 'signup', name="Ann", password=[]))['error'],
+                         "password must be a string")
+        # The session is still usable after errors
+        self.assertTrue((await self.request(session, 'login', usr=1, password='pass1'))['ok'])
+        self.assertEqual((await self.request(session, 'search', keywords=[""]))['error'], "No keywords given")
+        self.assertEqual((await self.request(session, 'search', keywords=[1]))['error'],
+                         "keywords must be a string or a list of strings")
+        # An unexpected error is answered and logged instead of dropping the connection
+        with patch.object(service.TweeterService, 'tweet_info', side_effect=RuntimeError("bug")):
+            with self.assertLogs("tweeter", level="ERROR"):
+                response = await self.request(session, 'tweet_info', tid=1)
+        self.assertEqual(response, {'id': 'tweet_info', 'ok': False, 'error': "Internal error"})
+        self.assertTrue((await self.request(session, 'tweet_info', tid=1))['ok'])
+
+    async def test_oversized_request(self):
+        session = await self.open_session()
+        await self.request(session, 'login', usr=1, password='pass1')
+        # Longer than the stream limit: answered, then the next request is read from its start
+        for length in (server.MAX_REQUEST_BYTES + 10, 3 * server.MAX_REQUEST_BYTES):
+            response = await self.request(session, 'compose', text="x" * length)
+            self.assertEqual(response, {'id': None, 'ok': False, 'error': "Request too long"})
+            self.assertTrue((await self.request(session, 'tweet_info', tid=1))['ok'])
+
+    async def test_feed_pages(self):
+        session = await self.open_session()
+        await self.request(session, 'login', usr=2, password='pass2')
+        first = (await self.request(session, 'feed', limit=2))['result']
+        self.assertEqual(len(first['rows']), 2)
+        second = (await self.request(session, 'feed', limit=2, after=first['after']))['result']
+        self.assertNotEqual(first['rows'][0], second['rows'][0])
+        self.assertEqual(set(first['rows'][0]), set(server.FEED_FIELDS))
+
+    async def test_compose_follow_retweet_search(self):
+        writer_session, reader_session = await self.open_session(), await self.open_session()
+        await self.request(writer_session, 'login', usr=6, password='pass6')
+        await self.request(reader_session, 'login', usr=2, password='pass2')
+        tid = (await self.request(writer_session, 'compose', text="served #served"))['result']['tid']
+
+        # User 2 only sees user 6's tweet once they follow them
+        followed = await self.request(reader_session, 'follow', usr=6)
+        self.assertEqual(followed['result'], {'followed': True})
+        feed = (await self.request(reader_session, 'feed', limit=1))['result']
+        self.assertEqual(feed['rows'][0]['tid'], tid)
+
+        self.assertTrue((await self.request(reader_session, 'retweet', tid=tid))['result']['retweeted'])
+        self.assertFalse((await self.request(reader_session, 'retweet', tid=tid))['result']['retweeted'])
+        info = (await self.request(reader_session, 'tweet_info', tid=tid))['result']
+        self.assertEqual(info['retweets'], 1)
+
+        found = (await self.request(reader_session, 'search', keywords="#served"))['result']
+        self.assertEqual([row['tid'] for row in found['rows']], [tid])
+        self.assertIsNone(found['after'])
+
+        trends = (await self.request(reader_session, 'trending', limit=3))['result']
+        self.assertEqual(trends['rows'], [{'term': 'served', 'count': 1}])
+        self.assertEqual(trends['days'], 7)
+        self.assertFalse((await self.request(reader_session, 'trending', limit=0))['ok'])
+
+    async def test_thread_and_replies(self):
+        session = await self.open_session()
+        await self.request(session, 'login', usr=4, password='pass4')
+        tids = [(await self.request(session, 'compose', text=f"reply {i}", replyto=3))['result']['tid']
+                for i in range(3)]
+        thread = (await self.request(session, 'thread', tid=3, width=2))['result']
+        self.assertEqual([(row['tid'], row['level']) for row in thread['rows']],
+                         [(1, -1), (3, 0), (tids[0], 1), (tids[1], 1)])
+        self.assertEqual(thread['rows'][1]['replies'], 3)
+        first = (await self.request(session, 'replies', tid=3, limit=2))['result']
+        second = (await self.request(session, 'replies', tid=3, limit=2, after=first['after']))['result']
+        self.assertEqual([row['tid'] for row in first['rows'] + second['rows']], tids)
+        self.assertIsNone(second['after'])
+        self.assertFalse((await self.request(session, 'thread', tid=3, width=0))['ok'])
+
+    async def test_concurrent_sessions(self):
+        sessions = [await self.open_session() for _ in range(6)]
+        for usr, session in enumerate(sessions, 1):
+            await self.request(session, 'login', usr=usr, password=f"pass{usr}")
+
+        async def compose_five(session):
+            return [(await self.request(session, 'compose', text="concurrent"))['result']['tid']
+                    for _ in range(5)]
+
+        tids = sum(await asyncio.gather(*(compose_five(session) for session in sessions)), [])
+        self.assertEqual(len(set(tids)), 30)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
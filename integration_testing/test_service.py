@@ -0,0 +1,151 @@
+import unittest
+import os
+import sqlite3
+import sys
+import tempfile
+from unittest.mock import patch
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import passwords
+import search
+from records import UserHit
+from service import TweeterService, parse_keywords
+
+
+class TestService(unittest.TestCase):
+    def setUp(self):
+        # Real database file seeded from sqlData.sql, opened the way main.py opens it
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "service.db")
+        connection = sqlite3.connect(path)
+        with open(os.path.join(parent_dir, "sqlData.sql")) as f:
+            connection.executescript(f.read())
+        connection.close()
+        self.service = TweeterService.open(path)
+
+    def tearDown(self):
+        self.service.close()
+        self.directory.cleanup()
+        search.fts_enabled = False
+
+    def test_parse_keywords(self):
+        self.assertEqual(parse_keywords(["#fun", "day", "#Win"]), (["fun", "Win"], ["day"]))
+        self.assertEqual(parse_keywords(["", "day"]), ([], ["day"]))
+
+    def test_signup_and_login(self):
+        usr = self.service.signup("Ann", "secret", "ann@email.com", "Banff", 7)
+        self.assertEqual(usr, 7)
+        self.assertEqual(self.service.login(usr, "secret")[2], "Ann")
+        self.assertIsNone(self.service.login(usr, "wrong"))
+
+    def test_legacy_password_rehashed_on_login(self):
+        cursor = self.service.cursor
+        cursor.execute("SELECT pwd FROM users WHERE usr = 1;")
+        self.assertEqual(cursor.fetchone(), ('plain$pass1',))
+        self.assertIsNone(self.service.login(1, "wrong"))
+        user = self.service.login(1, "pass1")
+        self.assertEqual(user[2], "Nik")
+        cursor.execute("SELECT pwd FROM users WHERE usr = 1;")
+        stored = cursor.fetchone()[0]
+        self.assertEqual(user[1], stored)
+        self.assertTrue(stored.startswith(passwords.SCHEME + "$"))
+        self.assertNotIn("pass1", stored)
+        # Hashed rows are only rehashed when the cost changes
+        self.assertEqual(self.service.login(1, "pass1")[1], stored)
+        with patch.object(passwords, "cost", passwords.cost[:-1] + (2,)):
+            self.assertNotEqual(self.service.login(1, "pass1")[1], stored)
+        self.assertIsNone(self.service.login(99, "pass1"))
+
+    def test_compose_reaches_followers_and_search(self):
+        tid = self.service.compose(6, "service test #servicetag")
+        self.assertEqual(self.service.profile(6)['recent'][0], "service test #servicetag")
+        # User 4 follows user 6
+        self.assertEqual(self.service.feed_page(4, 1)[0].tid, tid)
+        self.assertEqual([row.tid for row in self.service.search_tweets(["#servicetag"])], [tid])
+        with self.assertRaises(ValueError):
+            self.service.compose(6, "")
+
+    def test_reply_and_retweet_counts(self):
+        before = self.service.tweet_info(1)
+        self.service.compose(2, "a reply", replyto=1)
+        self.assertTrue(self.service.retweet(5, 1))
+        self.assertFalse(self.service.retweet(5, 1))
+        after = self.service.tweet_info(1)
+        self.assertEqual(after['replies'], before['replies'] + 1)
+        self.assertEqual(after['retweets'], before['retweets'] + 1)
+
+    def test_follow(self):
+        with self.assertRaises(ValueError):
+            self.service.follow(1, 1)
+        self.assertFalse(self.service.follow(1, 2))
+        self.assertTrue(self.service.follow(2, 1))
+        followers = [row[:2] for page in self.service.iter_followers(1) for row in page]
+        self.assertIn((2, "Bob"), followers)
+        self.assertEqual(self.service.follower_count(1), len(followers))
+        self.assertEqual(self.service.profile(1)['followers'], len(followers))
+
+    def test_duplicate_from_another_connection(self):
+        # A second worker connection repeating a follow or retweet already made gets False, not
+        # an IntegrityError, and is left with no transaction open
+        other = TweeterService.open(os.path.join(self.directory.name, "service.db"))
+        self.assertTrue(self.service.follow(2, 1))
+        self.assertTrue(self.service.retweet(5, 1))
+        self.assertFalse(other.follow(2, 1))
+        self.assertFalse(other.retweet(5, 1))
+        self.assertFalse(other.connection.in_transaction)
+        self.assertEqual(other.tweet_info(1)['retweets'], self.service.tweet_info(1)['retweets'])
+        other.close()
+
+    def test_followers_pages(self):
+        # Followers sharing a start date are ordered by usr
+        cursor = self.service.cursor
+        cursor.executemany("INSERT INTO users VALUES (?, 'pw', ?, 'f@f.com', 'Banff', 7);",
+                           [(100 + n, f"Fan {n}") for n in range(25)])
+        cursor.executemany("INSERT INTO follows VALUES (?, 5, ?);",
+                           [(100 + n, f"2025-01-{n % 4 + 1:02d}") for n in range(25)])
+        self.service.connection.commit()
+        self.service.cursor.execute("SELECT flwer, start_date FROM follows WHERE flwee = 5;")
+        expected = sorted(self.service.cursor.fetchall(), key=lambda row: (row[1], row[0]), reverse=True)
+
+        self.assertEqual(self.service.follower_count(5), len(expected))
+        for size in (1, 7, len(expected) - 1, len(expected)):
+            pages = list(self.service.iter_followers(5, size))
+            self.assertEqual([(row[0], row[2]) for page in pages for row in page], expected)
+            self.assertTrue(all(len(page) == size for page in pages[:-1]))
+        page, after = self.service.followers_page(5, len(expected))
+        self.assertIsNone(after)
+        self.assertEqual(list(self.service.iter_followers(99)), [])
+
+    def test_user_tweets_pages(self):
+        # Tweets sharing a date are ordered by tid
+        for n in range(23):
+            self.service.compose(5, f"Post {n}")
+        self.service.cursor.execute("UPDATE tweets SET tdate = '2025-02-0' || (tid % 3 + 1) WHERE writer = 5;")
+        self.service.connection.commit()
+        self.service.cursor.execute("SELECT text, tdate, tid FROM tweets WHERE writer = 5;")
+        expected = sorted(self.service.cursor.fetchall(), key=lambda row: (row[1], row[2]), reverse=True)
+
+        for size in (1, 5, len(expected) - 1, len(expected)):
+            pages = list(self.service.iter_user_tweets(5, size))
+            self.assertEqual([row for page in pages for row in page], expected)
+            self.assertTrue(all(len(page) == size for page in pages[:-1]))
+        self.assertEqual(self.service.profile(5)['recent'], [row[0] for row in expected[:3]])
+        self.assertEqual(list(self.service.iter_user_tweets(99)), [])
+
+    def test_user_search(self):
+        self.assertEqual(self.service.search_users_by_city("Calgary"),
+                         ([UserHit(2, "Bob"), UserHit(3, "Bill Longlastname")], None))
+        # Shortest names first, one per page
+        page, after = self.service.search_users_by_name("l", 1)
+        self.assertEqual(page, [UserHit(6, "Luke")])
+        self.assertEqual(self.service.search_users_by_name("l", 1, after), ([UserHit(3, "Bill Longlastname")], None))
+        self.assertEqual(list(self.service.iter_users_by_name("l", 1)),
+                         [[UserHit(6, "Luke")], [UserHit(3, "Bill Longlastname")]])
+        self.assertEqual(list(self.service.iter_users_by_city("nowhere")), [])
+        self.assertEqual(self.service.user_name(1), "Nik")
+        self.assertIsNone(self.service.user_name(99))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,106 @@
+import unittest
+import os
+import sqlite3
+import sys
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import stats
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        # Real in-memory database seeded from sqlData.sql
+        self.connection = sqlite3.connect(":memory:")
+        self.cursor = self.connection.cursor()
+        with open(os.path.join(parent_dir, "sqlData.sql")) as f:
+            self.cursor.executescript(f.read())
+        stats.install(self.connection, self.cursor)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def counted(self, usr):
+        """The counters as userinfo_pull used to compute them."""
+        self.cursor.execute("SELECT COUNT(*) FROM tweets WHERE writer = ?", (usr,))
+        tweet_count = self.cursor.fetchone()[0]
+        self.cursor.execute("SELECT COUNT(*) FROM follows WHERE flwer = ?", (usr,))
+        following_count = self.cursor.fetchone()[0]
+        self.cursor.execute("SELECT COUNT(*) FROM follows WHERE flwee = ?", (usr,))
+        return (tweet_count, following_count, self.cursor.fetchone()[0])
+
+    def test_backfill(self):
+        for usr in range(1, 7):
+            self.assertEqual(stats.user_counts(self.cursor, usr), self.counted(usr))
+        self.assertEqual(stats.check(self.cursor), [])
+
+    def test_unknown_user(self):
+        self.assertEqual(stats.user_counts(self.cursor, 99), (0, 0, 0))
+
+    def test_triggers_track_inserts_and_deletes(self):
+        self.cursor.execute("INSERT INTO users VALUES (7, 'pass7', 'Ann', 'ann@email.com', 'Edmonton', 7);")
+        self.cursor.execute("INSERT INTO tweets VALUES (100, 7, '2025-01-01', 'Ann tweet 1', NULL);")
+        self.cursor.execute("INSERT INTO follows VALUES (7, 1, '2025-01-01');")
+        self.cursor.execute("INSERT INTO follows VALUES (2, 7, '2025-01-01');")
+        self.assertEqual(stats.user_counts(self.cursor, 7), (1, 1, 1))
+        self.assertEqual(stats.user_counts(self.cursor, 1), self.counted(1))
+        self.cursor.execute("DELETE FROM follows WHERE flwer = 7;")
+        self.cursor.execute("DELETE FROM tweets WHERE tid = 100;")
+        self.assertEqual(stats.user_counts(self.cursor, 7), (0, 0, 1))
+        self.assertEqual(stats.user_counts(self.cursor, 1), self.counted(1))
+        self.assertEqual(stats.check(self.cursor), [])
+
+    def test_check_reports_and_rebuild_repairs_drift(self):
+        self.cursor.execute("UPDATE user_stats SET follower_count = 40 WHERE usr = 3;")
+        self.cursor.execute("DELETE FROM user_stats WHERE usr = 4;")
+        drift = stats.check(self.cursor)
+        self.assertEqual(drift, [(3, (2, 2, 40), self.counted(3)), (4, (0, 0, 0), self.counted(4))])
+        stats.rebuild(self.connection, self.cursor)
+        self.assertEqual(stats.check(self.cursor), [])
+
+    def test_install_backfills_each_missing_table(self):
+        # A database first opened before tweet_stats existed already has user_stats
+        self.cursor.execute("DROP TABLE tweet_stats;")
+        self.cursor.execute("UPDATE user_stats SET follower_count = 40 WHERE usr = 3;")
+        stats.install(self.connection, self.cursor)
+        self.assertEqual(stats.check_tweets(self.cursor), [])
+        self.assertEqual(stats.tweet_counts(self.cursor, 1), self.counted_tweet(1))
+        # The table that was there is left as it is
+        self.assertEqual(stats.user_counts(self.cursor, 3)[2], 40)
+
+    def counted_tweet(self, tid):
+        """The counters as Tweet information used to compute them."""
+        self.cursor.execute("""
+                            SELECT *
+                            FROM tweets t1, tweets t2
+                            WHERE t1.tid != t2.tid AND t1.tid = t2.replyto AND t1.tid = ?
+                            """, (tid,))
+        replies = len(self.cursor.fetchall())
+        self.cursor.execute("SELECT * FROM tweets t, retweets rt WHERE t.tid = rt.tid AND t.tid = ?", (tid,))
+        return (replies, len(self.cursor.fetchall()))
+
+    def test_tweet_backfill(self):
+        for tid in range(1, 15):
+            self.assertEqual(stats.tweet_counts(self.cursor, tid), self.counted_tweet(tid))
+        self.assertEqual(stats.check_tweets(self.cursor), [])
+
+    def test_tweet_triggers(self):
+        self.cursor.execute("INSERT INTO tweets VALUES (100, 2, '2025-01-01', 'Reply to Nik', 1);")
+        self.cursor.execute("INSERT INTO tweets VALUES (101, 2, '2025-01-01', 'Replying to myself', 101);")
+        self.cursor.execute("INSERT INTO retweets VALUES (4, 1, '2025-01-01');")
+        self.assertEqual(stats.tweet_counts(self.cursor, 1), (2, 1))
+        self.assertEqual(stats.tweet_counts(self.cursor, 101), (0, 0))
+        self.cursor.execute("DELETE FROM retweets WHERE usr = 4 AND tid = 1;")
+        self.cursor.execute("DELETE FROM tweets WHERE tid IN (100, 101);")
+        self.assertEqual(stats.tweet_counts(self.cursor, 1), self.counted_tweet(1))
+        self.assertEqual(stats.check_tweets(self.cursor), [])
+
+    def test_check_tweets_reports_drift(self):
+        self.cursor.execute("UPDATE tweet_stats SET retweet_count = 9 WHERE tid = 4;")
+        self.assertEqual(stats.check_tweets(self.cursor), [(4, (0, 9), (0, 2))])
+        stats.rebuild(self.connection, self.cursor)
+        self.assertEqual(stats.check_tweets(self.cursor), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,128 @@
+import unittest
+import os
+import sqlite3
+import sys
+import tempfile
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import search
+import threads
+from service import TweeterService
+
+
+def walk(cursor, tid, depth, width):
+    """
+    The conversation read one query per tweet, to check read_thread against.
+    @return: list of (tid, level) in read_thread order, without a limit on the replies read in all.
+    """
+    ancestors = []
+    current = tid
+    cursor.execute("SELECT replyto FROM tweets WHERE tid = ?;", (current,))
+    replyto = cursor.fetchone()[0]
+    while replyto is not None and replyto != current:
+        ancestors.insert(0, (replyto, -len(ancestors) - 1))
+        current = replyto
+        cursor.execute("SELECT replyto FROM tweets WHERE tid = ?;", (current,))
+        replyto = cursor.fetchone()[0]
+
+    def below(parent, level):
+        if level == depth:
+            return []
+        cursor.execute("""
+            SELECT tid FROM tweets WHERE replyto = ? AND tid != replyto ORDER BY tdate, tid LIMIT ?;
+        """, (parent, width))
+        rows = []
+        for (child,) in cursor.fetchall():
+            rows.append((child, level + 1))
+            rows.extend(below(child, level + 1))
+        return rows
+
+    return ancestors + [(tid, 0)] + below(tid, 0)
+
+
+class TestThreads(unittest.TestCase):
+    def setUp(self):
+        # Real database file seeded from sqlData.sql, opened the way main.py opens it
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "threads.db")
+        connection = sqlite3.connect(path)
+        with open(os.path.join(parent_dir, "sqlData.sql")) as f:
+            connection.executescript(f.read())
+        connection.close()
+        self.service = TweeterService.open(path)
+        self.cursor = self.service.cursor
+
+    def tearDown(self):
+        self.service.close()
+        self.directory.cleanup()
+        search.fts_enabled = False
+
+    def tree(self, root, depth, width):
+        """
+        Reply to root with width replies per tweet, depth levels deep.
+        @return: tids of the replies by level, level 1 first.
+        """
+        levels = [[root]]
+        for level in range(depth):
+            levels.append([self.service.compose(1 + (parent + i) % 6, f"reply {level} {i}", replyto=parent)
+                           for parent in levels[-1] for i in range(width)])
+        return levels[1:]
+
+    def test_reads_ancestors_and_replies(self):
+        # In sqlData.sql tweet 3 replies to tweet 1
+        reply = self.service.compose(4, "reply to Bob", replyto=3)
+        thread = self.service.thread(3)
+        self.assertEqual([(row[0], row[1], row[2]) for row in thread], [(1, None, -1), (3, 1, 0), (reply, 3, 1)])
+        self.assertEqual(thread[1][4], "Bob")
+        self.assertEqual(thread[1][7], 1)
+        self.assertEqual(self.service.thread(reply)[0][0], 1)
+        self.assertEqual(self.service.thread(999), [])
+
+    def test_self_reply_is_not_a_cycle(self):
+        self.cursor.execute("UPDATE tweets SET replyto = tid WHERE tid = 5;")
+        self.assertEqual([row[0] for row in self.service.thread(5)], [5])
+
+    def test_matches_a_walk_of_the_tree(self):
+        levels = self.tree(7, 3, 3)
+        deep = levels[-1][4]
+        for tid, depth, width in ((7, 4, 5), (7, 2, 2), (levels[0][1], 3, 1), (deep, 4, 5)):
+            with self.subTest(tid=tid, depth=depth, width=width):
+                thread = threads.read_thread(self.cursor, tid, depth=depth, width=width)
+                self.assertEqual([(row[0], row[2]) for row in thread], walk(self.cursor, tid, depth, width))
+
+    def test_limits(self):
+        levels = self.tree(7, 3, 4)
+        thread = threads.read_thread(self.cursor, 7, depth=2, width=3)
+        self.assertEqual(max(row[2] for row in thread), 2)
+        shown = threads.shown_replies(thread)
+        self.assertEqual(shown[7], 3)
+        self.assertEqual(max(shown.values()), 3)
+        # Every reply is counted, whether or not it was read
+        self.assertEqual(thread[0][7], 4)
+        # Nodes are cut breadth first: the first level is whole
+        thread = threads.read_thread(self.cursor, 7, nodes=6)
+        self.assertEqual(len(thread), 1 + 6)
+        self.assertEqual(sorted(row[0] for row in thread if row[2] == 1), levels[0])
+        # At most MAX_NODES replies by default, however wide the tree is
+        self.cursor.executemany("INSERT INTO tweets VALUES (?, 2, '2025-01-01', 'wide', 1);",
+                                [(tid,) for tid in range(1000, 1000 + threads.MAX_NODES + 50)])
+        thread = threads.read_thread(self.cursor, 1, width=threads.MAX_NODES + 50)
+        self.assertEqual(sum(1 for row in thread if row[2] > 0), threads.MAX_NODES)
+        thread = threads.read_thread(self.cursor, levels[2][0], ancestors=1)
+        self.assertEqual([row[2] for row in thread], [-1, 0])
+
+    def test_reply_pages(self):
+        replies = self.tree(8, 1, 7)[0]
+        page, after = self.service.replies_page(8, 3)
+        self.assertEqual([row[0] for row in page], replies[:3])
+        self.assertEqual(after, (page[-1][5], replies[2]))
+        pages = list(self.service.iter_replies(8, 3))
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual([row[0] for page in pages for row in page], replies)
+        self.assertEqual(list(self.service.iter_replies(8, 7)), [pages[0] + pages[1] + pages[2]])
+        self.assertEqual(list(self.service.iter_replies(9, 3)), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
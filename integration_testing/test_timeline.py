@@ -0,0 +1,98 @@
+import unittest
+import os
+import sqlite3
+import sys
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import records
+import timeline
+
+
+class TestTimeline(unittest.TestCase):
+    def setUp(self):
+        # Real in-memory database seeded from sqlData.sql
+        self.connection = sqlite3.connect(":memory:")
+        self.cursor = self.connection.cursor()
+        with open(os.path.join(parent_dir, "sqlData.sql")) as f:
+            self.cursor.executescript(f.read())
+        timeline.install(self.connection, self.cursor)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def joined_feed(self, usr):
+        """The Recent Activity rows as the original join over follows/tweets/retweets produced them, as records."""
+        self.cursor.execute("""
+                            SELECT u.name, 'Tweet', t.tdate, t.text, t.tid, u.usr, u.name, u.usr
+                            FROM tweets t, follows f, users u
+                            WHERE f.flwer = ? AND f.flwee = t.writer AND t.writer = u.usr
+                            """, (usr,))
+        rows = self.cursor.fetchall()
+        self.cursor.execute("""
+                            SELECT u1.name, 'Retweet', rt.rdate, t.text, t.tid, u1.usr, u2.name, u2.usr
+                            FROM retweets rt, tweets t, follows f, users u1, users u2
+                            WHERE f.flwer = ? AND f.flwee = rt.usr AND u1.usr = rt.usr
+                             AND rt.tid = t.tid AND t.writer = u2.usr
+                            """, (usr,))
+        return [records.FeedItem(*row) for row in rows + self.cursor.fetchall()]
+
+    def test_backfill_matches_join(self):
+        for usr in range(1, 7):
+            rows = timeline.read_timeline(self.cursor, usr, 1000)
+            self.assertCountEqual(rows, self.joined_feed(usr))
+            dates = [row.date for row in rows]
+            self.assertEqual(dates, sorted(dates, reverse=True))
+
+    def test_keyset_paging(self):
+        rows = timeline.read_timeline(self.cursor, 6, 1000)
+        first = timeline.read_timeline(self.cursor, 6, 2)
+        second = timeline.read_timeline(self.cursor, 6, 2, timeline.timeline_key(first[-1]))
+        self.assertEqual(first + second, rows[:4])
+
+    def test_iter_timeline_pages_lazily(self):
+        # Nik and Bill retweet the same tweets on the same days so keys only differ by actor
+        self.cursor.execute("INSERT INTO follows VALUES (4, 1, '2025-01-01');")
+        self.cursor.execute("INSERT INTO follows VALUES (4, 3, '2025-01-01');")
+        rows = timeline.read_timeline(self.cursor, 4, 1000)
+        for size in (1, 2, 3, 5, len(rows), len(rows) + 1):
+            pages = list(timeline.iter_timeline(self.cursor, 4, size))
+            self.assertTrue(all(0 < len(page) <= size for page in pages))
+            self.assertEqual([row for page in pages for row in page], rows)
+
+    def test_iter_timeline_empty(self):
+        self.assertEqual(list(timeline.iter_timeline(self.cursor, 99, 5)), [])
+
+    def test_tweet_fans_out_to_followers(self):
+        self.cursor.execute("INSERT INTO tweets VALUES (100, 2, '2025-01-01', 'Bob tweet 5', NULL);")
+        # Bob (2) is followed by Nik (1) and Luke (6)
+        for usr in (1, 6):
+            self.assertEqual(timeline.read_timeline(self.cursor, usr, 1)[0].tid, 100)
+        self.assertNotEqual(timeline.read_timeline(self.cursor, 3, 1)[0].tid, 100)
+
+    def test_retweet_fans_out_to_followers(self):
+        self.cursor.execute("INSERT INTO retweets VALUES (5, 7, '2025-01-01');")
+        # Matt (5) is followed by Bill (3) and John (4)
+        for usr in (3, 4):
+            row = timeline.read_timeline(self.cursor, usr, 1)[0]
+            self.assertEqual(tuple(row)[:6], ("Matt", "Retweet", "2025-01-01", "John tweet 1", 7, 5))
+            self.assertIs(row.kind, records.RETWEET)
+
+    def test_follow_adds_followee_history(self):
+        self.cursor.execute("INSERT INTO follows VALUES (1, 6, '2025-01-01');")
+        self.assertCountEqual(timeline.read_timeline(self.cursor, 1, 1000), self.joined_feed(1))
+        self.cursor.execute("DELETE FROM follows WHERE flwer = 1 AND flwee = 6;")
+        self.assertCountEqual(timeline.read_timeline(self.cursor, 1, 1000), self.joined_feed(1))
+
+    def test_rebuild(self):
+        self.cursor.execute("DELETE FROM timeline;")
+        self.assertEqual(timeline.read_timeline(self.cursor, 1, 5), [])
+        timeline.rebuild(self.connection, self.cursor, 1)
+        self.assertCountEqual(timeline.read_timeline(self.cursor, 1, 1000), self.joined_feed(1))
+        self.assertEqual(timeline.read_timeline(self.cursor, 2, 5), [])
+        timeline.rebuild(self.connection, self.cursor)
+        self.assertCountEqual(timeline.read_timeline(self.cursor, 2, 1000), self.joined_feed(2))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
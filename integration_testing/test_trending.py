@@ -0,0 +1,81 @@
+import unittest
+from datetime import date
+import os
+import sqlite3
+import sys
+
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+import trending
+
+TODAY = date(2025, 1, 10)
+
+
+class TestTrending(unittest.TestCase):
+    def setUp(self):
+        # Real in-memory database seeded from sqlData.sql, with hashtags on tweets of several days
+        self.connection = sqlite3.connect(":memory:")
+        self.cursor = self.connection.cursor()
+        with open(os.path.join(parent_dir, "sqlData.sql")) as f:
+            self.cursor.executescript(f.read())
+        self.tid = 100
+        self.tweet('2025-01-01', 'old')
+        self.tweet('2025-01-05', 'fun', 'old')
+        self.tweet('2025-01-09', 'fun', 'news')
+        trending.install(self.connection, self.cursor)
+        trending.rebuild(self.connection, self.cursor, 7, TODAY)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def tweet(self, day, *terms):
+        """Insert a tweet made on day mentioning terms, the way compose does."""
+        self.tid += 1
+        self.cursor.execute("INSERT INTO tweets VALUES (?, 1, ?, 'tagged', NULL);", (self.tid, day))
+        for term in terms:
+            self.cursor.execute("INSERT OR IGNORE INTO hashtags VALUES (?);", (term,))
+            self.cursor.execute("INSERT INTO mentions VALUES (?, ?);", (self.tid, term))
+        return self.tid
+
+    def test_rebuild_counts_the_window(self):
+        # The window of 7 days ending 2025-01-10 starts on 2025-01-04
+        self.assertEqual(trending.advance(self.connection, self.cursor, TODAY), (7, '2025-01-04'))
+        self.assertEqual(trending.top_terms(self.cursor), [('fun', 2), ('news', 1), ('old', 1)])
+        self.assertEqual(trending.top_terms(self.cursor, 1), [('fun', 2)])
+        self.assertEqual(trending.check(self.cursor), [])
+
+    def test_triggers_track_inserts_and_deletes(self):
+        self.tweet('2025-01-10', 'news')
+        self.tweet('2025-01-10', 'news')
+        # Older than the window: only its day is counted
+        tid = self.tweet('2025-01-02', 'fun')
+        self.assertEqual(trending.top_terms(self.cursor), [('news', 3), ('fun', 2), ('old', 1)])
+        self.cursor.execute("DELETE FROM mentions WHERE term = 'old';")
+        self.cursor.execute("DELETE FROM mentions WHERE tid = ?;", (tid,))
+        self.assertEqual(trending.top_terms(self.cursor), [('news', 3), ('fun', 2)])
+        self.assertEqual(trending.check(self.cursor), [])
+        self.cursor.execute("SELECT count FROM hashtag_days WHERE day = '2025-01-02' AND term = 'fun';")
+        self.assertEqual(self.cursor.fetchone(), (0,))
+
+    def test_window_slides_incrementally(self):
+        self.tweet('2025-01-12', 'later')
+        # 2025-01-04 to 2025-01-06 leave the window, and with them the 2025-01-05 tweet
+        self.assertEqual(trending.advance(self.connection, self.cursor, date(2025, 1, 13)), (7, '2025-01-07'))
+        self.assertEqual(trending.top_terms(self.cursor), [('fun', 1), ('later', 1), ('news', 1)])
+        self.assertEqual(trending.check(self.cursor), [])
+        # A window that is already current, or a clock that went back, leaves it as it is
+        self.assertEqual(trending.advance(self.connection, self.cursor, date(2025, 1, 11)), (7, '2025-01-07'))
+        self.assertEqual(trending.advance(self.connection, self.cursor, date(2025, 2, 1)), (7, '2025-01-26'))
+        self.assertEqual(trending.top_terms(self.cursor), [])
+
+    def test_rebuild_with_another_window(self):
+        trending.rebuild(self.connection, self.cursor, 1, date(2025, 1, 9))
+        self.assertEqual(trending.top_terms(self.cursor), [('fun', 1), ('news', 1)])
+        trending.rebuild(self.connection, self.cursor, today=date(2025, 1, 9))
+        self.assertEqual(trending.advance(self.connection, self.cursor, date(2025, 1, 9)), (1, '2025-01-09'))
+        with self.assertRaises(ValueError):
+            trending.rebuild(self.connection, self.cursor, 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
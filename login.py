@@ -1,6 +1,6 @@
 import getpass
-from datetime import datetime
-from options import build_tweet
+from options import build_tweet, tweet_information, view_conversation, retweet
+from service import TweeterService
 
 
 def get_input(values):
@@ -25,16 +25,6 @@ def print_login_menu():
     print("          Q - Quit Program")
 
 def signup_user(connection, cursor):
-    cursor.execute("""
-                   SELECT MAX(usr)
-                   FROM users;
-                   """)
-    newUserID = cursor.fetchone()
-    if newUserID:
-        newUserID = newUserID[0] + 1
-    else:
-        newUserID = 1
-
     print("---------------SignUp---------------")
     name = input("Enter your name: ")
 
@@ -50,24 +40,19 @@ def signup_user(connection, cursor):
     city = input ("Enter your city: ")
     timezone = input("Enter your timezone: ")
     
-    cursor.execute("""
-                   INSERT INTO users (usr, pwd, name, email, city, timezone) 
-                   VALUES (?, ?, ?, ?, ?, ?);
-                   """,(newUserID, password1, name, email, city, timezone))
+    # Signed up only once the input is in, so no write lock is held while the user types
+    newUserID = TweeterService(connection, cursor).signup(name, password1, email, city, timezone)
     print("------------------------------------")
     print(f"Thank you for signing up, {name}! Your userID is {newUserID}.")
     print("------------------------------------")
 
-    connection.commit()
-
-def login_user(cursor):
+def login_user(connection, cursor):
     print("---------------Login----------------")
     userID = input("Enter your userID: ")
     password = getpass.getpass("Enter your password: ")
 
-    cursor.execute("SELECT * FROM users WHERE usr = ? AND pwd = ?", (userID, password))
-    
-    user = cursor.fetchone()
+    # A password stored as plain text is rehashed on login, so this may write
+    user = TweeterService(connection, cursor).login(userID, password)
     loggedIn = False
 
     if user:
@@ -91,92 +76,56 @@ def logout_user(user):
     loggedIn = False
     return loggedIn, user
 
+def print_activity(rows, start):
+    """
+    Print rows of Recent Activity, numbered from start+1.
+    @param rows: records.FeedItem rows as returned by timeline.read_timeline.
+    @param start: number of rows already shown.
+    """
+    print("{0:^10} | {1:^25} | {2:^12} | {3:<50}".format( "#-Type", "Followee", "Date", "Text"))
+    print("-------------------------------------------------------------------------")
+    for index, row in enumerate(rows, start):
+        flwee = f"(ID:{row.usr}) {row.name}"
+        # if len(flwee) > 17:
+        #     flwee = flwee[:17] + "..."
+        if not row.retweet:
+            print("{0:<10} | {1:<25} @ {2:^12} : {3:<50}".format(str(index+1)+"-"+row.kind, flwee, row.date, row.text))
+        else:
+            text = f"(From {row.writer_name}@ID:{row.writer}) {row.text}"
+            print("{0:<10} | {1:<25} @ {2:^12} : {3:<50}".format(str(index+1)+"-"+row.kind, flwee, row.date, text))
+    print("-------------------------------------------------------------------------")
+
 def post_login(connection, cursor, user):
     userID = user[0]
-    cursor.execute("""
-                   SELECT u.name, 'Tweet', t.tdate, t.text, t.tid, u.usr
-                   FROM tweets t, follows f, users u
-                   WHERE f.flwer = ? AND f.flwee = t.writer AND t.writer = u.usr
-                   ORDER BY t.tdate DESC;
-                   """, (userID,))
-    tweetRows = cursor.fetchall()
-    cursor.execute("""
-                   SELECT u1.name, 'Retweet', rt.rdate, t.text, t.tid, u1.usr, u2.name, u2.usr
-                   FROM retweets rt, tweets t, follows f, users u1, users u2
-                   WHERE f.flwer = ? AND f.flwee = rt.usr AND u1.usr = rt.usr
-                    AND rt.tid = t.tid AND t.writer = u2.usr
-                   ORDER BY t.tdate DESC;
-                   """, (userID,))
-    retweetRows = cursor.fetchall()
-
-    combinedRows = None
-    if tweetRows and retweetRows:
-        combinedRows = tweetRows + retweetRows
-    elif tweetRows:
-        combinedRows = tweetRows
-    elif retweetRows:
-        combinedRows = retweetRows
+    service = TweeterService(connection, cursor)
+    pages = service.iter_feed(userID, 5)
+    combinedRows = next(pages, [])
 
     print("-----------Recent Activity----------")
     if not combinedRows:
         print("You have no recent activity.")
     else:        
-        combinedRows.sort(key=lambda a:a[2], reverse=True)
-        index = 0
-        stop = 5
-        numRows = len(combinedRows)
-
-        print("{0:^10} | {1:^25} | {2:^12} | {3:<50}".format( "#-Type", "Followee", "Date", "Text"))
-        print("-------------------------------------------------------------------------")
-        while index < numRows and index < stop:
-            row = combinedRows[index]
-            flwee = row[0]
-            flweeID = row[5]
-            flwee = f"(ID:{flweeID}) {flwee}"
-            # if len(flwee) > 17:
-            #     flwee = flwee[:17] + "..."
-            if row[1] == "Tweet":
-                print("{0:<10} | {1:<25} @ {2:^12} : {3:<50}".format(str(index+1)+"-"+row[1], flwee, row[2], row[3]))
-            else:
-                ogWriter = row[6]
-                ogWriterID = row[7]
-                text = f"(From {ogWriter}@ID:{ogWriterID}) {row[3]}"
-                print("{0:<10} | {1:<25} @ {2:^12} : {3:<50}".format(str(index+1)+"-"+row[1], flwee, row[2], text))
-            index += 1
-        print("-------------------------------------------------------------------------")    
+        print_activity(combinedRows, 0)
+        index = len(combinedRows)
         print("Options:  M - More recent activity")
         print("          I - Tweet information")
+        print("          V - View conversation")
         print("          R - Reply to tweet")
         print("          T - Retweet a tweet")
         print("          C - Continue to Main Menu")
-        select = get_input(['m', 'i', 'r', 't', 'c'])
+        select = get_input(['m', 'i', 'v', 'r', 't', 'c'])
         while select != 'c':
             match select:
                 case 'm':
                     print("-----------Recent Activity----------")
-                    stop += 5
-                    if index >= numRows:
+                    page = next(pages, [])
+                    if not page:
                         print("You have no more recent activity.")
                         print("------------------------------------")
                     else:
-                        print("{0:^10} | {1:^25} | {2:^12} | {3:<50}".format( "#-Type", "Followee", "Date", "Text"))
-                        print("-------------------------------------------------------------------------")
-                        while index < numRows and index < stop:
-                            row = combinedRows[index]
-                            flwee = row[0]
-                            flweeID = row[5]
-                            flwee = f"(ID:{flweeID}) {flwee}"
-                            # if len(flwee) > 17:
-                            #     flwee = flwee[:17] + "..."
-                            if row[1] == "Tweet":
-                                print("{0:<10} | {1:<25} @ {2:^12} : {3:<50}".format(str(index+1)+"-"+row[1], flwee, row[2], row[3]))
-                            else:
-                                ogWriter = row[6]
-                                ogWriterID = row[7]
-                                text = f"(From {ogWriter}@ID:{ogWriterID}) {row[3]}"
-                                print("{0:<10} | {1:<25} @ {2:^12} : {3:<50}".format(str(index+1)+"-"+row[1], flwee, row[2], text))
-                            index += 1
-                        print("-------------------------------------------------------------------------")
+                        print_activity(page, index)
+                        combinedRows += page
+                        index += len(page)
                 case 'i':
                     print("----------Tweet Information---------")
                     tweetNum = input("Select tweet number for information: ")
@@ -188,32 +137,25 @@ def post_login(connection, cursor, user):
                         print("------------------------------------")
                         print("Invalid tweet selection.")
                         print("------------------------------------")
-                    elif combinedRows[tweetNum-1][1] == 'Retweet':
+                    elif combinedRows[tweetNum-1].retweet:
                         print("------------------------------------")
                         print("There is no information about retweets.")
                         print("------------------------------------")
                     else:
-                        row = combinedRows[tweetNum-1]
-                        tweetID = row[4]
-                        cursor.execute("""
-                                       SELECT *
-                                       FROM tweets t1, tweets t2
-                                       WHERE t1.tid != t2.tid AND t1.tid = t2.replyto
-                                        AND t1.tid = ?
-                                       """, (tweetID,))
-                        replies = cursor.fetchall()
-                        cursor.execute("""
-                                       SELECT *
-                                       FROM tweets t, retweets rt
-                                       WHERE t.tid = rt.tid AND t.tid = ?
-                                       """, (tweetID,))
-                        retweets = cursor.fetchall()
+                        tweet_information(service, tweetNum, combinedRows[tweetNum-1])
+                case 'v':
+                    print("------------View Conversation-------")
+                    tweetNum = input("Select tweet number to view the conversation of: ")
+                    if tweetNum.isnumeric():
+                        tweetNum = int(tweetNum)
+                    else:
+                        tweetNum = 0
+                    if not (1 <= tweetNum <= index):
                         print("------------------------------------")
-                        print("Selected tweet for information:")
-                        print(f"    {tweetNum}. {row[0]} @ {row[2]} : {row[3]}")
-                        print(f"\nNumber of replies: {len(replies)}")
-                        print(f"Number of retweets: {len(retweets)}")
+                        print("Invalid tweet selection.")
                         print("------------------------------------")
+                    else:
+                        view_conversation(service, tweetNum, combinedRows[tweetNum-1], get_input)
                 case 'r':
                     print("----------------Reply---------------")
                     tweetNum = input("Select tweet number to reply to: ")
@@ -225,16 +167,16 @@ def post_login(connection, cursor, user):
                         print("------------------------------------")
                         print("Invalid tweet selection.")
                         print("------------------------------------")
-                    elif combinedRows[tweetNum-1][1] == 'Retweet':
+                    elif combinedRows[tweetNum-1].retweet:
                         print("------------------------------------")
                         print("You cannot reply to a retweet.")
                         print("------------------------------------")
                     else:
                         row = combinedRows[tweetNum-1]
-                        replyto = row[4]
+                        replyto = row.tid
                         print("------------------------------------")
                         print("Selected tweet for reply:")
-                        print(f"    {tweetNum}. {row[0]} @ {row[2]} : {row[3]}\n")
+                        print(f"    {tweetNum}. {row.name} @ {row.date} : {row.text}\n")
                         build_tweet(cursor, connection, user, replyto)
                 case 't':
                     print("---------------Retweet--------------")
@@ -247,43 +189,18 @@ def post_login(connection, cursor, user):
                         print("------------------------------------")
                         print("Invalid tweet selection.")
                         print("------------------------------------")
-                    elif combinedRows[tweetNum-1][1] == 'Retweet':
+                    elif combinedRows[tweetNum-1].retweet:
                         print("------------------------------------")
                         print("You cannot retweet a retweet.")
                         print("------------------------------------")
                     else:
-                        row = combinedRows[tweetNum-1]
-                        tid = row[4]
-                        usr = user[0]
-                        current_datetime = datetime.now()
-                        rdate = current_datetime.date()
+                        retweet(service, tweetNum, combinedRows[tweetNum-1], user)
 
-                        cursor.execute("""
-                                       SELECT *
-                                       FROM retweets
-                                       WHERE usr = ? AND tid = ?;
-                                       """, (usr, tid))
-                        exists = cursor.fetchone()
-                        if exists:
-                            print("------------------------------------")
-                            print("You have already retweeted this tweet!")
-                            print("------------------------------------")
-                        else:
-                            cursor.execute("""
-                                           INSERT INTO retweets VALUES
-                                            (?, ?, ?);
-                                           """, (usr, tid, rdate))
-                            connection.commit()
-                            print("------------------------------------")
-                            print("Your retweet to...")
-                            print(f"    {tweetNum}. {row[0]} @ {row[2]} : {row[3]}")
-                            print("...has been made!")
-                            print("------------------------------------")
-                        
             print("Options:  M - More recent activity")
             print("          I - Tweet information")
+            print("          V - View conversation")
             print("          R - Reply to tweet")
             print("          T - Retweet a tweet")
             print("          C - Continue to Main Menu")
-            select = get_input(['m', 'i', 'r', 't', 'c'])
+            select = get_input(['m', 'i', 'v', 'r', 't', 'c'])
     print("------------------------------------")
@@ -1,29 +1,93 @@
-import sqlite3
-import sys
-from options import print_main_menu, compose, list_followers, search_user, search_tweet
+import argparse
+import logging
+import db
+import querytrace
+import server
+import service
+from options import print_main_menu, compose, list_followers, search_user, search_tweet, trending_hashtags
 from login import print_login_menu, get_input, signup_user, login_user, logout_user, post_login
 
 connection, cursor = None, None
 
-def connect(path):
+def connect(path, settings=None, tracer=None):
     """
     Create the connection object, cursor, and enforce foreign key constraints.
+    Pending schema migrations are applied, and derived tables (home timeline, tweet search index,
+    user counters) are installed on first use.
     @param path: relative file path to database.
+    @param settings: connection settings from db.resolve_settings. The default preset is used when None.
+    @param tracer: querytrace.Tracer recording every statement, or None to run untraced.
     """
     global connection, cursor
 
-    connection = sqlite3.connect(path)
+    connection = db.open_database(path, settings, tracer)
     cursor = connection.cursor()
-    cursor.execute( "PRAGMA foreign_keys=ON;" )
+    db.log_settings(path, connection)
+    service.install(connection, cursor)
 
     connection.commit()
 
+def parse_args(argv=None):
+    """
+    Parse the command line: an optional database filename and connection tuning flags.
+    """
+    parser = argparse.ArgumentParser(description="Command-line Tweeter client.")
+    parser.add_argument("database", nargs="?", default="./test1.db",
+                        help="database file to use (default: ./test1.db)")
+    parser.add_argument("--preset", choices=sorted(db.PRESETS),
+                        help=f"connection preset (default: {db.DEFAULT_PRESET})")
+    parser.add_argument("--config", help="JSON file of connection settings")
+    parser.add_argument("--journal-mode", choices=db.CHOICES['journal_mode'])
+    parser.add_argument("--synchronous", choices=db.CHOICES['synchronous'])
+    parser.add_argument("--cache-size", type=int, help="pages, or KiB when negative")
+    parser.add_argument("--mmap-size", type=int, help="bytes of the database to memory map")
+    parser.add_argument("--temp-store", choices=db.CHOICES['temp_store'])
+    parser.add_argument("--busy-timeout", type=int, help="milliseconds to wait for a locked database")
+    parser.add_argument("--serve", action="store_true",
+                        help="serve the JSON-lines protocol to many clients instead of the interactive menus")
+    parser.add_argument("--host", default=server.DEFAULT_HOST, help=f"address to serve on (default: {server.DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=server.DEFAULT_PORT,
+                        help=f"port to serve on (default: {server.DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=server.DEFAULT_WORKERS,
+                        help=f"database worker threads in server mode (default: {server.DEFAULT_WORKERS})")
+    parser.add_argument("--hash-workers", type=int, default=server.DEFAULT_HASH_WORKERS,
+                        help=f"password hashing threads in server mode (default: one per CPU, {server.DEFAULT_HASH_WORKERS})")
+    parser.add_argument("--trace", action="store_true",
+                        help="time every SQL statement and log a summary at logout and exit")
+    parser.add_argument("--slow-ms", type=float, default=querytrace.DEFAULT_SLOW_MS,
+                        help=f"with --trace, log statements slower than this with their query plan "
+                             f"(default: {querytrace.DEFAULT_SLOW_MS:g})")
+    parser.add_argument("--trace-output", help="with --trace, write the summary to this JSON file at exit")
+    return parser.parse_args(argv)
+
+def finish_trace(tracer, args):
+    """
+    Log the query trace summary and export it if asked to.
+    """
+    if tracer is None:
+        return
+    tracer.dump()
+    if args.trace_output:
+        tracer.export(args.trace_output)
+
 def main():
-    if len(sys.argv) > 1:
-        path = sys.argv[1]
-    else:
-        path = "./test1.db"
-    connect(path)
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    config = None
+    if args.config:
+        config = db.load_config(args.config)
+    overrides = {key: getattr(args, key) for key in db.SETTINGS}
+    settings = db.resolve_settings(args.preset, config, overrides)
+    tracer = None
+    if args.trace or args.trace_output:
+        tracer = querytrace.Tracer(args.slow_ms)
+    connect(args.database, settings, tracer)
+    if args.serve:
+        # Workers open their own connections; this one was only needed to install the derived tables
+        connection.close()
+        server.run(args.database, settings, args.host, args.port, args.workers, tracer, args.hash_workers)
+        finish_trace(tracer, args)
+        return
 
     user = None
     loggedIn = False
@@ -40,7 +104,7 @@ def main():
                         signup_user(connection, cursor)
                     case 'b':
                         # Login
-                        loggedIn, user = login_user(cursor)
+                        loggedIn, user = login_user(connection, cursor)
                         if loggedIn:
                             post_login(connection, cursor, user)
                     case 'q':
@@ -50,7 +114,7 @@ def main():
         else:
             while loggedIn:
                 print_main_menu()
-                select = get_input(['t', 'u', 'c', 'l', 'q'])
+                select = get_input(['t', 'u', 'c', 'l', 'h', 'q'])
                 match select:
                     case 't':
                         # Search for Tweets
@@ -64,8 +128,14 @@ def main():
                     case 'l':
                         # List Followers
                         list_followers(connection, cursor, user)
+                    case 'h':
+                        # Trending Hashtags
+                        trending_hashtags(connection, cursor)
                     case 'q':
-                        loggedIn, user = logout_user(user)                  
+                        loggedIn, user = logout_user(user)
+                        if tracer is not None:
+                            tracer.dump()
+    finish_trace(tracer, args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+import logging
+import sqlite3
+import sys
+
+logger = logging.getLogger("tweeter")
+
+# Numbered schema changes, applied in order. PRAGMA user_version holds the number of the last
+# one applied, so each runs exactly once per database. A migration is SQL, or a function
+# taking (connection, cursor) for changes that need Python. Never edit one that has shipped;
+# add the next number instead.
+MIGRATIONS = [
+    (1, "indexes for the hot-path queries", """
+-- list_followers, and the timeline triggers fanning a tweet out to followers
+CREATE INDEX IF NOT EXISTS follows_flwee ON follows (flwee);
+-- see_more_tweets and userinfo_pull: a user's tweets, newest first
+CREATE INDEX IF NOT EXISTS tweets_writer ON tweets (writer, tdate);
+-- replies to a tweet
+CREATE INDEX IF NOT EXISTS tweets_replyto ON tweets (replyto);
+-- retweets of a tweet
+CREATE INDEX IF NOT EXISTS retweets_tid ON retweets (tid);
+-- hashtag search
+CREATE INDEX IF NOT EXISTS mentions_term ON mentions (term);
+"""),
+    (2, "follower listing by keyset", """
+-- list_followers: a user's followers newest first, a page at a time. The timeline triggers'
+-- lookups by flwee alone use it too, so it replaces follows_flwee.
+CREATE INDEX IF NOT EXISTS follows_flwee_date ON follows (flwee, start_date, flwer);
+DROP INDEX IF EXISTS follows_flwee;
+"""),
+    (3, "user tweet paging by keyset", """
+-- see_more_tweets and userinfo_pull: a user's tweets newest first, a page at a time, resuming
+-- after the last (tdate, tid) read. Replaces tweets_writer, which had no tid to break ties on.
+CREATE INDEX IF NOT EXISTS tweets_writer_date ON tweets (writer, tdate, tid);
+DROP INDEX IF EXISTS tweets_writer;
+"""),
+    (4, "conversation threads", """
+-- threads.read_thread and read_replies: a tweet's replies oldest first, a page at a time.
+-- Replaces tweets_replyto.
+CREATE INDEX IF NOT EXISTS tweets_replyto_date ON tweets (replyto, tdate, tid);
+DROP INDEX IF EXISTS tweets_replyto;
+"""),
+    (5, "hashed passwords", """
+-- Passwords are stored hashed (passwords.py). Hashing every row here would take minutes on a
+-- large database, so rows stored as plain text are only marked as such, and service.login
+-- rehashes each one when its user next logs in.
+UPDATE users SET pwd = 'plain$' || pwd WHERE pwd IS NOT NULL;
+"""),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def schema_version(cursor):
+    """
+    @return: the number of the last migration applied to the database.
+    """
+    cursor.execute("PRAGMA user_version;")
+    return cursor.fetchone()[0]
+
+def migrate(connection, cursor, target=None):
+    """
+    Apply every migration after the database's version, up to target, each in its own
+    transaction together with the version bump, so a failure leaves the database at the
+    last migration that completed.
+    @param connection: database connection.
+    @param cursor: cursor on the connection.
+    @param target: version to stop at, the latest when None.
+    @return: list of the version numbers applied.
+    """
+    version = schema_version(cursor)
+    if version > LATEST:
+        raise ValueError(f"Database schema version {version} is newer than this program's ({LATEST})")
+    if target is None:
+        target = LATEST
+    applied = []
+    for number, description, change in MIGRATIONS:
+        if number <= version or number > target:
+            continue
+        connection.commit()
+        try:
+            if callable(change):
+                cursor.execute("BEGIN;")
+                change(connection, cursor)
+                # PRAGMA arguments can't be bound; number comes from MIGRATIONS
+                cursor.execute(f"PRAGMA user_version = {number};")
+                connection.commit()
+            else:
+                cursor.executescript(f"BEGIN;\n{change}\nPRAGMA user_version = {number};\nCOMMIT;")
+        except sqlite3.Error:
+            connection.rollback()
+            raise
+        logger.info("Applied migration %d: %s", number, description)
+        applied.append(number)
+    return applied
+
+
+if __name__ == "__main__":
+    # Upgrade an existing database without opening the menus:
+    #   $ python3 migrations.py (optional) database_filename
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        path = "./test1.db"
+    connection = sqlite3.connect(path)
+    cursor = connection.cursor()
+    before = schema_version(cursor)
+    applied = migrate(connection, cursor)
+    print(f"{path}: schema version {before} -> {schema_version(cursor)} ({len(applied)} migrations applied).")
+    connection.close()
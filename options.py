@@ -1,6 +1,14 @@
-from datetime import datetime
-import re
-import math
+import threads
+from service import TweeterService
+
+# Followers shown per page in List Followers
+FOLLOWER_PAGE_SIZE = 10
+# Tweets shown per page in See more tweets
+TWEET_PAGE_SIZE = 10
+# Replies shown per page when expanding a tweet in a conversation
+REPLY_PAGE_SIZE = 10
+# Hashtags shown by Trending Hashtags
+TRENDING_SIZE = 10
 
 
 def print_main_menu():
@@ -13,6 +21,7 @@ def print_main_menu():
     print("          U - Search for Users")
     print("          C - Compose a Tweet")
     print("          L - List Followers")
+    print("          H - Trending Hashtags")
     print("          Q - Logout")
 
 def compose(cursor,connection,user):
@@ -24,26 +33,7 @@ def build_tweet(cursor,connection,user, replyto=None):
     while not tweet:
         print("The tweet message cannot be empty! Please try again.")
         tweet = input("Enter the message: ")
-    hashtags = re.findall(r"#(\w+)", tweet)
-    cursor.execute("""
-                   SELECT MAX(tid)
-                   FROM tweets;
-                   """)
-    tid = cursor.fetchone()
-    if tid:
-        tid = tid[0] + 1
-    else:
-        tid = 1
-    #grabbing the date from the machine
-    current_datetime = datetime.now()
-    date = current_datetime.date()
-    replyto = replyto
-    #adding the new tweet to the tweets table
-    cursor.execute("""
-                   INSERT INTO tweets (tid, writer, tdate, text, replyto) 
-                   VALUES (?, ?, ?, ?, ?);
-                   """,(tid, user[0], date, tweet,replyto))
-    connection.commit()
+    TweeterService(connection, cursor).compose(user[0], tweet, replyto)
 
     print("------------------------------------")
     if replyto:
@@ -56,86 +46,82 @@ def build_tweet(cursor,connection,user, replyto=None):
         print("...has been made!")
     print("------------------------------------")
 
-    if len(hashtags) != 0 :
-        for hashtag in hashtags:
-            #adding to hashtags
-            cursor.execute("SELECT * FROM hashtags WHERE term = ?", (hashtag,))
-            result_term = cursor.fetchone()
-
-            if result_term is None:
-                cursor.execute("INSERT INTO hashtags (term) VALUES (?)", (hashtag,))
-                connection.commit()
-
-            #adding to mentions
-            cursor.execute("SELECT * FROM mentions WHERE term = ? AND tid = ? ", (hashtag,tid))
-            result_mentions = cursor.fetchone()
-
-            if result_mentions is None:
-                cursor.execute("INSERT INTO mentions (tid, term) VALUES (?, ?)", (tid, hashtag))
-                connection.commit()
+def trending_hashtags(connection, cursor):
+    trends = TweeterService(connection, cursor).trending(TRENDING_SIZE)
+    print("---------Trending Hashtags----------")
+    print(f"Most mentioned in the last {trends['days']} day(s), since {trends['start']}:\n")
+    if not trends['rows']:
+        print("*No hashtags have been used lately.")
+    for index, (term, count) in enumerate(trends['rows'], 1):
+        print(f"{index}. #{term} ({count} tweets)")
+    print("------------------------------------")
 
 def follow_user(follower_id, connection, cursor, user):
-
-    if (user[0]==follower_id):
-        print("You cannot follow yourself!")
+    try:
+        followed = TweeterService(connection, cursor).follow(user[0], follower_id)
+    except ValueError as error:
+        print(str(error))
         return
-    # Check if already following
-    cursor.execute("""
-        SELECT * FROM follows WHERE flwer = ? AND flwee = ?;
-    """, (user[0], follower_id))
-
-    if cursor.fetchone():
-        print("You are already following this user.")
-    else:
-        today = datetime.now().date()
-        cursor.execute("""
-            INSERT INTO follows (flwer, flwee, start_date) VALUES (?, ?, ?);
-        """, (user[0], follower_id, today))
-        connection.commit()
+    if followed:
         print("You are now following this user.")
+    else:
+        print("You are already following this user.")
 
 def see_more_tweets(follower_id, connection, cursor):
-    cursor.execute("""
-        SELECT name FROM users
-        WHERE usr = ?
-    """, (follower_id,))
-
-    follower_name = cursor.fetchone()
+    service = TweeterService(connection, cursor)
+    follower_name = service.user_name(follower_id)
     print("------------------------------------")
-    print("Showing all tweets from " + follower_name[0] +":\n")
-
-    cursor.execute("""
-        SELECT text FROM tweets
-        WHERE writer = ?
-        ORDER BY tdate DESC
-    """, (follower_id,))
-
-    tweets = cursor.fetchall()
-    if len(tweets)==0:
-        print("*There are no tweets from " + follower_name[0])
-    for tweet in tweets:
-        print("- " + tweet[0])
+    print("Showing all tweets from " + follower_name +":\n")
+
+    # Each page is only read when it is asked for
+    pages = service.iter_user_tweets(follower_id, TWEET_PAGE_SIZE)
+    tweets = next(pages, None)
+    if tweets is None:
+        print("*There are no tweets from " + follower_name)
+    while tweets is not None:
+        for tweet in tweets:
+            print("- " + tweet[0])
+        if len(tweets) < TWEET_PAGE_SIZE:
+            break
+        option = ""
+        while option not in ('m', 'b'):
+            option = input("\nM - More tweets, B - Back: ").strip().lower()
+        if option == 'b':
+            break
+        tweets = next(pages, None)
+        if tweets is None:
+            print("*No more tweets from " + follower_name)
     print("")
 
+def print_followers(followers, start):
+    """
+    Print a page of followers, numbered from start.
+    """
+    for idx, follower in enumerate(followers):
+        print(f"{start + idx}. {follower[1]} (User ID: {follower[0]})")
+
+def print_follower_options(more):
+    print("\n-----------------------------------")
+    print("Options: 1. Select a user for more options")
+    if more:
+        print("         2. See more followers")
+    print("         0. Return to main menu")
+
 def list_followers(connection, cursor, user):
 
     userID = user[0]  # Logged in user's ID
-    cursor.execute("""
-        SELECT u.usr, u.name
-        FROM users u, follows f
-        WHERE f.flwee = ? AND f.flwer = u.usr;
-    """, (userID,))
-
-    followers = cursor.fetchall()
+    service = TweeterService(connection, cursor)
+    # Only the count and the page on screen are ever held, however many followers there are
+    follower_count = service.follower_count(userID)
+    followers, after = service.followers_page(userID, FOLLOWER_PAGE_SIZE)
+    start = 1
 
     print("----------List Followers-----------")
+    print(f"\nYou have {follower_count} followers.")
     print("\nYour followers:\n")
-    for idx, follower in enumerate(followers):
-        print(f"{idx + 1}. {follower[1]} (User ID: {follower[0]})")
-    
-    print("\n-----------------------------------")
-    print("Options: 1. Select a user for more options")
-    print("         0. Return to main menu")
+    print_followers(followers, start)
+
+    print_follower_options(after is not None)
 
     option =  ""
     while option != '0':
@@ -144,22 +130,28 @@ def list_followers(connection, cursor, user):
             print("-----------------------------------")
             selected_index = input("Enter selected user (Enter the index of the result and not the ID): ")
             try:
-                selected_index = int(selected_index) - 1
+                selected_index = int(selected_index) - start
                 if 0 <= selected_index < len(followers):
                     userinfo_pull(followers[selected_index][0],followers[selected_index][1], cursor, connection, user)
                     print("Your followers:\n")
-                    for idx, follower in enumerate(followers):
-                        print(f"{idx + 1}. {follower[1]} (User ID: {follower[0]})")
+                    print_followers(followers, start)
                     
-                    print("\n-----------------------------------")
-                    print("Options: 1. Select a user for more options")
-                    print("         0. Return to main menu")
+                    print_follower_options(after is not None)
                 else:
                     print("Invalid index. Please try again.")
                     print("-----------------------------------")
             except ValueError:
                 print("Invalid input. Please enter a numeric value.")
                 print("-----------------------------------")
+        elif option == '2' and after is not None:
+            start = start + len(followers)
+            followers, after = service.followers_page(userID, FOLLOWER_PAGE_SIZE, after)
+            print("-----------------------------------")
+            print_followers(followers, start)
+            if after is None:
+                print("\nYou've reached the end of your followers")
+
+            print_follower_options(after is not None)
         elif option == '0':
             break
         else:
@@ -167,94 +159,154 @@ def list_followers(connection, cursor, user):
             print("-----------------------------------")
     print("-----------------------------------")
 
+def tweet_information(service, tweetNum, row):
+    """
+    Print a tweet with its number of replies and retweets.
+    Shared by the Recent Activity feed and tweet search.
+    @param service: TweeterService for the open database.
+    @param tweetNum: the number the tweet was listed under.
+    @param row: the listed row, a records.FeedItem or records.TweetHit.
+    """
+    info = service.tweet_info(row.tid)
+    print("------------------------------------")
+    print("Selected tweet for information:")
+    print(f"    {tweetNum}. {row.name} @ {row.date} : {row.text}")
+    print(f"\nNumber of replies: {info['replies']}")
+    print(f"Number of retweets: {info['retweets']}")
+    print("------------------------------------")
+
+def print_thread(thread, focus):
+    """
+    Print a conversation as read by TweeterService.thread, each reply indented under the tweet
+    it replies to, with a note under every tweet whose replies were cut off.
+    @param focus: tid of the tweet the conversation was opened on, marked with '>'.
+    """
+    shown = threads.shown_replies(thread)
+    top = thread[0][2]
+    for tid, replyto, level, usr, name, tdate, text, replies in thread:
+        indent = "    " * (level - top)
+        marker = ">" if tid == focus else " "
+        print(f"{indent}{marker} [ID:{tid}] {name} @ {tdate} : {text}")
+        hidden = replies - shown.get(tid, 0)
+        if level >= 0 and hidden > 0:
+            print(f"{indent}      ... {hidden} more replies")
+
+def view_conversation(service, tweetNum, row, get_input):
+    """
+    Print the conversation around a listed tweet: the tweets it replies to, then its replies.
+    The replies to any tweet can then be expanded a page at a time, or the conversation reopened
+    around another tweet. Shared by the Recent Activity feed and tweet search.
+    @param service: TweeterService for the open database.
+    @param tweetNum: the number the tweet was listed under.
+    @param row: the listed row, a records.FeedItem or records.TweetHit.
+    @param get_input: menu selection prompt, login.get_input.
+    """
+    print("------------------------------------")
+    print("Selected tweet for conversation:")
+    print(f"    {tweetNum}. {row.name} @ {row.date} : {row.text}")
+    tid = row.tid
+    thread = service.thread(tid)
+    while True:
+        print("------------Conversation------------")
+        print_thread(thread, tid)
+        print("------------------------------------")
+        print("Options:  E - Expand the replies to a tweet")
+        print("          O - Open the conversation around a tweet")
+        print("          B - Back")
+        select = get_input(['e', 'o', 'b'])
+        if select == 'b':
+            break
+        selected = input("Enter the ID of the tweet: ").strip()
+        if not selected.isnumeric():
+            print("Invalid tweet ID.")
+            continue
+        if select == 'o':
+            opened = service.thread(int(selected))
+            if not opened:
+                print("Invalid tweet ID.")
+            else:
+                tid = int(selected)
+                thread = opened
+            continue
+        print("-------------Replies to " + selected + "-------------")
+        for page in service.iter_replies(int(selected), REPLY_PAGE_SIZE):
+            for reply in page:
+                print(f"  [ID:{reply[0]}] {reply[4]} @ {reply[5]} : {reply[6]} ({reply[7]} replies)")
+            print("Options:  M - More replies")
+            print("          B - Back to the conversation")
+            if get_input(['m', 'b']) == 'b':
+                break
+        else:
+            print("There are no more replies.")
+    print("------------------------------------")
+
+def retweet(service, tweetNum, row, user):
+    """
+    Retweet a listed tweet and report the outcome.
+    Shared by the Recent Activity feed and tweet search.
+    @param service: TweeterService for the open database.
+    @param tweetNum: the number the tweet was listed under.
+    @param row: the listed row, a records.FeedItem or records.TweetHit.
+    @param user: the logged in user.
+    """
+    if not service.retweet(user[0], row.tid):
+        print("------------------------------------")
+        print("You have already retweeted this tweet!")
+        print("------------------------------------")
+    else:
+        print("------------------------------------")
+        print("Your retweet to...")
+        print(f"    {tweetNum}. {row.name} @ {row.date} : {row.text}")
+        print("...has been made!")
+        print("------------------------------------")
+
+def print_matching_tweets(rows, start):
+    """
+    Print tweet search results, numbered from start+1.
+    @param rows: records.TweetHit rows as returned by search.search_tweets.
+    @param start: number of rows already shown.
+    """
+    for index, row in enumerate(rows, start):
+        userID = "(ID:" + str(row.usr) + ")"
+        print("{0:<3}. {1:<7} {2:<20} @ {3:^12} : {4:<50}".format(str(index+1), userID, row.name, row.date, row.text))
+
 def search_tweet(cursor, connection, user, get_input):
     print("---------Search for Tweets---------")
     keywords = input("Enter one or more keywords separated by spaces: ").split()
 
-    terms = []
-    text_matches = []
-    for keyword in keywords:
-        if keyword[0] == '#':
-            terms.append(keyword[1:])
-        else:
-            text_matches.append(keyword)
-
-    term_tweets = []
-    for term in terms:
-        cursor.execute("""
-                    select u.name, u.usr, t.tdate, t.text, t.tid
-                    from tweets t, mentions m, users u
-                    where t.tid = m.tid and t.writer = u.usr and m.term = ?;
-                    """, (term,))
-        t = cursor.fetchall()
-        if t:
-            term_tweets.append(t)
-        connection.commit()
-
-    match_tweets = []
-    for match in text_matches:
-        match = '%' + match + '%'
-        cursor.execute("""
-                    select u.name, u.usr, t.tdate, t.text, t.tid
-                    from tweets t, users u
-                    where t.writer = u.usr 
-                       and t.text like ?
-                    """, (match,))
-        t = cursor.fetchall()
-        if t:
-            match_tweets.append(t)
-        connection.commit()
-    
-    tweets = []
-    for tweet in match_tweets:
-        if tweet not in tweets:
-            tweets.append(tweet)
-    for tweet in term_tweets:
-        if tweet not in tweets:
-            tweets.append(tweet)
+    service = TweeterService(connection, cursor)
+    pages = service.iter_search(keywords, 5)
+    tweets = next(pages, [])
 
     if not tweets:
         print("-----------------------------------")
         print("No tweets have been found!")
     else:
         print("-----------------------------------")
-        tweets = tweets[0]
-        tweets.sort(key=lambda a:a[2], reverse=True)
-        index = 0
-        stop = 5
-        numRows = len(tweets)
-
         print("Matching tweets:\n")
-        while index < numRows and index < stop:
-            row = tweets[index]
-            userID = row[1]
-            userID = "(ID:" + str(userID) + ")"
-            # print(f"{index+1}. {userID} {row[0]} @ {row[2]} : {row[3]}")
-            print("{0:<3}. {1:<7} {2:<20} @ {3:^12} : {4:<50}".format(str(index+1), userID, row[0], row[2], row[3]))
-            index += 1
+        print_matching_tweets(tweets, 0)
+        index = len(tweets)
         print("\n-----------------------------------")   
         print("Options:  M - More matching tweets")
         print("          I - Tweet information")
+        print("          V - View conversation")
         print("          R - Reply to tweet")
         print("          T - Retweet a tweet")
         print("          B - Back to Main Menu")
-        select = get_input(['m', 'i', 'r', 't', 'b'])
+        select = get_input(['m', 'i', 'v', 'r', 't', 'b'])
         while select != 'b':
             match select:
                 case 'm':
                     print("-----------------------------------")
-                    stop += 5
-                    if index >= numRows:
+                    page = next(pages, [])
+                    if not page:
                         print("There is no more matching tweets.")
                         print("------------------------------------")
                     else:
                         print("More matching tweets:\n")
-                        while index < numRows and index < stop:
-                            row = tweets[index]
-                            userID = row[1]
-                            userID = "(ID:" + str(userID) + ")"
-                            print("{0:<3}. {1:<7} {2:<20} @ {3:^12} : {4:<50}".format(str(index+1), userID, row[0], row[2], row[3]))
-                            index += 1
+                        print_matching_tweets(page, index)
+                        tweets += page
+                        index += len(page)
                         print("\n------------------------------------")
                 case 'i':
                     print("----------Tweet Information---------")
@@ -268,27 +320,20 @@ def search_tweet(cursor, connection, user, get_input):
                         print("Invalid tweet selection.")
                         print("------------------------------------")
                     else:
-                        row = tweets[tweetNum-1]
-                        tweetID = row[4]
-                        cursor.execute("""
-                                       SELECT *
-                                       FROM tweets t1, tweets t2
-                                       WHERE t1.tid != t2.tid AND t1.tid = t2.replyto
-                                        AND t1.tid = ?
-                                       """, (tweetID,))
-                        replies = cursor.fetchall()
-                        cursor.execute("""
-                                       SELECT *
-                                       FROM tweets t, retweets rt
-                                       WHERE t.tid = rt.tid AND t.tid = ?
-                                       """, (tweetID,))
-                        retweets = cursor.fetchall()
+                        tweet_information(service, tweetNum, tweets[tweetNum-1])
+                case 'v':
+                    print("------------View Conversation-------")
+                    tweetNum = input("Select tweet number to view the conversation of: ")
+                    if tweetNum.isnumeric():
+                        tweetNum = int(tweetNum)
+                    else:
+                        tweetNum = 0
+                    if not (1 <= tweetNum <= index):
                         print("------------------------------------")
-                        print("Selected tweet for information:")
-                        print(f"    {tweetNum}. {row[0]} @ {row[2]} : {row[3]}")
-                        print(f"\nNumber of replies: {len(replies)}")
-                        print(f"Number of retweets: {len(retweets)}\n")
+                        print("Invalid tweet selection.")
                         print("------------------------------------")
+                    else:
+                        view_conversation(service, tweetNum, tweets[tweetNum-1], get_input)
                 case 'r':
                     print("----------------Reply---------------")
                     tweetNum = input("Select tweet number to reply to: ")
@@ -302,10 +347,10 @@ def search_tweet(cursor, connection, user, get_input):
                         print("------------------------------------")
                     else:
                         row = tweets[tweetNum-1]
-                        replyto = row[4]
+                        replyto = row.tid
                         print("------------------------------------")
                         print("Selected tweet for reply:")
-                        print(f"    {tweetNum}. {row[0]} @ {row[2]} : {row[3]}\n")
+                        print(f"    {tweetNum}. {row.name} @ {row.date} : {row.text}\n")
                         build_tweet(cursor, connection, user, replyto)
                 case 't':
                     print("---------------Retweet--------------")
@@ -319,40 +364,15 @@ def search_tweet(cursor, connection, user, get_input):
                         print("Invalid tweet selection.")
                         print("------------------------------------")
                     else:
-                        row = tweets[tweetNum-1]
-                        tid = row[4]
-                        usr = user[0]
-                        current_datetime = datetime.now()
-                        rdate = current_datetime.date()
-
-                        cursor.execute("""
-                                       SELECT *
-                                       FROM retweets
-                                       WHERE usr = ? AND tid = ?;
-                                       """, (usr, tid))
-                        exists = cursor.fetchone()
-                        if exists:
-                            print("------------------------------------")
-                            print("You have already retweeted this tweet!")
-                            print("------------------------------------")
-                        else:
-                            cursor.execute("""
-                                           INSERT INTO retweets VALUES
-                                            (?, ?, ?);
-                                           """, (usr, tid, rdate))
-                            connection.commit()
-                            print("------------------------------------")
-                            print("Your retweet to...")
-                            print(f"    {tweetNum}. {row[0]} @ {row[2]} : {row[3]}")
-                            print("...has been made!")
-                            print("------------------------------------")
+                        retweet(service, tweetNum, tweets[tweetNum-1], user)
                         
             print("Options:  M - More matching tweets")
             print("          I - Tweet information")
+            print("          V - View conversation")
             print("          R - Reply to tweet")
             print("          T - Retweet a tweet")
             print("          B - Back to Main Menu")
-            select = get_input(['m', 'i', 'r', 't', 'b'])
+            select = get_input(['m', 'i', 'v', 'r', 't', 'b'])
 
     print("-----------------------------------")
 
@@ -362,57 +382,42 @@ def search_user(cursor,connection,user):
     print("----------Search for Users----------")
 
     keyword = input("Enter a keyword to search for a user: ")
-    keyword = '%'+ keyword + '%'
 
     print("")
     
-    cursor.execute("""
-        SELECT COUNT(*)
-        FROM users
-        WHERE city LIKE ?
-    """, (keyword,))
-    total_count_city = cursor.fetchone()[0]
-    maxpage_city = math.ceil(total_count_city/5)
-
-    cursor.execute("""
-        SELECT COUNT(*)
-        FROM users
-        WHERE name LIKE ?
-    """, (keyword,))
-    total_count_name = cursor.fetchone()[0]
-    maxpage_name = math.ceil(total_count_name/5)
-
-    current_name_page = 1
-    current_city_page = 1
+    service = TweeterService(connection, cursor)
+    # Pages are read one at a time as they are shown; there is no upfront count
+    name_pages = service.iter_users_by_name(keyword)
+    city_pages = service.iter_users_by_city(keyword)
+    name_search = next(name_pages, None)
+    city_search = next(city_pages, None)
+    any_name = name_search is not None
+    any_city = city_search is not None
 
     while(True):
         results_onpage = 0
         print ("---Name Based Search---")
-        if maxpage_name == 0:
+        if not any_name:
             print("No Results")
-        elif(current_name_page>0 and current_name_page<= maxpage_name):
-            name_search = search_user_name(keyword,cursor,current_name_page)
-            for name in name_search:
+        elif name_search is not None:
+            for hit in name_search:
                 index = index + 1
-                results[index] = name
+                results[index] = hit
                 str_index = str(index)
-                print(str_index + "- " +"(ID:"+ str(name[0])+") " +name[1])
+                print(str_index + "- " +"(ID:"+ str(hit.usr)+") " +hit.name)
                 results_onpage= results_onpage+1
         else:
              print ("You've reached the end of the Name-based results")
 
         print ("\n---City Based Search---")
-        if maxpage_city == 0:
+        if not any_city:
             print("No Results\n")
-        
-
-        elif(current_city_page > 0 and current_city_page <= maxpage_city):
-            city_search = search_user_city(keyword,cursor,current_city_page)
-            for name in city_search:
+        elif city_search is not None:
+            for hit in city_search:
                 index = index + 1
-                results[index] = name
+                results[index] = hit
                 str_index = str(index)
-                print(str_index + "- " +"(ID:"+ str(name[0])+") " +name[1])
+                print(str_index + "- " +"(ID:"+ str(hit.usr)+") " +hit.name)
                 results_onpage=results_onpage+1
         else:
             print ("You've reached the end of the City-based results")
@@ -430,7 +435,7 @@ def search_user(cursor,connection,user):
                         print("------------------------------------")
                         search_index = int(input("Enter Selected user (Enter the index of result and not the ID): "))
                         if (search_index in results):
-                            userinfo_pull((results[search_index][0]),(results[search_index][1]),cursor,connection,user)
+                            userinfo_pull(results[search_index].usr, results[search_index].name, cursor, connection, user)
                             index = index - results_onpage
                             break
                         else:
@@ -442,8 +447,8 @@ def search_user(cursor,connection,user):
                     index = index - results_onpage
                     #break
                 elif option == 2:
-                    current_city_page = current_city_page + 1
-                    current_name_page = current_name_page + 1
+                    name_search = next(name_pages, None)
+                    city_search = next(city_pages, None)
                     print("------------------------------------\n")
                     break
                 elif option == 0:
@@ -454,63 +459,20 @@ def search_user(cursor,connection,user):
             except ValueError:
                 print("Invalid input. Please enter a numeric value corresponding to an option.\n")
 
-def search_user_name(keyword, cursor,page_number):
-    page_size = 5
-    offset = (page_number - 1) * page_size
-    cursor.execute("""
-        SELECT usr,name
-        FROM users
-        WHERE name LIKE ?
-        ORDER BY LENGTH(name), name
-        LIMIT ? OFFSET ?
-    """, (keyword, page_size, offset))
-    usernames = cursor.fetchall()
-    name_list = []
-    for name in usernames:
-        name_list.append((name[0],name[1]))
-    return name_list
-
-def search_user_city(keyword, cursor,page_number):
-    page_size = 5
-    offset = (page_number - 1) * page_size
-    cursor.execute("""
-        SELECT usr, name
-        FROM users
-        WHERE city LIKE ?
-        ORDER BY LENGTH(city), city
-        LIMIT ? OFFSET ?
-    """, (keyword, page_size, offset))
-    usernames = cursor.fetchall()
-    name_list_city = []
-    for name in usernames:
-        name_list_city.append((name[0],name[1]))
-    return name_list_city
-
 def userinfo_pull(selected_usr,name,cursor,connection,userlogged):
-    cursor.execute("SELECT COUNT(*) FROM tweets WHERE writer = ?", (selected_usr,))
-    tweet_count = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(*) FROM follows WHERE flwer = ?", (selected_usr,))
-    following_count = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(*) FROM follows WHERE flwee = ?", (selected_usr,))
-    followers_count = cursor.fetchone()[0]
-    cursor.execute("""
-        SELECT text FROM tweets
-        WHERE writer = ?
-        ORDER BY tdate DESC
-        LIMIT 3;
-    """, (selected_usr,))
-    recent_tweets = cursor.fetchall()
+    profile = TweeterService(connection, cursor).profile(selected_usr)
+    recent_tweets = profile['recent']
 
     print("------------------------------------")
     print(f"\n{name} (User ID: {selected_usr})")
-    print(f"Tweets: {tweet_count}, Following: {following_count}, Followers: {followers_count}")
+    print(f"Tweets: {profile['tweets']}, Following: {profile['following']}, Followers: {profile['followers']}")
     print("\nRecent Tweets:")
 
     if len(recent_tweets)==0:
         print("\n*No recent tweets from " + name)
     else:
         for tweet in recent_tweets:
-            print(f" - {tweet[0]}")
+            print(f" - {tweet}")
     print("\n------------------------------------")
 
 
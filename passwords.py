@@ -0,0 +1,74 @@
+import hashlib
+import hmac
+import os
+
+# Passwords are stored as "scheme$parameters$salt$hash", e.g.
+#   scrypt$16384$8$1$<salt hex>$<hash hex>
+# so each row records the cost it was hashed at and can be rehashed when that changes.
+# Rows written before hashing was introduced are marked "plain$<password>" by migration 5
+# and rehashed the next time their user logs in.
+
+# scrypt cost: n (CPU and memory, a power of 2), r (block size), p (parallelism).
+# 2**14, 8, 1 takes 16 MiB and about 50 ms per hash.
+SCRYPT_COST = (2 ** 14, 8, 1)
+# Used when hashlib has no scrypt (Python built without OpenSSL 1.1)
+PBKDF2_ITERATIONS = 600000
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# Scheme new passwords are hashed with
+SCHEME = 'scrypt' if hasattr(hashlib, 'scrypt') else 'pbkdf2_sha256'
+# Cost new passwords are hashed at, for SCHEME; rows hashed at another cost are rehashed on login
+cost = SCRYPT_COST if SCHEME == 'scrypt' else (PBKDF2_ITERATIONS,)
+
+
+def derive(scheme, parameters, password, salt):
+    """
+    @param parameters: tuple of int cost parameters of the scheme.
+    @return: the hash of password as bytes.
+    """
+    if scheme == 'scrypt':
+        n, r, p = parameters
+        # Twice the memory scrypt needs, since OpenSSL's default limit is below it for larger n
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p,
+                              dklen=HASH_BYTES)
+    if scheme == 'pbkdf2_sha256':
+        iterations, = parameters
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations, dklen=HASH_BYTES)
+    raise ValueError(f"Unknown password scheme {scheme}")
+
+def hash_password(password, parameters=None):
+    """
+    Hash a password with a new random salt.
+    @param parameters: cost to hash at, the module's cost when None.
+    @return: the string to store in users.pwd.
+    """
+    if parameters is None:
+        parameters = cost
+    salt = os.urandom(SALT_BYTES)
+    digest = derive(SCHEME, parameters, password, salt)
+    return "$".join([SCHEME, *map(str, parameters), salt.hex(), digest.hex()])
+
+def verify(password, stored):
+    """
+    Check a password against a stored value in constant time.
+    A missing user is checked against a throwaway hash, so a failed login takes as long
+    whether or not the user exists.
+    @param stored: users.pwd, or None if there is no such user.
+    @return: (whether the password matches, whether the stored value should be rehashed).
+    """
+    if stored is None:
+        hash_password(password)
+        return False, False
+    scheme, _, rest = stored.partition("$")
+    if scheme == 'plain':
+        return hmac.compare_digest(password.encode(), rest.encode()), True
+    fields = rest.split("$")
+    try:
+        parameters = tuple(int(field) for field in fields[:-2])
+        salt, digest = bytes.fromhex(fields[-2]), bytes.fromhex(fields[-1])
+        matches = hmac.compare_digest(derive(scheme, parameters, password, salt), digest)
+    except (ValueError, IndexError):
+        # Not a value this module wrote
+        return False, False
+    return matches, matches and (scheme != SCHEME or parameters != tuple(cost))
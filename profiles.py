@@ -0,0 +1,176 @@
+import collections
+import threading
+import weakref
+import queries
+import records
+
+# In-process cache of user profiles, so lists that show users' names (Recent Activity, tweet
+# search, See more tweets) read ids from their own tables and resolve the names of a page's
+# users in one batched lookup instead of joining users once or twice per row.
+# Names only change through TweeterService, which invalidates the users it changes; a change
+# made by another process is seen once the entry is evicted.
+
+DEFAULT_CAPACITY = 10000
+# Ids looked up per query, below SQLite's smallest default limit of 999 parameters
+BATCH_SIZE = 500
+
+
+def lookup_sql(count):
+    """
+    @return: the statement reading the profiles of count users.
+    """
+    return f"""
+        SELECT usr, name, email, city, timezone FROM users
+        WHERE usr IN ({", ".join("?" for _ in range(count))});
+    """
+
+queries.register_builder('profiles', lambda: (lookup_sql(3), (1, 2, 3)))
+
+
+class ProfileCache:
+    """
+    Bounded LRU map of usr -> records.Profile, safe to share between threads.
+    Users that don't exist are not cached, so signing up never has to evict anything.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """
+        @param capacity: most profiles kept; the least recently used is evicted past it.
+        """
+        self.capacity = capacity
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        # Bumped by every invalidation, so a lookup that raced one doesn't store what it read
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, cursor, usrs):
+        """
+        Read the profiles of several users, querying the database once per BATCH_SIZE uncached ones.
+        @param usrs: iterable of user ids, repeats allowed.
+        @return: dict of usr -> records.Profile, without the users that don't exist.
+        """
+        found = {}
+        missing = []
+        with self.lock:
+            for usr in dict.fromkeys(usrs):
+                entry = self.entries.get(usr)
+                if entry is None:
+                    missing.append(usr)
+                else:
+                    self.entries.move_to_end(usr)
+                    found[usr] = entry
+            self.hits += len(found)
+            self.misses += len(missing)
+            generation = self.generation
+        if not missing:
+            return found
+
+        read = []
+        with records.rows_as(cursor, records.profile):
+            for start in range(0, len(missing), BATCH_SIZE):
+                batch = missing[start:start + BATCH_SIZE]
+                cursor.execute(lookup_sql(len(batch)), batch)
+                read.extend(cursor.fetchall())
+        with self.lock:
+            for profile in read:
+                found[profile.usr] = profile
+                if generation == self.generation:
+                    self.entries[profile.usr] = profile
+                    self.entries.move_to_end(profile.usr)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return found
+
+    def names(self, cursor, usrs):
+        """
+        @return: dict of usr -> name of the users that exist.
+        """
+        return {usr: profile.name for usr, profile in self.lookup(cursor, usrs).items()}
+
+    def get(self, cursor, usr):
+        """
+        @return: the user's records.Profile, or None if there is no such user.
+        """
+        return self.lookup(cursor, (usr,)).get(usr)
+
+    def invalidate(self, usr):
+        """
+        Drop a user's profile after it changed, or after the user was created.
+        """
+        with self.lock:
+            self.entries.pop(usr, None)
+            self.generation += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+
+    def stats(self):
+        """
+        @return: dict of the cache's size, capacity, hits, misses, evictions and hit ratio.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self.entries), 'capacity': self.capacity, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions,
+                    'hit_ratio': self.hits / lookups if lookups else 0.0}
+
+
+# Cache of each open connection: connection -> ProfileCache. Keys are weak, so a connection
+# that is dropped without TweeterService.close is freed along with its cache.
+caches = weakref.WeakKeyDictionary()
+caches_lock = threading.Lock()
+
+def cache_for(connection):
+    """
+    @return: the ProfileCache shared by every TweeterService on the connection, created on first use.
+             A plain sqlite3.Connection can't be weakly referenced, unlike db.open_database's, so
+             it gets a new cache of its own instead of one the registry would keep it alive for.
+    """
+    with caches_lock:
+        try:
+            cache = caches.get(connection)
+        except TypeError:
+            return ProfileCache()
+        if cache is None:
+            cache = caches[connection] = ProfileCache()
+        return cache
+
+def release(connection):
+    """
+    Forget the connection's cache, when the connection is closed.
+    """
+    with caches_lock:
+        try:
+            caches.pop(connection, None)
+        except TypeError:
+            pass
+
+def fill_feed(cursor, cache, page):
+    """
+    Set the names of the users who tweeted, retweeted and wrote a page of records.FeedItem.
+    @return: page.
+    """
+    names = cache.names(cursor, [item.usr for item in page] + [item.writer for item in page])
+    for item in page:
+        item.name = names.get(item.usr)
+        item.writer_name = names.get(item.writer)
+    return page
+
+def fill_tweets(cursor, cache, page):
+    """
+    Set the writers' names of a page of records.TweetHit.
+    @return: page.
+    """
+    names = cache.names(cursor, [hit.usr for hit in page])
+    for hit in page:
+        hit.name = names.get(hit.usr)
+    return page
@@ -0,0 +1,65 @@
+import re
+
+# Every SQL statement the menus run, registered where it is defined, so the query plan tests in
+# integration_testing/test_query_plans.py cover new statements without being edited.
+# name -> (sql, example parameters, hot)
+STATEMENTS = {}
+# Statements whose SQL is built per call: name -> (function returning (sql, parameters), hot)
+BUILDERS = {}
+
+
+def register(name, sql, example, hot=True):
+    """
+    Record a statement and return its SQL unchanged, e.g.
+        USER_NAME = queries.register('user_name', "SELECT name FROM users WHERE usr = ?", (1,))
+    @param name: unique name of the statement.
+    @param sql: the statement.
+    @param example: parameters to plan the statement with, a dict for named parameters.
+    @param hot: False for bulk maintenance (rebuilds, drift checks) that is expected to read whole tables.
+    @return: sql.
+    """
+    if name in STATEMENTS or name in BUILDERS:
+        raise ValueError(f"Statement {name} is already registered")
+    STATEMENTS[name] = (sql, parameters(example), hot)
+    return sql
+
+def register_builder(name, build, hot=True):
+    """
+    Record a statement whose SQL is built per call.
+    @param build: function of no arguments returning an example (sql, parameters).
+    @param hot: as for register, or a function of no arguments returning it, for SQL whose
+                plan depends on what the open database supports.
+    """
+    if name in STATEMENTS or name in BUILDERS:
+        raise ValueError(f"Statement {name} is already registered")
+    BUILDERS[name] = (build, hot)
+
+def parameters(example):
+    """
+    @return: example as a tuple, or unchanged if it holds named parameters.
+    """
+    if isinstance(example, dict):
+        return example
+    return tuple(example)
+
+def statements():
+    """
+    @return: list of (name, sql, example parameters, hot) for every registered statement,
+             with builders evaluated now.
+    """
+    result = [(name, sql, example, hot) for name, (sql, example, hot) in STATEMENTS.items()]
+    for name, (build, hot) in BUILDERS.items():
+        sql, example = build()
+        if callable(hot):
+            hot = hot()
+        result.append((name, sql, parameters(example), hot))
+    return result
+
+def shape(sql):
+    """
+    Normalize a statement so variants that only differ in how many values they match are equal:
+    whitespace is collapsed, "?, ?, ?" becomes "?" and "x LIKE ? OR x LIKE ?" becomes "x LIKE ?".
+    """
+    sql = " ".join(sql.split())
+    sql = re.sub(r"\?(, \?)+", "?", sql)
+    return re.sub(r"([\w.]+ LIKE \?)( OR \1)+", r"\1", sql)
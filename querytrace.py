@@ -0,0 +1,203 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger("tweeter")
+
+DEFAULT_SLOW_MS = 50.0
+# Statements shown by Tracer.dump
+DUMP_LIMIT = 15
+
+
+def statement_key(sql):
+    """
+    @return: sql with its whitespace collapsed, so the same statement written on different lines is one entry.
+    """
+    return " ".join(sql.split())
+
+
+class Tracer:
+    """
+    Per-statement call counts, total and max latency and rows returned, collected from every
+    TracedCursor of the connections opened with it. Shared by connections on different threads.
+    A call's latency covers its execute and every fetch until the cursor runs its next statement,
+    since SQLite produces most rows while they are fetched.
+    """
+
+    def __init__(self, slow_ms=DEFAULT_SLOW_MS):
+        """
+        @param slow_ms: calls taking at least this many milliseconds are logged with their
+                        parameters and query plan.
+        """
+        self.slow_ms = slow_ms
+        self.statements = {}
+        self.lock = threading.Lock()
+
+    def record(self, statement, elapsed, rows, call_elapsed, new_call):
+        """
+        Add one execute or fetch to a statement's totals.
+        @param elapsed: seconds spent in this execute or fetch.
+        @param rows: rows it returned.
+        @param call_elapsed: seconds spent in the call so far, this step included.
+        @param new_call: True for the execute that starts a call.
+        """
+        with self.lock:
+            stats = self.statements.setdefault(statement, {'calls': 0, 'total': 0.0, 'max': 0.0, 'rows': 0})
+            if new_call:
+                stats['calls'] += 1
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], call_elapsed)
+            stats['rows'] += rows
+
+    def log_slow(self, connection, sql, parameters, elapsed):
+        """
+        Log a slow call with its parameters and EXPLAIN QUERY PLAN.
+        """
+        plan = []
+        if parameters is not None:
+            # A plain cursor, so the plan lookup isn't traced itself
+            cursor = sqlite3.Connection.cursor(connection)
+            try:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql, parameters)
+                plan = [row[3] for row in cursor.fetchall()]
+            except sqlite3.Error:
+                pass
+            finally:
+                cursor.close()
+        logger.warning("Slow query (%.1f ms): %s\n  parameters: %r\n  plan: %s", elapsed * 1000,
+                       statement_key(sql), parameters, "; ".join(plan) or "(none)")
+
+    def summary(self):
+        """
+        @return: one dict per statement, most total time first.
+        """
+        with self.lock:
+            items = [(statement, dict(stats)) for statement, stats in self.statements.items()]
+        items.sort(key=lambda item: item[1]['total'], reverse=True)
+        return [{
+            'sql': statement,
+            'calls': stats['calls'],
+            'total_ms': stats['total'] * 1000,
+            'mean_ms': stats['total'] * 1000 / max(stats['calls'], 1),
+            'max_ms': stats['max'] * 1000,
+            'rows': stats['rows'],
+        } for statement, stats in items]
+
+    def dump(self, limit=DUMP_LIMIT):
+        """
+        Log the statements that took the most total time.
+        """
+        summary = self.summary()
+        lines = ["{0:>7} | {1:>10} | {2:>9} | {3:>9} | {4:>8} | {5}".format(
+            "calls", "total (ms)", "mean (ms)", "max (ms)", "rows", "statement")]
+        for stats in summary[:limit]:
+            lines.append("{0:>7} | {1:>10.2f} | {2:>9.3f} | {3:>9.3f} | {4:>8} | {5}".format(
+                stats['calls'], stats['total_ms'], stats['mean_ms'], stats['max_ms'], stats['rows'],
+                stats['sql'][:100]))
+        logger.info("Query trace, %d of %d statements by total time:\n%s",
+                    min(limit, len(summary)), len(summary), "\n".join(lines))
+
+    def export(self, path):
+        """
+        Write the summary to a JSON file.
+        """
+        with open(path, "w") as f:
+            json.dump({'slow_ms': self.slow_ms, 'statements': self.summary()}, f, indent=2)
+
+
+class TracedCursor(sqlite3.Cursor):
+    """
+    Cursor that reports every execute and fetch to its connection's Tracer.
+    """
+    sql = None
+    parameters = None
+    elapsed = 0.0
+    logged = False
+
+    def start(self, sql, parameters):
+        self.sql = sql
+        self.parameters = parameters
+        self.elapsed = 0.0
+        self.logged = False
+
+    def record(self, elapsed, rows, new_call=False):
+        if self.sql is None:
+            return
+        tracer = self.connection.tracer
+        self.elapsed += elapsed
+        tracer.record(statement_key(self.sql), elapsed, rows, self.elapsed, new_call)
+        if not self.logged and self.elapsed * 1000 >= tracer.slow_ms:
+            self.logged = True
+            tracer.log_slow(self.connection, self.sql, self.parameters, self.elapsed)
+
+    def execute(self, sql, parameters=()):
+        self.start(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.record(time.perf_counter() - start, 0, True)
+
+    def executemany(self, sql, seq_of_parameters):
+        # Only a list's first parameters can be shown without consuming a generator
+        first = None
+        if isinstance(seq_of_parameters, (list, tuple)) and seq_of_parameters:
+            first = seq_of_parameters[0]
+        self.start(sql, first)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.record(time.perf_counter() - start, 0, True)
+
+    def executescript(self, sql_script):
+        self.start(sql_script, None)
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self.record(time.perf_counter() - start, 0, True)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self.record(time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self.record(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self.record(time.perf_counter() - start, len(rows))
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self.record(time.perf_counter() - start, 0)
+            raise
+        self.record(time.perf_counter() - start, 1)
+        return row
+
+
+class TracedConnection(sqlite3.Connection):
+    """
+    Connection whose cursors are TracedCursors. Opened with
+    sqlite3.connect(path, factory=TracedConnection, tracer=tracer).
+    """
+
+    def __init__(self, *args, tracer=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tracer = tracer or Tracer()
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
@@ -0,0 +1,134 @@
+import contextlib
+
+# Rows of the lists the menus page through: Recent Activity, tweet search and user search,
+# and the user profiles their names are resolved from (see profiles.py).
+# They are __slots__ records rather than tuples, so fields are read by name instead of as
+# row[5], and an instance holds only its fields, with no per-instance dict. A feed row's kind
+# is one of two shared strings instead of a new 'Tweet' or 'Retweet' string read per row.
+
+TWEET = 'Tweet'
+RETWEET = 'Retweet'
+# timeline.kind -> the kind shown
+KINDS = (TWEET, RETWEET)
+
+
+class Record:
+    """
+    Base of the row records. Fields are the subclass's __slots__, in column order. Records
+    unpack like the tuple of their fields, and compare equal to a record of the same type
+    with the same fields.
+    """
+    __slots__ = ()
+
+    def __iter__(self):
+        for field in self.__slots__:
+            yield getattr(self, field)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class FeedItem(Record):
+    """
+    A Recent Activity row: a tweet by a followed user, or a tweet they retweeted.
+    name and usr are who tweeted or retweeted it, writer_name and writer who wrote it.
+    """
+    __slots__ = ('name', 'kind', 'date', 'text', 'tid', 'usr', 'writer_name', 'writer')
+
+    def __init__(self, name, kind, date, text, tid, usr, writer_name, writer):
+        self.name = name
+        self.kind = kind
+        self.date = date
+        self.text = text
+        self.tid = tid
+        self.usr = usr
+        self.writer_name = writer_name
+        self.writer = writer
+
+    @property
+    def retweet(self):
+        return self.kind == RETWEET
+
+
+class TweetHit(Record):
+    """
+    A tweet search result, by writer usr named name.
+    """
+    __slots__ = ('name', 'usr', 'date', 'text', 'tid')
+
+    def __init__(self, name, usr, date, text, tid):
+        self.name = name
+        self.usr = usr
+        self.date = date
+        self.text = text
+        self.tid = tid
+
+
+class UserHit(Record):
+    """
+    A user search result.
+    """
+    __slots__ = ('usr', 'name')
+
+    def __init__(self, usr, name):
+        self.usr = usr
+        self.name = name
+
+
+class Profile(Record):
+    """
+    A user's row without their password.
+    """
+    __slots__ = ('usr', 'name', 'email', 'city', 'timezone')
+
+    def __init__(self, usr, name, email, city, timezone):
+        self.usr = usr
+        self.name = name
+        self.email = email
+        self.city = city
+        self.timezone = timezone
+
+
+def feed_item(cursor, row):
+    """
+    sqlite3 row factory for rows of (timeline kind, date, text, tid, usr, writer).
+    The names are left None, to be filled in from a profiles.ProfileCache.
+    """
+    kind, date, text, tid, usr, writer = row
+    return FeedItem(None, KINDS[kind], date, text, tid, usr, None, writer)
+
+def tweet_hit(cursor, row):
+    """
+    sqlite3 row factory for rows of (usr, date, text, tid).
+    The name is left None, to be filled in from a profiles.ProfileCache.
+    """
+    usr, date, text, tid = row
+    return TweetHit(None, usr, date, text, tid)
+
+def profile(cursor, row):
+    """
+    sqlite3 row factory for rows of (usr, name, email, city, timezone).
+    """
+    return Profile(*row)
+
+@contextlib.contextmanager
+def rows_as(cursor, factory):
+    """
+    Build the rows fetched from cursor inside the block with a row factory.
+    sqlite3 applies it as rows are fetched, so the fetch belongs inside the block too.
+    """
+    previous = cursor.row_factory
+    cursor.row_factory = factory
+    try:
+        yield cursor
+    finally:
+        cursor.row_factory = previous
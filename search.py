@@ -0,0 +1,304 @@
+import sqlite3
+import sys
+import profiles
+import queries
+import records
+
+# Full-text index over tweets.text. The trigram tokenizer matches any substring of three or more
+# characters case-insensitively, which is what the LIKE '%kw%' search it replaces did.
+# It is an external content table, so the text itself is only stored once in tweets.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS tweets_fts USING fts5 (
+  text,
+  content = 'tweets',
+  content_rowid = 'tid',
+  tokenize = 'trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS tweets_fts_insert AFTER INSERT ON tweets
+BEGIN
+  INSERT INTO tweets_fts (rowid, text) VALUES (new.tid, new.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tweets_fts_delete AFTER DELETE ON tweets
+BEGIN
+  INSERT INTO tweets_fts (tweets_fts, rowid, text) VALUES ('delete', old.tid, old.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tweets_fts_update AFTER UPDATE OF tid, text ON tweets
+BEGIN
+  INSERT INTO tweets_fts (tweets_fts, rowid, text) VALUES ('delete', old.tid, old.text);
+  INSERT INTO tweets_fts (rowid, text) VALUES (new.tid, new.text);
+END;
+"""
+
+# The same index over users.name and users.city, for user search. A trigram table answers
+# column LIKE '%kw%' itself, with LIKE's usual case-insensitive semantics.
+USERS_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5 (
+  name,
+  city,
+  content = 'users',
+  content_rowid = 'usr',
+  tokenize = 'trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users
+BEGIN
+  INSERT INTO users_fts (rowid, name, city) VALUES (new.usr, new.name, new.city);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users
+BEGIN
+  INSERT INTO users_fts (users_fts, rowid, name, city) VALUES ('delete', old.usr, old.name, old.city);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF usr, name, city ON users
+BEGIN
+  INSERT INTO users_fts (users_fts, rowid, name, city) VALUES ('delete', old.usr, old.name, old.city);
+  INSERT INTO users_fts (rowid, name, city) VALUES (new.usr, new.name, new.city);
+END;
+"""
+
+FTS_TABLES = ['tweets_fts', 'users_fts']
+
+# Columns of users that user search can match on
+USER_COLUMNS = ['name', 'city']
+
+# Shortest keyword the trigram index can answer; shorter keywords use the LIKE path.
+MIN_FTS_KEYWORD = 3
+
+# Set by install() once the full-text index is known to exist on the open database.
+fts_enabled = False
+
+
+def install(connection, cursor):
+    """
+    Create the full-text indexes and the triggers that keep them in sync with tweets and users.
+    Each index is populated the first time it is created on an existing database.
+    If SQLite was built without FTS5 (or without the trigram tokenizer) search keeps using LIKE.
+    @param connection: database connection.
+    @param cursor: cursor on the connection.
+    @return: True if the full-text index is available.
+    """
+    global fts_enabled
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('tweets_fts', 'users_fts');")
+    existing = {row[0] for row in cursor.fetchall()}
+    try:
+        cursor.executescript(FTS_SCHEMA + USERS_FTS_SCHEMA)
+    except sqlite3.OperationalError:
+        fts_enabled = False
+        return fts_enabled
+    missing = [table for table in FTS_TABLES if table not in existing]
+    if missing:
+        rebuild(connection, cursor, missing)
+    fts_enabled = True
+    return fts_enabled
+
+def rebuild(connection, cursor, tables=FTS_TABLES):
+    """
+    Reindex every tweet and user from the tweets and users tables.
+    @param tables: the full-text indexes to rebuild.
+    """
+    for table in tables:
+        # table comes from FTS_TABLES
+        cursor.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild');")
+    connection.commit()
+
+def match_expression(keywords):
+    """
+    Build an FTS5 query matching tweets that contain any of the keywords.
+    Each keyword is quoted so punctuation in it is matched literally.
+    @param keywords: list of plain (non-hashtag) keywords.
+    """
+    return " OR ".join('"' + keyword.replace('"', '""') + '"' for keyword in keywords)
+
+def plan_search(terms, keywords, limit, after=None):
+    """
+    Compile hashtag terms and plain keywords into one query for a page of matching tweets.
+    Each keyword contributes a branch to a UNION of tids, so a tweet matching several
+    keywords is only returned once. Pages are ordered newest first and resume from a
+    (tdate, tid) keyset instead of an OFFSET. Writers' names are not joined in; search_tweets
+    resolves them through a profiles.ProfileCache.
+    @param terms: hashtag terms without the leading '#'.
+    @param keywords: plain keywords.
+    @param limit: maximum number of rows in the page.
+    @param after: (tdate, tid) of the last row already read, or None for the first page.
+    @return: (sql, params) tuple, or None when there is nothing to search for.
+    """
+    branches = []
+    params = []
+    if terms:
+        branches.append("SELECT tid FROM mentions WHERE term IN (" + ", ".join("?" for term in terms) + ")")
+        params.extend(terms)
+    if keywords:
+        if fts_enabled and all(len(keyword) >= MIN_FTS_KEYWORD for keyword in keywords):
+            branches.append("SELECT rowid FROM tweets_fts WHERE tweets_fts MATCH ?")
+            params.append(match_expression(keywords))
+        else:
+            branches.append("SELECT tid FROM tweets WHERE " + " OR ".join("text LIKE ?" for keyword in keywords))
+            params.extend('%' + keyword + '%' for keyword in keywords)
+    if not branches:
+        return None
+
+    keyset = ""
+    if after is not None:
+        keyset = "AND (t.tdate, t.tid) < (?, ?)"
+        params.extend(after)
+    params.append(limit)
+    sql = f"""
+          SELECT t.writer, t.tdate, t.text, t.tid
+          FROM tweets t
+          WHERE t.tid IN ({" UNION ".join(branches)}) {keyset}
+          ORDER BY t.tdate DESC, t.tid DESC
+          LIMIT ?;
+          """
+    return sql, tuple(params)
+
+# Every shape plan_search produces: hashtags, keywords, both, each with and without a keyset.
+# Keywords go through the full-text index when it is available; shorter ones than
+# MIN_FTS_KEYWORD always fall back to a LIKE scan of tweets.
+for example_terms in ([], ['fun']):
+    for example_keywords, keywords_name, keywords_hot in (([], '', True),
+                                                          (['tweet', 'snow'], '_keywords', lambda: fts_enabled),
+                                                          (['ab'], '_short_keywords', False)):
+        if not example_terms and not example_keywords:
+            continue
+        for example_after, after_name in ((None, ''), (('2022-01-01', 10), '_after')):
+            queries.register_builder(
+                'search' + ('_hashtags' if example_terms else '') + keywords_name + after_name,
+                lambda terms=example_terms, keywords=example_keywords, after=example_after:
+                    plan_search(terms, keywords, 5, after),
+                keywords_hot)
+
+def search_tweets(cursor, terms, keywords, limit, after=None, cache=None):
+    """
+    Read one page of tweets matching any hashtag term or keyword.
+    @param terms: hashtag terms without the leading '#'.
+    @param keywords: plain keywords.
+    @param limit: maximum number of rows in the page.
+    @param after: (tdate, tid) of the last row already read, or None for the first page.
+    @param cache: profiles.ProfileCache the writers' names are resolved through, the connection's when None.
+    @return: list of records.TweetHit.
+    """
+    plan = plan_search(terms, keywords, limit, after)
+    if plan is None:
+        return []
+    with records.rows_as(cursor, records.tweet_hit):
+        cursor.execute(*plan)
+        page = cursor.fetchall()
+    if cache is None:
+        cache = profiles.cache_for(cursor.connection)
+    return profiles.fill_tweets(cursor, cache, page)
+
+def iter_search(cursor, terms, keywords, page_size, cache=None):
+    """
+    Lazily page through tweets matching any hashtag term or keyword, one query per page.
+    @param terms: hashtag terms without the leading '#'.
+    @param keywords: plain keywords.
+    @param page_size: number of rows per page.
+    @param cache: profiles.ProfileCache the writers' names are resolved through, the connection's when None.
+    """
+    after = None
+    while True:
+        page = search_tweets(cursor, terms, keywords, page_size, after, cache)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = (page[-1].date, page[-1].tid)
+
+def user_filter(column, keyword):
+    """
+    Build the WHERE condition on users u for users whose column contains the keyword.
+    Keywords long enough for the trigram index are looked up in users_fts; shorter ones scan users.
+    @param column: one of USER_COLUMNS.
+    @return: (condition, params) tuple.
+    """
+    if column not in USER_COLUMNS:
+        raise ValueError(f"Users can't be searched by {column}")
+    if fts_enabled and len(keyword) >= MIN_FTS_KEYWORD:
+        return f"u.usr IN (SELECT rowid FROM users_fts WHERE users_fts.{column} LIKE ?)", ('%' + keyword + '%',)
+    return f"u.{column} LIKE ?", ('%' + keyword + '%',)
+
+def plan_user_search(column, keyword, limit, after=None):
+    """
+    Compile a page of users whose column contains the keyword into a query.
+    Users are ranked by the length of the matched column, then by it, so closer matches come first;
+    usr breaks ties so pages can resume from a (length, value, usr) keyset instead of an OFFSET.
+    @param column: one of USER_COLUMNS.
+    @param limit: maximum number of rows in the page.
+    @param after: keyset of the last row already read, or None for the first page.
+    @return: (sql, params) tuple for rows of (usr, name, length, value).
+    """
+    condition, params = user_filter(column, keyword)
+    keyset = ""
+    if after is not None:
+        keyset = f"AND (LENGTH(u.{column}), u.{column}, u.usr) > (?, ?, ?)"
+        params += tuple(after)
+    sql = f"""
+          SELECT u.usr, u.name, LENGTH(u.{column}), u.{column}
+          FROM users u
+          WHERE {condition} {keyset}
+          ORDER BY LENGTH(u.{column}), u.{column}, u.usr
+          LIMIT ?;
+          """
+    return sql, params + (limit,)
+
+# User search by name and by city, through the trigram index or, for short keywords, a LIKE scan
+for example_column, example_keyword in (('name', 'bob'), ('city', 'cal')):
+    for keyword_name, keyword_hot in (('', lambda: fts_enabled), ('_short', False)):
+        if keyword_name:
+            example_keyword = example_keyword[:MIN_FTS_KEYWORD - 1]
+        for example_after, after_name in ((None, ''), ((3, 'Bob', 2), '_after')):
+            queries.register_builder(f'search_users_by_{example_column}{keyword_name}{after_name}',
+                                     lambda column=example_column, keyword=example_keyword, after=example_after:
+                                         plan_user_search(column, keyword, 6, after),
+                                     keyword_hot)
+
+def search_users(cursor, column, keyword, limit, after=None):
+    """
+    Read one page of users whose column (name or city) contains the keyword, closest matches first.
+    One row more than the page is fetched to tell whether another page follows, so no count is needed.
+    @param after: keyset returned with the previous page, or None for the first page.
+    @return: (list of records.UserHit, keyset to pass for the next page or None if this is the last).
+    """
+    cursor.execute(*plan_user_search(column, keyword, limit + 1, after))
+    rows = cursor.fetchall()
+    after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        usr, name, length, value = rows[-1]
+        after = (length, value, usr)
+    return [records.UserHit(usr, name) for usr, name, length, value in rows], after
+
+def iter_user_search(cursor, column, keyword, page_size):
+    """
+    Lazily page through users whose column (name or city) contains the keyword, one query per page.
+    Every page costs the same however deep it is, and no query is made past the last one.
+    @param page_size: number of rows per page.
+    """
+    after = None
+    while True:
+        page, after = search_users(cursor, column, keyword, page_size, after)
+        if page:
+            yield page
+        if after is None:
+            return
+
+if __name__ == "__main__":
+    # Rebuild the full-text index of an existing database:
+    #   $ python3 search.py (optional) database_filename
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        path = "./test1.db"
+    connection = sqlite3.connect(path)
+    cursor = connection.cursor()
+    if install(connection, cursor):
+        rebuild(connection, cursor)
+        print(f"Rebuilt full-text indexes for {path}.")
+    else:
+        print("This SQLite build has no FTS5 trigram support; search uses LIKE.")
+    connection.close()
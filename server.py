@@ -0,0 +1,322 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import db
+import passwords
+import profiles
+import threads
+import timeline
+import trending
+from service import TweeterService
+
+logger = logging.getLogger("tweeter")
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8470
+DEFAULT_WORKERS = 4
+DEFAULT_HASH_WORKERS = os.cpu_count() or 1
+MAX_PAGE_SIZE = 50
+# Longest request line read, asyncio's default stream limit; longer ones are answered with an error
+MAX_REQUEST_BYTES = 2 ** 16
+
+# Field names of the rows TweeterService returns, used to send them as JSON objects.
+# Feed and tweet rows are records.FeedItem and records.TweetHit, which unpack in this order.
+FEED_FIELDS = ['name', 'type', 'date', 'text', 'tid', 'usr', 'writer_name', 'writer']
+TWEET_FIELDS = ['name', 'usr', 'date', 'text', 'tid']
+THREAD_FIELDS = ['tid', 'replyto', 'level', 'usr', 'name', 'date', 'text', 'replies']
+TREND_FIELDS = ['term', 'count']
+
+
+def page_size(request):
+    """
+    @return: the request's "limit", between 1 and MAX_PAGE_SIZE, 5 when it is missing.
+    """
+    limit = int(request.get('limit', 5))
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+def text(request, field):
+    """
+    @return: the request's field, which must be a string.
+    """
+    value = request[field]
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    return value
+
+async def read_request(reader):
+    """
+    Read one request line. A line longer than the reader's limit is discarded up to its newline,
+    so the next request on the connection is still read from its start.
+    @return: the line, b"" when the client disconnected, or None if the line was too long.
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as error:
+        return error.partial
+    except asyncio.LimitOverrunError:
+        pass
+    while True:
+        try:
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.IncompleteReadError:
+            return b""
+        except asyncio.LimitOverrunError as error:
+            # consumed bytes are buffered and hold no newline, or end just before it
+            await reader.readexactly(error.consumed)
+
+def page_after(request):
+    """
+    @return: the request's "after" cursor as a tuple, or None for the first page.
+    """
+    after = request.get('after')
+    if after is None:
+        return None
+    return tuple(after)
+
+
+class TweeterServer:
+    """
+    Serve TweeterService to many clients over a JSON-lines protocol.
+    Each request is one JSON object on its own line, e.g.
+        {"id": 1, "op": "login", "usr": 1, "password": "pass1"}
+    and is answered by one line
+        {"id": 1, "ok": true, "result": {...}}   or   {"id": 1, "ok": false, "error": "..."}
+    A client connection is one session: login sets the user every later request acts as.
+    sqlite3 calls block, so they run on a bounded pool of worker threads, each with its own
+    database connection and one shared profiles.ProfileCache, while the event loop only parses
+    and writes lines. Password hashing takes tens of milliseconds of CPU and no connection, so
+    it runs on a pool of its own instead of holding a database worker.
+    """
+
+    def __init__(self, path, settings=None, workers=DEFAULT_WORKERS, tracer=None, hash_workers=DEFAULT_HASH_WORKERS):
+        """
+        @param path: file path to the database. Derived tables must already be installed (main.connect does it).
+        @param settings: connection settings from db.resolve_settings, or None for the default preset.
+        @param workers: number of worker threads, and so of open database connections.
+        @param tracer: querytrace.Tracer shared by every worker's connection, or None.
+        @param hash_workers: number of password hashing threads. hashlib releases the GIL while
+                             hashing, so up to one per CPU run in parallel.
+        """
+        self.path = path
+        self.settings = settings
+        self.tracer = tracer
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tweeter-db")
+        self.hashers = ThreadPoolExecutor(max_workers=hash_workers, thread_name_prefix="tweeter-hash")
+        self.local = threading.local()
+        # Every worker's connection is to the same file, so one cache serves and invalidates for all
+        self.cache = profiles.ProfileCache()
+
+    def service(self):
+        """
+        @return: the calling worker thread's TweeterService, opened on first use.
+        """
+        service = getattr(self.local, 'service', None)
+        if service is None:
+            service = TweeterService(db.open_database(self.path, self.settings, self.tracer), cache=self.cache)
+            self.local.service = service
+        return service
+
+    def run(self, method, args):
+        return getattr(self.service(), method)(*args)
+
+    async def call(self, method, *args):
+        """
+        Run a TweeterService method on the worker pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.run, method, args)
+
+    async def hash(self, function, *args):
+        """
+        Run a passwords function on the hashing pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.hashers, function, *args)
+
+    def close(self):
+        """
+        Stop the worker threads. Their connections are closed as the threads exit.
+        """
+        self.executor.shutdown(wait=True)
+        self.hashers.shutdown(wait=True)
+
+    async def handle(self, reader, writer):
+        """
+        Answer one client's requests, in order, until it disconnects.
+        """
+        session = {'user': None}
+        try:
+            while True:
+                line = await read_request(reader)
+                if line is None:
+                    response = {'id': None, 'ok': False, 'error': "Request too long"}
+                elif not line:
+                    break
+                else:
+                    response = await self.respond(session, line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, session, line):
+        """
+        @param session: the client's session, {"user": user row or None}.
+        @param line: one request line.
+        @return: the response object.
+        """
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {'id': None, 'ok': False, 'error': "Invalid JSON"}
+        if not isinstance(request, dict):
+            return {'id': None, 'ok': False, 'error': "A request must be a JSON object"}
+        response = {'id': request.get('id')}
+        handler = getattr(self, f"op_{request.get('op')}", None)
+        if handler is None:
+            response.update(ok=False, error=f"Unknown op: {request.get('op')}")
+            return response
+        try:
+            response.update(ok=True, result=await handler(session, request))
+        except KeyError as error:
+            response.update(ok=False, error=f"Missing field: {error.args[0]}")
+        except (ValueError, TypeError) as error:
+            response.update(ok=False, error=str(error))
+        except sqlite3.Error:
+            logger.exception("Request %s failed", request.get('op'))
+            response.update(ok=False, error="Database error")
+        except Exception:
+            # A bug in one request must not drop the client's connection and session
+            logger.exception("Request %s failed", request.get('op'))
+            response.update(ok=False, error="Internal error")
+        return response
+
+    def logged_in(self, session):
+        """
+        @return: the session's user id.
+        """
+        if session['user'] is None:
+            raise ValueError("Not logged in")
+        return session['user'][0]
+
+    # Operations, one per "op" value
+
+    async def op_signup(self, session, request):
+        pwd = await self.hash(passwords.hash_password, text(request, 'password'))
+        usr = await self.call('create_user', text(request, 'name'), pwd, request.get('email'),
+                              request.get('city'), request.get('timezone'))
+        return {'usr': usr}
+
+    async def op_login(self, session, request):
+        # TweeterService.login, with the hashing moved off the database workers
+        password = text(request, 'password')
+        user = await self.call('credentials', request['usr'])
+        matches, outdated = await self.hash(passwords.verify, password, user[1] if user else None)
+        if not matches:
+            raise ValueError("Login failed")
+        if outdated:
+            await self.call('rehash', user[0], user[1], await self.hash(passwords.hash_password, password))
+        session['user'] = user
+        return {'usr': user[0], 'name': user[2]}
+
+    async def op_logout(self, session, request):
+        self.logged_in(session)
+        session['user'] = None
+        return {}
+
+    async def op_feed(self, session, request):
+        limit = page_size(request)
+        rows = await self.call('feed_page', self.logged_in(session), limit, page_after(request))
+        next_page = list(timeline.timeline_key(rows[-1])) if len(rows) == limit else None
+        return {'rows': [dict(zip(FEED_FIELDS, row)) for row in rows], 'after': next_page}
+
+    async def op_search(self, session, request):
+        self.logged_in(session)
+        keywords = request['keywords']
+        if isinstance(keywords, str):
+            keywords = keywords.split()
+        if not isinstance(keywords, list) or not all(isinstance(keyword, str) for keyword in keywords):
+            raise ValueError("keywords must be a string or a list of strings")
+        keywords = [keyword for keyword in keywords if keyword]
+        if not keywords:
+            raise ValueError("No keywords given")
+        limit = page_size(request)
+        rows = await self.call('search_tweets', keywords, limit, page_after(request))
+        next_page = [rows[-1].date, rows[-1].tid] if len(rows) == limit else None
+        return {'rows': [dict(zip(TWEET_FIELDS, row)) for row in rows], 'after': next_page}
+
+    async def op_compose(self, session, request):
+        tid = await self.call('compose', self.logged_in(session), request['text'], request.get('replyto'))
+        return {'tid': tid}
+
+    async def op_follow(self, session, request):
+        followed = await self.call('follow', self.logged_in(session), request['usr'])
+        return {'followed': followed}
+
+    async def op_retweet(self, session, request):
+        retweeted = await self.call('retweet', self.logged_in(session), request['tid'])
+        return {'retweeted': retweeted}
+
+    async def op_tweet_info(self, session, request):
+        self.logged_in(session)
+        return await self.call('tweet_info', request['tid'])
+
+    async def op_thread(self, session, request):
+        self.logged_in(session)
+        depth = int(request.get('depth', threads.DEFAULT_DEPTH))
+        width = int(request.get('width', threads.DEFAULT_WIDTH))
+        if not (0 <= depth <= threads.DEFAULT_ANCESTORS and 1 <= width <= MAX_PAGE_SIZE):
+            raise ValueError(f"depth must be between 0 and {threads.DEFAULT_ANCESTORS}, "
+                             f"width between 1 and {MAX_PAGE_SIZE}")
+        rows = await self.call('thread', request['tid'], depth, width)
+        return {'rows': [dict(zip(THREAD_FIELDS, row)) for row in rows]}
+
+    async def op_replies(self, session, request):
+        self.logged_in(session)
+        rows, next_page = await self.call('replies_page', request['tid'], page_size(request), page_after(request))
+        return {'rows': [dict(zip(THREAD_FIELDS, row)) for row in rows],
+                'after': list(next_page) if next_page else None}
+
+    async def op_trending(self, session, request):
+        self.logged_in(session)
+        k = int(request.get('limit', trending.DEFAULT_TOP))
+        if not 1 <= k <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        trends = await self.call('trending', k)
+        return {'days': trends['days'], 'start': trends['start'],
+                'rows': [dict(zip(TREND_FIELDS, row)) for row in trends['rows']]}
+
+
+async def serve(path, settings=None, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, tracer=None,
+                hash_workers=DEFAULT_HASH_WORKERS):
+    """
+    Serve the database until cancelled.
+    """
+    server = TweeterServer(path, settings, workers, tracer, hash_workers)
+    listener = await asyncio.start_server(server.handle, host, port, limit=MAX_REQUEST_BYTES)
+    logger.info("Serving %s on %s with %d workers", path, ", ".join(
+        "{0}:{1}".format(*sock.getsockname()[:2]) for sock in listener.sockets), workers)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+def run(path, settings=None, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, tracer=None,
+        hash_workers=DEFAULT_HASH_WORKERS):
+    """
+    Blocking entry point for `python3 main.py --serve`; stops on Ctrl-C.
+    """
+    try:
+        asyncio.run(serve(path, settings, host, port, workers, tracer, hash_workers))
+    except KeyboardInterrupt:
+        logger.info("Server stopped")
@@ -0,0 +1,494 @@
+from datetime import datetime
+import re
+import sqlite3
+import db
+import ids
+import migrations
+import passwords
+import profiles
+import queries
+import search
+import stats
+import threads
+import timeline
+import trending
+
+SIGNUP = queries.register('signup', """
+    INSERT INTO users (usr, pwd, name, email, city, timezone)
+    VALUES (?, ?, ?, ?, ?, ?);
+""", (7, 'scrypt$16384$8$1$00$00', 'Ann', 'ann@email.com', 'Banff', -7))
+
+CREDENTIALS = queries.register('credentials', """
+    SELECT usr, pwd, name, email, city, timezone FROM users WHERE usr = ?
+""", (1,))
+
+# Only replaces the hash that was verified, so a concurrent password change is kept
+REHASH = queries.register('rehash', """
+    UPDATE users SET pwd = ? WHERE usr = ? AND pwd = ?
+""", ('scrypt$16384$8$1$00$00', 1, 'plain$pass1'))
+
+INSERT_TWEET = queries.register('insert_tweet', """
+    INSERT INTO tweets (tid, writer, tdate, text, replyto)
+    VALUES (?, ?, ?, ?, ?);
+""", (15, 1, '2025-01-01', 'text', None))
+
+INSERT_HASHTAG = queries.register('insert_hashtag', """
+    INSERT OR IGNORE INTO hashtags (term) VALUES (?)
+""", ('fun',))
+
+INSERT_MENTION = queries.register('insert_mention', """
+    INSERT OR IGNORE INTO mentions (tid, term) VALUES (?, ?)
+""", (15, 'fun'))
+
+# Ignored when the user already retweeted the tweet, so a repeated retweet is no error
+INSERT_RETWEET = queries.register('insert_retweet', """
+    INSERT OR IGNORE INTO retweets VALUES
+     (?, ?, ?);
+""", (1, 3, '2025-01-01'))
+
+# Only the profile fields; a password change goes through REHASH
+UPDATE_PROFILE = queries.register('update_profile', """
+    UPDATE users SET name = ?, email = ?, city = ?, timezone = ? WHERE usr = ?
+""", ('Nik', 'nik@email.com', 'Calgary', -7, 1))
+
+RECENT_TWEETS = queries.register('recent_tweets', """
+    SELECT text FROM tweets
+    WHERE writer = ?
+    ORDER BY tdate DESC, tid DESC
+    LIMIT 3;
+""", (1,))
+
+USER_TWEETS = queries.register('user_tweets', """
+    SELECT text, tdate, tid FROM tweets
+    WHERE writer = ?
+    ORDER BY tdate DESC, tid DESC
+    LIMIT ?;
+""", (1, 11))
+
+USER_TWEETS_AFTER = queries.register('user_tweets_after', """
+    SELECT text, tdate, tid FROM tweets
+    WHERE writer = ?
+     AND (tdate, tid) < (?, ?)
+    ORDER BY tdate DESC, tid DESC
+    LIMIT ?;
+""", (1, '2022-01-01', 5, 11))
+
+FOLLOWERS = queries.register('followers', """
+    SELECT u.usr, u.name, f.start_date
+    FROM follows f, users u
+    WHERE f.flwee = ? AND u.usr = f.flwer
+    ORDER BY f.start_date DESC, f.flwer DESC
+    LIMIT ?;
+""", (1, 11))
+
+FOLLOWERS_AFTER = queries.register('followers_after', """
+    SELECT u.usr, u.name, f.start_date
+    FROM follows f, users u
+    WHERE f.flwee = ? AND u.usr = f.flwer
+     AND (f.start_date, f.flwer) < (?, ?)
+    ORDER BY f.start_date DESC, f.flwer DESC
+    LIMIT ?;
+""", (1, '2022-01-01', 5, 11))
+
+# Ignored when flwer already follows flwee
+INSERT_FOLLOW = queries.register('insert_follow', """
+    INSERT OR IGNORE INTO follows (flwer, flwee, start_date) VALUES (?, ?, ?);
+""", (1, 4, '2025-01-01'))
+
+
+def install(connection, cursor):
+    """
+    Bring the schema up to date with migrations.migrate, then install every derived table
+    (home timeline, tweet search index, counters, trending hashtags, id sequences) the service relies on.
+    Each is backfilled the first time it is created.
+    @param connection: database connection.
+    @param cursor: cursor on the connection.
+    """
+    migrations.migrate(connection, cursor)
+    timeline.install(connection, cursor)
+    search.install(connection, cursor)
+    stats.install(connection, cursor)
+    trending.install(connection, cursor)
+    ids.install(connection, cursor)
+    connection.commit()
+
+def parse_keywords(keywords):
+    """
+    Split search keywords into hashtag terms and plain keywords.
+    @param keywords: list of keywords as typed, hashtags with their leading '#'. Empty ones are skipped.
+    @return: (terms without the '#', plain keywords).
+    """
+    terms = []
+    text_matches = []
+    for keyword in keywords:
+        if not keyword:
+            continue
+        if keyword[0] == '#':
+            terms.append(keyword[1:])
+        else:
+            text_matches.append(keyword)
+    return terms, text_matches
+
+
+class TweeterService:
+    """
+    Every operation behind the menus, without any input() or print().
+    Methods return plain tuples, lists and dicts so they can be rendered by the CLI,
+    serialized by a server or driven by a benchmark.
+    Rows keep the shapes of the queries they come from:
+        feed rows:   records.FeedItem (name, kind, date, text, tid, usr, writer_name, writer)
+        tweet rows:  records.TweetHit (name, usr, date, text, tid)
+        user rows:   records.UserHit (usr, name)
+    Users' names in feed and tweet rows come from a profiles.ProfileCache rather than a join.
+    """
+
+    def __init__(self, connection, cursor=None, cache=None):
+        """
+        @param connection: database connection.
+        @param cursor: cursor to run queries on. A new one is opened when None.
+        @param cache: profiles.ProfileCache to resolve names through. When None, the cache of the
+                      connection, shared with every other service on it.
+        """
+        self.connection = connection
+        if cursor is None:
+            cursor = connection.cursor()
+        self.cursor = cursor
+        if cache is None:
+            cache = profiles.cache_for(connection)
+        self.cache = cache
+
+    @classmethod
+    def open(cls, path, settings=None):
+        """
+        Open a database with db.open_database and install the derived tables.
+        @param path: file path to the database.
+        @param settings: connection settings from db.resolve_settings, or None for the default preset.
+        """
+        connection = db.open_database(path, settings)
+        service = cls(connection)
+        install(connection, service.cursor)
+        return service
+
+    def close(self):
+        profiles.release(self.connection)
+        self.connection.close()
+
+    # Accounts
+
+    def signup(self, name, password, email, city, timezone):
+        """
+        Create a user, storing a salted hash of their password.
+        @return: the new user's id.
+        """
+        return self.create_user(name, passwords.hash_password(password), email, city, timezone)
+
+    def create_user(self, name, pwd, email, city, timezone):
+        """
+        Create a user whose password was already hashed with passwords.hash_password.
+        @return: the new user's id.
+        """
+        try:
+            usr = ids.allocate(self.cursor, 'users')
+            self.cursor.execute(SIGNUP, (usr, pwd, name, email, city, timezone))
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+        self.cache.invalidate(usr)
+        return usr
+
+    def update_profile(self, usr, name, email, city, timezone):
+        """
+        Change a user's name, email, city and timezone.
+        @return: True if the user exists.
+        """
+        try:
+            self.cursor.execute(UPDATE_PROFILE, (name, email, city, timezone, usr))
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+        self.cache.invalidate(usr)
+        return self.cursor.rowcount == 1
+
+    def login(self, usr, password):
+        """
+        Check a user's credentials: a primary-key lookup of the stored hash, then a constant-time
+        comparison. A password stored as plain text or at an outdated cost is rehashed.
+        @return: the user's row (usr, pwd, name, email, city, timezone), or None if they don't match.
+        """
+        user = self.credentials(usr)
+        matches, outdated = passwords.verify(password, user[1] if user else None)
+        if not matches:
+            return None
+        if outdated:
+            pwd = passwords.hash_password(password)
+            if self.rehash(usr, user[1], pwd):
+                user = user[:1] + (pwd,) + user[2:]
+        return user
+
+    def credentials(self, usr):
+        """
+        @return: the user's row (usr, pwd, name, email, city, timezone), or None if there is no such user.
+        """
+        self.cursor.execute(CREDENTIALS, (usr,))
+        return self.cursor.fetchone()
+
+    def rehash(self, usr, old, new):
+        """
+        Replace a user's stored password hash, unless it changed since old was read.
+        @return: True if it was replaced.
+        """
+        try:
+            self.cursor.execute(REHASH, (new, usr, old))
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+        return self.cursor.rowcount == 1
+
+    # Feed
+
+    def iter_feed(self, usr, page_size=5):
+        """
+        Lazily page through a user's Recent Activity, newest first.
+        @return: generator of lists of feed rows.
+        """
+        return timeline.iter_timeline(self.cursor, usr, page_size, self.cache)
+
+    def feed_page(self, usr, limit=5, after=None):
+        """
+        Read one page of a user's Recent Activity.
+        @param after: timeline.timeline_key of the last row already read, or None for the first page.
+        @return: list of feed rows.
+        """
+        return timeline.read_timeline(self.cursor, usr, limit, after, self.cache)
+
+    # Tweets
+
+    def compose(self, usr, text, replyto=None):
+        """
+        Post a tweet, with its hashtags, in one transaction.
+        @param replyto: tid of the tweet replied to, or None.
+        @return: the new tweet's id.
+        """
+        if not text:
+            raise ValueError("The tweet message cannot be empty!")
+        # dict.fromkeys drops repeated tags while keeping their order
+        hashtags = list(dict.fromkeys(re.findall(r"#(\w+)", text)))
+        date = datetime.now().date()
+        try:
+            tid = ids.allocate(self.cursor, 'tweets')
+            self.cursor.execute(INSERT_TWEET, (tid, usr, date, text, replyto))
+            if hashtags:
+                self.cursor.executemany(INSERT_HASHTAG, [(hashtag,) for hashtag in hashtags])
+                self.cursor.executemany(INSERT_MENTION, [(tid, hashtag) for hashtag in hashtags])
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+        return tid
+
+    def retweet(self, usr, tid):
+        """
+        Retweet a tweet.
+        @return: True if the retweet was made, False if the user had already retweeted it.
+        """
+        try:
+            self.cursor.execute(INSERT_RETWEET, (usr, tid, datetime.now().date()))
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+        return self.cursor.rowcount == 1
+
+    def tweet_info(self, tid):
+        """
+        @return: dict with the tweet's number of replies and retweets.
+        """
+        replies, retweets = stats.tweet_counts(self.cursor, tid)
+        return {'tid': tid, 'replies': replies, 'retweets': retweets}
+
+    # Conversations
+
+    def thread(self, tid, depth=threads.DEFAULT_DEPTH, width=threads.DEFAULT_WIDTH):
+        """
+        Read the conversation around a tweet in one query: the tweets it replies to, then the
+        tree of its replies, up to depth levels and width replies under each tweet.
+        @return: list of thread rows (tid, replyto, level, writer usr, writer name, tdate, text, reply count).
+        """
+        return threads.read_thread(self.cursor, tid, depth=depth, width=width)
+
+    def replies_page(self, tid, limit=threads.DEFAULT_WIDTH, after=None):
+        """
+        Read one page of the direct replies to a tweet, oldest first.
+        @param after: keyset returned with the previous page, or None for the first page.
+        @return: (list of thread rows, keyset of the next page or None if this is the last).
+        """
+        return threads.read_replies(self.cursor, tid, limit, after)
+
+    def iter_replies(self, tid, page_size=threads.DEFAULT_WIDTH):
+        """
+        Lazily page through the direct replies to a tweet, oldest first.
+        @return: generator of lists of thread rows.
+        """
+        return threads.iter_replies(self.cursor, tid, page_size)
+
+    def trending(self, k=trending.DEFAULT_TOP):
+        """
+        Read the hashtags mentioned most over the trending window, first sliding it to end today.
+        @return: dict with the window's length in days, its first day, and its k top (term, count) rows.
+        """
+        days, start = trending.advance(self.connection, self.cursor)
+        return {'days': days, 'start': start, 'rows': trending.top_terms(self.cursor, k)}
+
+    def iter_search(self, keywords, page_size=5):
+        """
+        Lazily page through tweets matching any of the keywords, newest first.
+        @param keywords: list of keywords as typed, hashtags with their leading '#'.
+        @return: generator of lists of tweet rows.
+        """
+        terms, text_matches = parse_keywords(keywords)
+        return search.iter_search(self.cursor, terms, text_matches, page_size, self.cache)
+
+    def search_tweets(self, keywords, limit=5, after=None):
+        """
+        Read one page of tweets matching any of the keywords, newest first.
+        @param keywords: list of keywords as typed, hashtags with their leading '#'.
+        @param after: (tdate, tid) of the last row already read, or None for the first page.
+        @return: list of tweet rows.
+        """
+        terms, text_matches = parse_keywords(keywords)
+        return search.search_tweets(self.cursor, terms, text_matches, limit, after, self.cache)
+
+    # Users
+
+    def iter_users_by_name(self, keyword, page_size=5):
+        """
+        Lazily page through users whose name contains the keyword, shortest names first.
+        @return: generator of lists of user rows.
+        """
+        return search.iter_user_search(self.cursor, 'name', keyword, page_size)
+
+    def iter_users_by_city(self, keyword, page_size=5):
+        """
+        Lazily page through users whose city contains the keyword, shortest city names first.
+        @return: generator of lists of user rows.
+        """
+        return search.iter_user_search(self.cursor, 'city', keyword, page_size)
+
+    def search_users_by_name(self, keyword, page_size=5, after=None):
+        """
+        Read one page of users whose name contains the keyword, shortest names first.
+        @param after: keyset returned with the previous page, or None for the first page.
+        @return: (list of user rows, keyset of the next page or None if this is the last).
+        """
+        return search.search_users(self.cursor, 'name', keyword, page_size, after)
+
+    def search_users_by_city(self, keyword, page_size=5, after=None):
+        """
+        Read one page of users whose city contains the keyword, shortest city names first.
+        @param after: keyset returned with the previous page, or None for the first page.
+        @return: (list of user rows, keyset of the next page or None if this is the last).
+        """
+        return search.search_users(self.cursor, 'city', keyword, page_size, after)
+
+    def user_name(self, usr):
+        """
+        @return: the user's name, or None if there is no such user.
+        """
+        profile = self.cache.get(self.cursor, usr)
+        if profile is None:
+            return None
+        return profile.name
+
+    def profile(self, usr):
+        """
+        @return: dict with the user's tweet, following and follower counts and their 3 latest tweets' text.
+        """
+        tweet_count, following_count, follower_count = stats.user_counts(self.cursor, usr)
+        self.cursor.execute(RECENT_TWEETS, (usr,))
+        recent = [row[0] for row in self.cursor.fetchall()]
+        return {'usr': usr, 'tweets': tweet_count, 'following': following_count,
+                'followers': follower_count, 'recent': recent}
+
+    def user_tweets_page(self, usr, limit=10, after=None):
+        """
+        Read one page of the tweets a user wrote, newest first. The page is a keyset range of the
+        tweets_writer_date index; one row past it is read to tell whether another page follows.
+        @param after: keyset returned with the previous page, or None for the first page.
+        @return: (list of (text, tdate, tid) rows, keyset of the next page or None if this is the last).
+        """
+        if after is None:
+            self.cursor.execute(USER_TWEETS, (usr, limit + 1))
+        else:
+            self.cursor.execute(USER_TWEETS_AFTER, (usr, *after, limit + 1))
+        rows = self.cursor.fetchmany(limit)
+        if self.cursor.fetchone() is None:
+            return rows, None
+        return rows, (rows[-1][1], rows[-1][2])
+
+    def iter_user_tweets(self, usr, page_size=10):
+        """
+        Lazily page through the tweets a user wrote, newest first, one query per page, so memory
+        does not grow with the number of tweets.
+        @return: generator of lists of (text, tdate, tid) rows.
+        """
+        after = None
+        while True:
+            page, after = self.user_tweets_page(usr, page_size, after)
+            if page:
+                yield page
+            if after is None:
+                return
+
+    def follower_count(self, usr):
+        """
+        @return: the number of users following the user, read from its counters rather than follows.
+        """
+        return stats.user_counts(self.cursor, usr)[2]
+
+    def followers_page(self, usr, limit=10, after=None):
+        """
+        Read one page of the user's followers, newest first. The page is a keyset range of the
+        follows_flwee_date index; one row past it is read to tell whether another page follows.
+        @param after: keyset returned with the previous page, or None for the first page.
+        @return: (list of (usr, name, start_date) rows, keyset of the next page or None if this is the last).
+        """
+        if after is None:
+            self.cursor.execute(FOLLOWERS, (usr, limit + 1))
+        else:
+            self.cursor.execute(FOLLOWERS_AFTER, (usr, *after, limit + 1))
+        rows = self.cursor.fetchmany(limit)
+        if self.cursor.fetchone() is None:
+            return rows, None
+        return rows, (rows[-1][2], rows[-1][0])
+
+    def iter_followers(self, usr, page_size=10):
+        """
+        Lazily page through the user's followers, newest first, one query per page, so memory
+        does not grow with the number of followers.
+        @return: generator of lists of (usr, name, start_date) rows.
+        """
+        after = None
+        while True:
+            page, after = self.followers_page(usr, page_size, after)
+            if page:
+                yield page
+            if after is None:
+                return
+
+    def follow(self, flwer, flwee):
+        """
+        Make flwer follow flwee.
+        @return: True if the follow was made, False if flwer already followed flwee.
+        """
+        if flwer == flwee:
+            raise ValueError("You cannot follow yourself!")
+        try:
+            self.cursor.execute(INSERT_FOLLOW, (flwer, flwee, datetime.now().date()))
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+        return self.cursor.rowcount == 1
@@ -0,0 +1,240 @@
+import sqlite3
+import sys
+import queries
+
+# Per-user counters shown on a profile, and per-tweet counters shown by Tweet information,
+# kept current by triggers so each view is one primary-key lookup instead of COUNT(*) scans.
+STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_stats (
+  usr               int,
+  tweet_count       int default 0,
+  following_count   int default 0,
+  follower_count    int default 0,
+  primary key (usr)
+);
+
+CREATE TRIGGER IF NOT EXISTS user_stats_tweet_insert AFTER INSERT ON tweets
+BEGIN
+  INSERT INTO user_stats (usr, tweet_count) VALUES (new.writer, 1)
+  ON CONFLICT (usr) DO UPDATE SET tweet_count = tweet_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_tweet_delete AFTER DELETE ON tweets
+BEGIN
+  UPDATE user_stats SET tweet_count = tweet_count - 1 WHERE usr = old.writer;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_follow_insert AFTER INSERT ON follows
+BEGIN
+  INSERT INTO user_stats (usr, following_count) VALUES (new.flwer, 1)
+  ON CONFLICT (usr) DO UPDATE SET following_count = following_count + 1;
+  INSERT INTO user_stats (usr, follower_count) VALUES (new.flwee, 1)
+  ON CONFLICT (usr) DO UPDATE SET follower_count = follower_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_stats_follow_delete AFTER DELETE ON follows
+BEGIN
+  UPDATE user_stats SET following_count = following_count - 1 WHERE usr = old.flwer;
+  UPDATE user_stats SET follower_count = follower_count - 1 WHERE usr = old.flwee;
+END;
+
+CREATE TABLE IF NOT EXISTS tweet_stats (
+  tid               int,
+  reply_count       int default 0,
+  retweet_count     int default 0,
+  primary key (tid)
+);
+
+CREATE TRIGGER IF NOT EXISTS tweet_stats_reply_insert AFTER INSERT ON tweets
+WHEN new.replyto IS NOT NULL AND new.replyto != new.tid
+BEGIN
+  INSERT INTO tweet_stats (tid, reply_count) VALUES (new.replyto, 1)
+  ON CONFLICT (tid) DO UPDATE SET reply_count = reply_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tweet_stats_reply_delete AFTER DELETE ON tweets
+BEGIN
+  UPDATE tweet_stats SET reply_count = reply_count - 1
+  WHERE tid = old.replyto AND old.replyto != old.tid;
+  DELETE FROM tweet_stats WHERE tid = old.tid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tweet_stats_retweet_insert AFTER INSERT ON retweets
+BEGIN
+  INSERT INTO tweet_stats (tid, retweet_count) VALUES (new.tid, 1)
+  ON CONFLICT (tid) DO UPDATE SET retweet_count = retweet_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tweet_stats_retweet_delete AFTER DELETE ON retweets
+BEGIN
+  UPDATE tweet_stats SET retweet_count = retweet_count - 1 WHERE tid = old.tid;
+END;
+"""
+
+STATS_TABLES = ['user_stats', 'tweet_stats']
+
+# The counters recomputed from the base tables, one row per user with any activity.
+ACTUAL_COUNTS = """
+SELECT usr, SUM(tweet_count) AS tweet_count, SUM(following_count) AS following_count,
+ SUM(follower_count) AS follower_count
+FROM (SELECT writer AS usr, COUNT(*) AS tweet_count, 0 AS following_count, 0 AS follower_count
+      FROM tweets GROUP BY writer
+      UNION ALL
+      SELECT flwer, 0, COUNT(*), 0 FROM follows GROUP BY flwer
+      UNION ALL
+      SELECT flwee, 0, 0, COUNT(*) FROM follows GROUP BY flwee)
+GROUP BY usr
+"""
+
+# The per-tweet counters recomputed from the base tables, one row per tweet with replies or retweets.
+ACTUAL_TWEET_COUNTS = """
+SELECT tid, SUM(reply_count) AS reply_count, SUM(retweet_count) AS retweet_count
+FROM (SELECT replyto AS tid, COUNT(*) AS reply_count, 0 AS retweet_count
+      FROM tweets WHERE replyto IS NOT NULL AND replyto != tid GROUP BY replyto
+      UNION ALL
+      SELECT tid, 0, COUNT(*) FROM retweets GROUP BY tid)
+GROUP BY tid
+"""
+
+USER_COUNTS = queries.register('user_counts', """
+    SELECT tweet_count, following_count, follower_count
+    FROM user_stats
+    WHERE usr = ?;
+""", (1,))
+
+TWEET_COUNTS = queries.register('tweet_counts', """
+    SELECT reply_count, retweet_count
+    FROM tweet_stats
+    WHERE tid = ?;
+""", (1,))
+
+
+def install(connection, cursor):
+    """
+    Create the user_stats and tweet_stats tables and the triggers that maintain them.
+    Each table's counters are computed the first time it is created on an existing database.
+    @param connection: database connection.
+    @param cursor: cursor on the connection.
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('user_stats', 'tweet_stats');")
+    existing = {row[0] for row in cursor.fetchall()}
+    cursor.executescript(STATS_SCHEMA)
+    missing = [table for table in STATS_TABLES if table not in existing]
+    if missing:
+        rebuild(connection, cursor, missing)
+
+def rebuild(connection, cursor, tables=STATS_TABLES):
+    """
+    Recompute every user's and tweet's counters from tweets, follows and retweets in bulk.
+    @param tables: the counter tables to rebuild.
+    """
+    if 'user_stats' in tables:
+        cursor.execute("DELETE FROM user_stats;")
+        cursor.execute(f"""
+                       INSERT INTO user_stats (usr, tweet_count, following_count, follower_count)
+                       {ACTUAL_COUNTS};
+                       """)
+    if 'tweet_stats' in tables:
+        cursor.execute("DELETE FROM tweet_stats;")
+        cursor.execute(f"""
+                       INSERT INTO tweet_stats (tid, reply_count, retweet_count)
+                       {ACTUAL_TWEET_COUNTS};
+                       """)
+    connection.commit()
+
+def user_counts(cursor, usr):
+    """
+    Look up a user's counters.
+    @param usr: the user whose counters are read.
+    @return: (tweet count, following count, follower count).
+    """
+    cursor.execute(USER_COUNTS, (usr,))
+    counts = cursor.fetchone()
+    if counts is None:
+        return (0, 0, 0)
+    return counts
+
+def tweet_counts(cursor, tid):
+    """
+    Look up a tweet's counters.
+    @param tid: the tweet whose counters are read.
+    @return: (reply count, retweet count).
+    """
+    cursor.execute(TWEET_COUNTS, (tid,))
+    counts = cursor.fetchone()
+    if counts is None:
+        return (0, 0)
+    return counts
+
+def check(cursor):
+    """
+    Recompute the counters in bulk and compare them with the stored ones.
+    @return: list of (usr, stored counts, actual counts) for every user whose counters drifted.
+    """
+    cursor.execute(f"""
+                   SELECT usr, SUM(stored_tweets), SUM(stored_following), SUM(stored_followers),
+                    SUM(tweet_count), SUM(following_count), SUM(follower_count)
+                   FROM (SELECT usr, tweet_count AS stored_tweets, following_count AS stored_following,
+                          follower_count AS stored_followers, 0 AS tweet_count, 0 AS following_count,
+                          0 AS follower_count
+                         FROM user_stats
+                         UNION ALL
+                         SELECT usr, 0, 0, 0, tweet_count, following_count, follower_count
+                         FROM ({ACTUAL_COUNTS}))
+                   GROUP BY usr;
+                   """)
+    drift = []
+    for row in cursor.fetchall():
+        stored = tuple(row[1:4])
+        actual = tuple(row[4:7])
+        if stored != actual:
+            drift.append((row[0], stored, actual))
+    return drift
+
+def check_tweets(cursor):
+    """
+    Recompute the per-tweet counters in bulk and compare them with the stored ones.
+    @return: list of (tid, stored counts, actual counts) for every tweet whose counters drifted.
+    """
+    cursor.execute(f"""
+                   SELECT tid, SUM(stored_replies), SUM(stored_retweets), SUM(reply_count), SUM(retweet_count)
+                   FROM (SELECT tid, reply_count AS stored_replies, retweet_count AS stored_retweets,
+                          0 AS reply_count, 0 AS retweet_count
+                         FROM tweet_stats
+                         UNION ALL
+                         SELECT tid, 0, 0, reply_count, retweet_count
+                         FROM ({ACTUAL_TWEET_COUNTS}))
+                   GROUP BY tid;
+                   """)
+    drift = []
+    for row in cursor.fetchall():
+        stored = tuple(row[1:3])
+        actual = tuple(row[3:5])
+        if stored != actual:
+            drift.append((row[0], stored, actual))
+    return drift
+
+
+if __name__ == "__main__":
+    # Report (and optionally repair) counter drift in an existing database:
+    #   $ python3 stats.py (optional) database_filename (optional) --repair
+    arguments = [arg for arg in sys.argv[1:] if arg != "--repair"]
+    if arguments:
+        path = arguments[0]
+    else:
+        path = "./test1.db"
+    connection = sqlite3.connect(path)
+    cursor = connection.cursor()
+    install(connection, cursor)
+    drift = check(cursor)
+    for usr, stored, actual in drift:
+        print(f"User {usr}: stored (tweets, following, followers) {stored}, actual {actual}")
+    print(f"{len(drift)} user(s) with drifted counters.")
+    tweet_drift = check_tweets(cursor)
+    for tid, stored, actual in tweet_drift:
+        print(f"Tweet {tid}: stored (replies, retweets) {stored}, actual {actual}")
+    print(f"{len(tweet_drift)} tweet(s) with drifted counters.")
+    if (drift or tweet_drift) and "--repair" in sys.argv:
+        rebuild(connection, cursor)
+        print("Counters rebuilt.")
+    connection.close()
@@ -0,0 +1,135 @@
+import queries
+
+# Conversation threads: a tweet with the chain of tweets it replies to and the tree of replies
+# under it, read in one recursive query over the tweets(replyto, tdate, tid) index of migration 4.
+# Rows have the shape (tid, replyto, level, writer usr, writer name, tdate, text, reply count):
+# level is negative for the tweets replied to, 0 for the tweet itself and positive for replies.
+
+# Tweets replied to that are shown above a tweet
+DEFAULT_ANCESTORS = 20
+# Levels of replies shown below a tweet
+DEFAULT_DEPTH = 4
+# Replies shown under each tweet; the rest are read a page at a time with read_replies
+DEFAULT_WIDTH = 5
+# Replies shown in all, however wide and deep the tree is
+MAX_NODES = 200
+
+# Replies are ordered oldest first, as a conversation reads. Descendants are collected breadth
+# first, so MAX_NODES cuts the deepest levels, and each carries the path of (tdate, tid) keys
+# from the tweet down to it, which orders the tree depth first. A tweet replying to itself
+# is not its own ancestor or reply.
+READ_THREAD = queries.register('thread', """
+    WITH RECURSIVE
+     ancestors(tid, replyto, level, writer, tdate, text) AS (
+       SELECT tid, replyto, 0, writer, tdate, text FROM tweets WHERE tid = :tid
+       UNION ALL
+       SELECT t.tid, t.replyto, a.level - 1, t.writer, t.tdate, t.text
+       FROM ancestors a, tweets t
+       WHERE t.tid = a.replyto AND a.replyto != a.tid AND a.level > -:ancestors
+     ),
+     descendants(tid, replyto, level, writer, tdate, text, path) AS (
+       SELECT tid, replyto, 0, writer, tdate, text, '' FROM tweets WHERE tid = :tid
+       UNION ALL
+       SELECT t.tid, t.replyto, d.level + 1, t.writer, t.tdate, t.text,
+        d.path || '/' || t.tdate || printf('%012d', t.tid)
+       FROM descendants d, tweets t
+       WHERE d.level < :depth
+        AND t.tid IN (SELECT r.tid FROM tweets r
+                      WHERE r.replyto = d.tid AND r.tid != d.tid
+                      ORDER BY r.tdate, r.tid
+                      LIMIT :width)
+       LIMIT :nodes
+     ),
+     thread(tid, replyto, level, writer, tdate, text, path) AS (
+       SELECT tid, replyto, level, writer, tdate, text, '' FROM ancestors WHERE level < 0
+       UNION ALL
+       SELECT * FROM descendants
+     )
+    SELECT th.tid, th.replyto, th.level, u.usr, u.name, th.tdate, th.text, COALESCE(s.reply_count, 0)
+    FROM thread th
+     JOIN users u ON u.usr = th.writer
+     LEFT JOIN tweet_stats s ON s.tid = th.tid
+    ORDER BY MIN(th.level, 0), th.path;
+""", {'tid': 1, 'ancestors': DEFAULT_ANCESTORS, 'depth': DEFAULT_DEPTH, 'width': DEFAULT_WIDTH,
+      'nodes': MAX_NODES + 1})
+
+READ_REPLIES = queries.register('replies', """
+    SELECT t.tid, t.replyto, 1, u.usr, u.name, t.tdate, t.text, COALESCE(s.reply_count, 0)
+    FROM tweets t
+     JOIN users u ON u.usr = t.writer
+     LEFT JOIN tweet_stats s ON s.tid = t.tid
+    WHERE t.replyto = ? AND t.tid != t.replyto
+    ORDER BY t.tdate, t.tid
+    LIMIT ?;
+""", (1, 6))
+
+READ_REPLIES_AFTER = queries.register('replies_after', """
+    SELECT t.tid, t.replyto, 1, u.usr, u.name, t.tdate, t.text, COALESCE(s.reply_count, 0)
+    FROM tweets t
+     JOIN users u ON u.usr = t.writer
+     LEFT JOIN tweet_stats s ON s.tid = t.tid
+    WHERE t.replyto = ? AND t.tid != t.replyto
+     AND (t.tdate, t.tid) > (?, ?)
+    ORDER BY t.tdate, t.tid
+    LIMIT ?;
+""", (1, '2022-01-01', 5, 6))
+
+
+def read_thread(cursor, tid, ancestors=DEFAULT_ANCESTORS, depth=DEFAULT_DEPTH, width=DEFAULT_WIDTH,
+                nodes=MAX_NODES):
+    """
+    Read a tweet's conversation in one query: the tweets it replies to, oldest first, then the
+    tweet and the tree of its replies, depth first with each tweet's replies oldest first.
+    @param tid: the tweet the conversation is read around.
+    @param ancestors: most tweets replied to to read.
+    @param depth: most levels of replies to read.
+    @param width: most replies to read under each tweet.
+    @param nodes: most replies to read in all.
+    @return: list of thread rows, empty if there is no such tweet.
+    """
+    # The descendants' LIMIT also counts the tweet itself, so nodes + 1 rows hold nodes replies
+    cursor.execute(READ_THREAD, {'tid': tid, 'ancestors': ancestors, 'depth': depth, 'width': width,
+                                 'nodes': nodes + 1})
+    return cursor.fetchall()
+
+def read_replies(cursor, tid, limit, after=None):
+    """
+    Read one page of the direct replies to a tweet, oldest first, to expand a tweet whose replies
+    read_thread cut off. One row past the page is read to tell whether another page follows.
+    @param tid: the tweet replied to.
+    @param limit: maximum number of rows in the page.
+    @param after: keyset returned with the previous page, or None for the first page.
+    @return: (list of thread rows at level 1, keyset of the next page or None if this is the last).
+    """
+    if after is None:
+        cursor.execute(READ_REPLIES, (tid, limit + 1))
+    else:
+        cursor.execute(READ_REPLIES_AFTER, (tid, *after, limit + 1))
+    rows = cursor.fetchmany(limit)
+    if cursor.fetchone() is None:
+        return rows, None
+    return rows, (rows[-1][5], rows[-1][0])
+
+def iter_replies(cursor, tid, page_size):
+    """
+    Lazily page through the direct replies to a tweet, one query per page.
+    @param page_size: number of rows per page.
+    """
+    after = None
+    while True:
+        page, after = read_replies(cursor, tid, page_size, after)
+        if page:
+            yield page
+        if after is None:
+            return
+
+def shown_replies(thread):
+    """
+    @param thread: rows returned by read_thread.
+    @return: dict of tid to the number of its replies in the thread.
+    """
+    shown = {}
+    for row in thread:
+        if row[2] > 0:
+            shown[row[1]] = shown.get(row[1], 0) + 1
+    return shown
@@ -0,0 +1,209 @@
+import sqlite3
+import sys
+import profiles
+import queries
+import records
+
+# Materialized home timeline: one row per (follower, activity) so the Recent
+# Activity feed is a single range scan instead of a join over follows/tweets/retweets.
+# kind is 0 for a tweet written by the followee and 1 for a retweet made by the followee.
+TIMELINE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS timeline (
+  usr         int,
+  tdate       date,
+  tid         int,
+  kind        int,
+  actor       int,
+  primary key (usr, tdate, tid, kind, actor)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS timeline_tweet_insert AFTER INSERT ON tweets
+BEGIN
+  INSERT OR IGNORE INTO timeline (usr, tdate, tid, kind, actor)
+  SELECT flwer, new.tdate, new.tid, 0, new.writer
+  FROM follows
+  WHERE flwee = new.writer;
+END;
+
+CREATE TRIGGER IF NOT EXISTS timeline_tweet_delete AFTER DELETE ON tweets
+BEGIN
+  DELETE FROM timeline
+  WHERE usr IN (SELECT flwer FROM follows WHERE flwee = old.writer)
+    AND tdate = old.tdate AND tid = old.tid AND kind = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS timeline_retweet_insert AFTER INSERT ON retweets
+BEGIN
+  INSERT OR IGNORE INTO timeline (usr, tdate, tid, kind, actor)
+  SELECT flwer, new.rdate, new.tid, 1, new.usr
+  FROM follows
+  WHERE flwee = new.usr;
+END;
+
+CREATE TRIGGER IF NOT EXISTS timeline_retweet_delete AFTER DELETE ON retweets
+BEGIN
+  DELETE FROM timeline
+  WHERE usr IN (SELECT flwer FROM follows WHERE flwee = old.usr)
+    AND tdate = old.rdate AND tid = old.tid AND kind = 1 AND actor = old.usr;
+END;
+
+CREATE TRIGGER IF NOT EXISTS timeline_follow_insert AFTER INSERT ON follows
+BEGIN
+  INSERT OR IGNORE INTO timeline (usr, tdate, tid, kind, actor)
+  SELECT new.flwer, tdate, tid, 0, writer
+  FROM tweets
+  WHERE writer = new.flwee;
+  INSERT OR IGNORE INTO timeline (usr, tdate, tid, kind, actor)
+  SELECT new.flwer, rdate, tid, 1, usr
+  FROM retweets
+  WHERE usr = new.flwee;
+END;
+
+CREATE TRIGGER IF NOT EXISTS timeline_follow_delete AFTER DELETE ON follows
+BEGIN
+  DELETE FROM timeline
+  WHERE usr = old.flwer AND actor = old.flwee;
+END;
+"""
+
+# Sorted into primary key order, the bulk inserts append to the b-tree instead of splitting pages
+REBUILD_TWEETS = queries.register('timeline_rebuild_tweets', """
+    INSERT INTO timeline (usr, tdate, tid, kind, actor)
+    SELECT f.flwer, t.tdate, t.tid, 0, t.writer
+    FROM follows f, tweets t
+    WHERE f.flwee = t.writer
+    ORDER BY 1, 2, 3;
+""", (), hot=False)
+
+REBUILD_RETWEETS = queries.register('timeline_rebuild_retweets', """
+    INSERT INTO timeline (usr, tdate, tid, kind, actor)
+    SELECT f.flwer, rt.rdate, rt.tid, 1, rt.usr
+    FROM follows f, retweets rt
+    WHERE f.flwee = rt.usr
+    ORDER BY 1, 2, 3;
+""", (), hot=False)
+
+REBUILD_USER_TWEETS = queries.register('timeline_rebuild_user_tweets', """
+    INSERT INTO timeline (usr, tdate, tid, kind, actor)
+    SELECT f.flwer, t.tdate, t.tid, 0, t.writer
+    FROM follows f, tweets t
+    WHERE f.flwer = ? AND f.flwee = t.writer;
+""", (1,))
+
+REBUILD_USER_RETWEETS = queries.register('timeline_rebuild_user_retweets', """
+    INSERT INTO timeline (usr, tdate, tid, kind, actor)
+    SELECT f.flwer, rt.rdate, rt.tid, 1, rt.usr
+    FROM follows f, retweets rt
+    WHERE f.flwer = ? AND f.flwee = rt.usr;
+""", (1,))
+
+# Names are not joined in: read_timeline resolves the page's users through a profiles.ProfileCache
+READ_TIMELINE = queries.register('read_timeline', """
+    SELECT tl.kind, tl.tdate, t.text, t.tid, tl.actor, t.writer
+    FROM timeline tl, tweets t
+    WHERE tl.usr = ? AND t.tid = tl.tid
+    ORDER BY tl.tdate DESC, tl.tid DESC, tl.kind DESC, tl.actor DESC
+    LIMIT ?;
+""", (1, 5))
+
+READ_TIMELINE_AFTER = queries.register('read_timeline_after', """
+    SELECT tl.kind, tl.tdate, t.text, t.tid, tl.actor, t.writer
+    FROM timeline tl, tweets t
+    WHERE tl.usr = ? AND (tl.tdate, tl.tid, tl.kind, tl.actor) < (?, ?, ?, ?)
+     AND t.tid = tl.tid
+    ORDER BY tl.tdate DESC, tl.tid DESC, tl.kind DESC, tl.actor DESC
+    LIMIT ?;
+""", (1, '2022-04-30', 4, 1, 1, 5))
+
+
+def install(connection, cursor):
+    """
+    Create the timeline table and the triggers that keep it current. The follows(flwee) index
+    the triggers look followers up with comes from migration 1.
+    The timeline is backfilled the first time it is created on an existing database.
+    @param connection: database connection.
+    @param cursor: cursor on the connection.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'timeline';")
+    exists = cursor.fetchone()
+    cursor.executescript(TIMELINE_SCHEMA)
+    if not exists:
+        rebuild(connection, cursor)
+
+def rebuild(connection, cursor, usr=None):
+    """
+    Recompute the timeline from follows, tweets and retweets.
+    @param usr: rebuild only this user's timeline. Every timeline is rebuilt when None.
+    @return: number of timeline rows written.
+    """
+    if usr is None:
+        cursor.execute("DELETE FROM timeline;")
+        cursor.execute(REBUILD_TWEETS)
+        count = cursor.rowcount
+        cursor.execute(REBUILD_RETWEETS)
+    else:
+        cursor.execute("DELETE FROM timeline WHERE usr = ?;", (usr,))
+        cursor.execute(REBUILD_USER_TWEETS, (usr,))
+        count = cursor.rowcount
+        cursor.execute(REBUILD_USER_RETWEETS, (usr,))
+    count += cursor.rowcount
+    connection.commit()
+    return count
+
+def timeline_key(item):
+    """
+    Keyset position of a timeline row, in the timeline's sort order.
+    @param item: a records.FeedItem returned by read_timeline.
+    """
+    return (item.date, item.tid, int(item.retweet), item.usr)
+
+def read_timeline(cursor, usr, limit, after=None, cache=None):
+    """
+    Read one page of a user's Recent Activity, newest first.
+    @param usr: the user whose timeline is read.
+    @param limit: maximum number of rows to return.
+    @param after: timeline_key of the last row already read, or None for the first page.
+    @param cache: profiles.ProfileCache the names are resolved through, the connection's when None.
+    @return: list of records.FeedItem.
+    """
+    with records.rows_as(cursor, records.feed_item):
+        if after is None:
+            cursor.execute(READ_TIMELINE, (usr, limit))
+        else:
+            cursor.execute(READ_TIMELINE_AFTER, (usr, *after, limit))
+        page = cursor.fetchall()
+    if cache is None:
+        cache = profiles.cache_for(cursor.connection)
+    return profiles.fill_feed(cursor, cache, page)
+
+def iter_timeline(cursor, usr, page_size, cache=None):
+    """
+    Lazily page through a user's Recent Activity. Each page is one keyset query that is only
+    run when the caller asks for it, so memory does not grow with the size of the timeline.
+    @param usr: the user whose timeline is read.
+    @param page_size: number of rows per page.
+    @param cache: profiles.ProfileCache the names are resolved through, the connection's when None.
+    """
+    after = None
+    while True:
+        page = read_timeline(cursor, usr, page_size, after, cache)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = timeline_key(page[-1])
+
+
+if __name__ == "__main__":
+    # Backfill or repair the timeline of an existing database:
+    #   $ python3 timeline.py (optional) database_filename
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        path = "./test1.db"
+    connection = sqlite3.connect(path)
+    cursor = connection.cursor()
+    cursor.executescript(TIMELINE_SCHEMA)
+    count = rebuild(connection, cursor)
+    print(f"Rebuilt timeline for {path}: {count} rows.")
+    connection.close()
@@ -0,0 +1,210 @@
+import argparse
+from datetime import date, timedelta
+import sqlite3
+import queries
+
+# Trending hashtags over a sliding window of the last few days, kept current by triggers on
+# mentions so Trending Hashtags reads the top K terms off an index instead of grouping mentions.
+# hashtag_days holds each term's count per day, the buckets the window slides over. trending
+# holds each term's total over the window; when the window moves past a day, that day's counts
+# are subtracted from it. Tweets only carry a date, so a day is the smallest bucket.
+TRENDING_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashtag_days (
+  day         date,
+  term        text,
+  count       int default 0,
+  primary key (day, term)
+) WITHOUT ROWID;
+
+-- advance: a term's counts over the days leaving the window
+CREATE INDEX IF NOT EXISTS hashtag_days_term ON hashtag_days (term, day);
+
+CREATE TABLE IF NOT EXISTS trend_window (
+  id          int check (id = 0),
+  days        int,
+  start       date,
+  primary key (id)
+);
+
+CREATE TABLE IF NOT EXISTS trending (
+  term        text,
+  count       int,
+  primary key (term)
+);
+
+CREATE INDEX IF NOT EXISTS trending_count ON trending (count DESC, term);
+
+CREATE TRIGGER IF NOT EXISTS trending_mention_insert AFTER INSERT ON mentions
+BEGIN
+  INSERT INTO hashtag_days (day, term, count)
+  SELECT tdate, new.term, 1 FROM tweets WHERE tid = new.tid
+  ON CONFLICT (day, term) DO UPDATE SET count = count + 1;
+  INSERT INTO trending (term, count)
+  SELECT new.term, 1 FROM tweets t, trend_window w WHERE t.tid = new.tid AND t.tdate >= w.start
+  ON CONFLICT (term) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trending_mention_delete AFTER DELETE ON mentions
+BEGIN
+  UPDATE hashtag_days SET count = count - 1
+  WHERE term = old.term AND day = (SELECT tdate FROM tweets WHERE tid = old.tid);
+  UPDATE trending SET count = count - 1
+  WHERE term = old.term
+   AND (SELECT tdate FROM tweets WHERE tid = old.tid) >= (SELECT start FROM trend_window);
+  DELETE FROM trending WHERE term = old.term AND count <= 0;
+END;
+"""
+
+DEFAULT_WINDOW_DAYS = 7
+DEFAULT_TOP = 10
+
+TREND_WINDOW = queries.register('trend_window', """
+    SELECT days, start FROM trend_window WHERE id = 0;
+""", ())
+
+# Only moves a window still starting where it was read, so two connections sliding it at once
+# subtract the expired days once
+SLIDE_WINDOW = queries.register('slide_window', """
+    UPDATE trend_window SET start = ? WHERE id = 0 AND start = ?;
+""", ('2025-01-02', '2025-01-01'))
+
+# A correlated subquery rather than UPDATE ... FROM, which needs SQLite 3.33
+EXPIRE_DAYS = queries.register('expire_days', """
+    UPDATE trending SET count = count - (SELECT SUM(d.count) FROM hashtag_days d
+                                         WHERE d.term = trending.term AND d.day >= :start AND d.day < :end)
+    WHERE term IN (SELECT term FROM hashtag_days WHERE day >= :start AND day < :end);
+""", {'start': '2025-01-01', 'end': '2025-01-02'})
+
+DROP_EXPIRED = queries.register('drop_expired', """
+    DELETE FROM trending WHERE count <= 0;
+""", ())
+
+TOP_TERMS = queries.register('top_terms', """
+    SELECT term, count FROM trending
+    ORDER BY count DESC, term
+    LIMIT ?;
+""", (10,))
+
+
+def window_start(days, today=None):
+    """
+    @return: the first day of a window of days ending today, as stored in tweets.tdate.
+    """
+    if today is None:
+        today = date.today()
+    return (today - timedelta(days=days - 1)).isoformat()
+
+def install(connection, cursor):
+    """
+    Create the hashtag_days, trend_window and trending tables and the triggers that maintain them.
+    The counts are computed from mentions the first time the tables are created on an existing database.
+    @param connection: database connection.
+    @param cursor: cursor on the connection.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trending';")
+    exists = cursor.fetchone()
+    cursor.executescript(TRENDING_SCHEMA)
+    if not exists:
+        rebuild(connection, cursor, DEFAULT_WINDOW_DAYS)
+
+def rebuild(connection, cursor, days=None, today=None):
+    """
+    Recompute the per-day counts from mentions and tweets in bulk, and the trending totals of
+    the window ending today from them.
+    @param days: length of the window in days. The current window's length when None.
+    @param today: last day of the window, date.today() when None.
+    """
+    if days is None:
+        cursor.execute(TREND_WINDOW)
+        row = cursor.fetchone()
+        days = row[0] if row else DEFAULT_WINDOW_DAYS
+    if days < 1:
+        raise ValueError("The trending window must be at least one day long")
+    start = window_start(days, today)
+    cursor.execute("DELETE FROM hashtag_days;")
+    cursor.execute("""
+                   INSERT INTO hashtag_days (day, term, count)
+                   SELECT t.tdate, m.term, COUNT(*)
+                   FROM mentions m, tweets t
+                   WHERE t.tid = m.tid
+                   GROUP BY t.tdate, m.term;
+                   """)
+    cursor.execute("DELETE FROM trend_window;")
+    cursor.execute("INSERT INTO trend_window (id, days, start) VALUES (0, ?, ?);", (days, start))
+    cursor.execute("DELETE FROM trending;")
+    cursor.execute("""
+                   INSERT INTO trending (term, count)
+                   SELECT term, SUM(count) FROM hashtag_days
+                   WHERE day >= ?
+                   GROUP BY term
+                   HAVING SUM(count) > 0;
+                   """, (start,))
+    connection.commit()
+
+def advance(connection, cursor, today=None):
+    """
+    Slide the window forward to end today, subtracting the counts of the days it leaves behind.
+    Costs one primary-key lookup when the window is already current.
+    @param today: last day of the window, date.today() when None.
+    @return: (window length in days, first day of the window).
+    """
+    cursor.execute(TREND_WINDOW)
+    days, start = cursor.fetchone()
+    new_start = window_start(days, today)
+    if new_start <= start:
+        return days, start
+    try:
+        cursor.execute(SLIDE_WINDOW, (new_start, start))
+        if cursor.rowcount == 1:
+            cursor.execute(EXPIRE_DAYS, {'start': start, 'end': new_start})
+            cursor.execute(DROP_EXPIRED)
+        connection.commit()
+    except sqlite3.Error:
+        connection.rollback()
+        raise
+    return days, new_start
+
+def top_terms(cursor, k=DEFAULT_TOP):
+    """
+    Read the k terms mentioned most in the current window, one index range of trending_count.
+    @return: list of (term, count), most mentioned first.
+    """
+    cursor.execute(TOP_TERMS, (k,))
+    return cursor.fetchall()
+
+def check(cursor):
+    """
+    Recompute the window's totals from mentions and compare them with the stored ones.
+    @return: list of (term, stored count, actual count) for every term whose total drifted.
+    """
+    cursor.execute("""
+                   SELECT term, SUM(stored), SUM(actual)
+                   FROM (SELECT term, count AS stored, 0 AS actual FROM trending
+                         UNION ALL
+                         SELECT m.term, 0, COUNT(*)
+                         FROM mentions m, tweets t, trend_window w
+                         WHERE t.tid = m.tid AND t.tdate >= w.start
+                         GROUP BY m.term)
+                   GROUP BY term
+                   HAVING SUM(stored) != SUM(actual);
+                   """)
+    return [tuple(row) for row in cursor.fetchall()]
+
+
+if __name__ == "__main__":
+    # Rebuild the trending counts of an existing database from its mentions:
+    #   $ python3 trending.py (optional) database_filename (optional) --days N
+    parser = argparse.ArgumentParser(description="Rebuild trending hashtag counts from history.")
+    parser.add_argument("database", nargs="?", default="./test1.db")
+    parser.add_argument("--days", type=int, help=f"window length in days (default: the current one, "
+                                                 f"{DEFAULT_WINDOW_DAYS} for a new database)")
+    args = parser.parse_args()
+    connection = sqlite3.connect(args.database)
+    cursor = connection.cursor()
+    install(connection, cursor)
+    rebuild(connection, cursor, args.days)
+    days, start = advance(connection, cursor)
+    print(f"{args.database}: trending hashtags of the {days} day(s) since {start}:")
+    for term, count in top_terms(cursor):
+        print(f"  #{term}: {count}")
+    connection.close()